@@ -0,0 +1,57 @@
+'''compares a parameter sweep run as separate flows with the same sweep run as one batch,
+on an expensive blur shared by every variant followed by a cheap blur that varies.
+separate flows still skip the shared blur after the first through the result cache
+
+run with: python -m benchmarks.batch_sweep
+'''
+import copy
+import time
+
+import numpy as np
+
+from pne_backend.base_node import BaseNode
+from pne_backend.batch import run_batch
+from pne_backend.datatypes.image import ImageData
+from pne_backend.runner import run_flow
+
+from .common import chain_flow, load_node_classes, node_template
+
+VARIANTS = 16
+IMAGE_SIZE = 2048
+
+
+def sweep_flow(node_classes: dict) -> dict:
+    flow = chain_flow(node_template(node_classes, 'BlurImageNode'), 2)
+    image = ImageData(payload=np.random.randint(0, 255, (IMAGE_SIZE, IMAGE_SIZE, 3), dtype=np.uint8))
+    flow['nodes'][0]['data']['inputs'][0]['data'] = image
+    flow['nodes'][0]['data']['inputs'][1]['data']['payload'] = 30
+    return flow
+
+
+def main():
+    node_classes = load_node_classes()
+    flow = sweep_flow(node_classes)
+    varying = flow['nodes'][1]['id']
+    radii = [1 + i % 4 for i in range(VARIANTS)]
+
+    # memoized results would carry over from one mode to the other
+    BaseNode.result_cache.clear()
+    start = time.perf_counter()
+    for radius in radii:
+        variant = copy.deepcopy(flow)
+        variant['nodes'][1]['data']['inputs'][1]['data']['payload'] = radius
+        run_flow(variant, node_classes=node_classes)
+    separate = time.perf_counter() - start
+
+    BaseNode.result_cache.clear()
+    start = time.perf_counter()
+    run_batch(flow, [{varying: {'radius': radius}} for radius in radii], node_classes=node_classes)
+    batched = time.perf_counter() - start
+
+    print(f"{VARIANTS} variants of a {IMAGE_SIZE}px flow")
+    print(f"separate flows: {separate:.2f}s")
+    print(f"batch:          {batched:.2f}s ({separate / batched:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import copy
+import json
+import os
+import platform
+import uuid
+from typing import Callable, Optional
+
+import numpy as np
+
+from pne_backend.base_node import BaseNode
+from pne_backend.datatypes.image import ImageData
+from pne_backend.utils import find_and_load_classes
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+# a measurement this much larger than its baseline is a regression
+REGRESSION_THRESHOLD = 1.25
+
+
+class FakeWebSocket:
+    '''stands in for the fastapi websocket and counts what would have been sent'''
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes_sent = 0
+
+    async def send_text(self, text: str):
+        self.messages += 1
+        self.bytes_sent += len(text)
+
+    async def send_bytes(self, data: bytes):
+        self.messages += 1
+        self.bytes_sent += len(data)
+
+    async def close(self):
+        pass
+
+
+def load_node_classes() -> dict:
+    return find_and_load_classes("pne_backend.nodes")
+
+
+def find_node_class(node_classes: dict, class_name: str) -> type[BaseNode]:
+    '''looks a class up in the loaded classes, which are reloaded and so differ from a plain import'''
+    for classes in node_classes.values():
+        for cls in classes:
+            if cls.__name__ == class_name:
+                return cls
+    raise KeyError(class_name)
+
+
+def node_template(node_classes: dict, class_name: str) -> dict:
+    '''a node as the frontend would send it'''
+    NodeClass = find_node_class(node_classes, class_name)
+    return json.loads(NodeClass(id='').model_dump_json())
+
+
+def new_node(template: dict) -> dict:
+    node = copy.deepcopy(template)
+    node['id'] = str(uuid.uuid4())
+    return node
+
+
+def edge(source: dict, source_index: int, target: dict, target_index: int) -> dict:
+    return {
+        'source': source['id'],
+        'sourceHandle': f"{source['id']}:outputs:{source_index}:handle",
+        'target': target['id'],
+        'targetHandle': f"{target['id']}:inputs:{target_index}:handle",
+    }
+
+
+def chain_flow(template: dict, length: int) -> dict:
+    '''a single chain of nodes, each feeding its first output into the first input of the next'''
+    nodes = [new_node(template) for _ in range(length)]
+    edges = [edge(a, 0, b, 0) for a, b in zip(nodes, nodes[1:])]
+    return {'nodes': nodes, 'edges': edges}
+
+
+def cached_image(height: int, width: int) -> dict:
+    '''a serialized ImageData large enough to live in the large data cache, referenced by id'''
+    image = ImageData(payload=np.random.randint(0, 255, (height, width, 3), dtype=np.uint8))
+    return json.loads(image.model_dump_json())
+
+
+def branches_flow(templates: list[dict], width: int, make_image: Optional[Callable[[], dict]] = None) -> dict:
+    '''independent copies of a chain of node templates, each branch fed an image of its own,
+    so the result cache can't answer one branch with the results of another'''
+    nodes, edges = [], []
+    for _ in range(width):
+        branch = [new_node(template) for template in templates]
+        if make_image is not None:
+            branch[0]['data']['inputs'][0]['data'] = make_image()
+        edges += [edge(a, 0, b, 0) for a, b in zip(branch, branch[1:])]
+        nodes += branch
+    return {'nodes': nodes, 'edges': edges}
+
+
+def load_baseline(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, results: dict[str, dict[str, float]], merge: bool = False, **info):
+    '''writes results by case and metric with the machine they were measured on.
+    with merge the cases of the existing baseline that weren't measured are kept'''
+    if merge and os.path.exists(path):
+        results = load_baseline(path).get('results', {}) | results
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({
+            **info,
+            'python': platform.python_version(),
+            'machine': f'{platform.machine()}, {os.cpu_count()} cpus',
+            'results': results,
+        }, f, indent=2)
+    print(f"Saved the baseline to {path}")
+
+
+def find_regressions(
+    results: dict[str, dict[str, float]],
+    baseline: dict,
+    threshold: float = REGRESSION_THRESHOLD,
+    ignore: Callable[[str, float], bool] = lambda metric, before: False,
+) -> list[str]:
+    '''the measurements larger than their baseline by more than threshold, ignore skips the
+    metrics too noisy to compare'''
+    regressions = []
+    for case, metrics in results.items():
+        for metric, value in metrics.items():
+            before = baseline.get('results', {}).get(case, {}).get(metric)
+            if before is None or ignore(metric, before):
+                continue
+            if value > before * threshold:
+                regressions.append(f"{case} {metric}: {before:.1f} -> {value:.1f}")
+    return regressions
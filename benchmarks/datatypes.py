@@ -0,0 +1,176 @@
+'''measures the serialization round trip of every registered datatype.
+
+for each class in CLASS_REGISTRY (node modules register their own) representative instances are
+dumped to json, validated back as the class and validated through an InputNodeField, as a node
+input arriving from the client would be. model classes are built from samples of their fields,
+registered classes without a sample are listed so they get one. payloads over
+BaseData.max_file_size_mb go through the large data cache, as they would in a run.
+
+run with: python -m benchmarks.datatypes
+save a baseline with --save, compare against it with --compare (exits 1 on a regression)
+'''
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+from typing import Any, Callable
+
+import numpy as np
+from pydantic import BaseModel
+
+from pne_backend.base_data import CLASS_REGISTRY, BaseData
+from pne_backend.datatypes.basic import FloatData, IntData, LiteralData, NumpyData, StringData
+from pne_backend.datatypes.compound import ListData, ModelData
+from pne_backend.datatypes.image import ImageData
+from pne_backend.field import InputNodeField
+
+from .common import BASELINE_DIR, find_regressions, load_baseline, load_node_classes, save_baseline
+
+# every measurement is repeated for at least this long, the best repeat is kept
+MIN_SECONDS = 0.2
+REPEATS = 3
+# operations faster than this are too noisy to compare
+MIN_COMPARED_US = 20
+BASELINE_PATH = os.path.join(BASELINE_DIR, 'datatypes.json')
+
+METRICS = ['dump_us', 'validate_us', 'field_us', 'bytes']
+
+
+def nested_list(depth: int, breadth: int = 2) -> ListData:
+    if depth == 0:
+        return ListData(payload=[IntData(payload=i) for i in range(breadth)])
+    return ListData(payload=[nested_list(depth - 1, breadth) for _ in range(breadth)])
+
+
+def image(size: int) -> ImageData:
+    return ImageData(payload=np.random.randint(0, 255, (size, size, 3), dtype=np.uint8))
+
+
+# class name -> representative instances by size
+SAMPLES: dict[str, dict[str, Callable[[], BaseModel]]] = {
+    'IntData': {'small': lambda: IntData(payload=7), 'large': lambda: IntData(payload=10 ** 300)},
+    'FloatData': {'small': lambda: FloatData(payload=3.14)},
+    'StringData': {'small': lambda: StringData(payload='hello'), 'large': lambda: StringData(payload='x' * 100_000)},
+    'LiteralData': {'small': lambda: LiteralData(payload='b', options=['a', 'b', 'c'])},
+    'NumpyData': {
+        'small': lambda: NumpyData(payload=np.random.rand(16)),
+        'large': lambda: NumpyData(payload=np.random.rand(200, 200)),
+    },
+    'ImageData': {'small': lambda: image(64), 'cached': lambda: image(512)},
+    'ListData': {
+        'flat': lambda: ListData(payload=[IntData(payload=i) for i in range(100)]),
+        'nested': lambda: nested_list(6),
+    },
+}
+
+
+def sample_of(cls: type) -> BaseModel:
+    '''an instance of a registered class, from its own sample, the sample of the class it
+    extends, or samples of its fields for models'''
+    if cls.__name__ in SAMPLES:
+        return next(iter(SAMPLES[cls.__name__].values()))()
+    if issubclass(cls, ModelData):
+        return cls(**{
+            name: sample_of(field.annotation)
+            for name, field in cls.model_fields.items() if name not in ModelData.model_fields
+        })
+    for base in cls.__mro__[1:]:
+        if base.__name__ in SAMPLES and issubclass(cls, BaseData):
+            return cls(payload=sample_of(base).payload)
+    raise LookupError(f"No sample for {cls.__name__}")
+
+
+def samples() -> tuple[dict[str, Callable[[], BaseModel]], list[str]]:
+    '''the instances to measure by name, and the registered classes there is no sample for'''
+    cases, missing = {}, []
+    for name, cls in CLASS_REGISTRY.items():
+        sizes = SAMPLES.get(name, {'sample': lambda cls=cls: sample_of(cls)})
+        for size, make in sizes.items():
+            cases[f'{name}/{size}'] = make
+        try:
+            sample_of(cls)
+        except (LookupError, TypeError, ValueError):
+            missing.append(name)
+            for size in sizes:
+                cases.pop(f'{name}/{size}')
+    return cases, missing
+
+
+def best_time(operation: Callable[[Any], Any], make_argument: Callable[[], Any]) -> float:
+    '''the best time of one call in microseconds. arguments are made before the clock starts,
+    as validation modifies what it is given'''
+    start = time.perf_counter()
+    operation(make_argument())
+    number = max(1, min(10_000, int(MIN_SECONDS / max(time.perf_counter() - start, 1e-7))))
+    best = float('inf')
+    for _ in range(REPEATS):
+        arguments = [make_argument() for _ in range(number)]
+        start = time.perf_counter()
+        for argument in arguments:
+            operation(argument)
+        best = min(best, (time.perf_counter() - start) / number)
+    return best * 1e6
+
+
+def measure(instance: BaseModel) -> dict[str, float]:
+    cls = instance.__class__
+    dumped = instance.model_dump_json()
+    serialized = json.loads(dumped)
+    return {
+        'dump_us': best_time(lambda data: data.model_dump_json(), lambda: instance),
+        'validate_us': best_time(
+            lambda data: cls.model_validate(data, context={'state': 'deserializing'}),
+            lambda: copy.deepcopy(serialized),
+        ),
+        'field_us': best_time(
+            InputNodeField.model_validate,
+            lambda: {'label': 'input', 'allowed_types': [cls.__name__], 'data': copy.deepcopy(serialized)},
+        ),
+        'bytes': len(dumped),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='times serialization round trips of the registered datatypes')
+    parser.add_argument('--cases', nargs='+', help='only these cases, as <class name> or <class name>/<size>')
+    parser.add_argument('--save', action='store_true', help='save the results as the baseline')
+    parser.add_argument('--compare', action='store_true', help='compare the results with the baseline')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    args = parser.parse_args()
+
+    # node modules register datatypes of their own
+    load_node_classes()
+    cases, missing = samples()
+    baseline = load_baseline(args.baseline) if args.compare else {}
+
+    print(f"{'case':>28} " + ' '.join(f'{metric:>12}' for metric in METRICS))
+    results = {}
+    for name, make in cases.items():
+        if args.cases and name not in args.cases and name.split('/')[0] not in args.cases:
+            continue
+        results[name] = measure(make())
+        line = f"{name:>28} " + ' '.join(f'{results[name][metric]:>12.1f}' for metric in METRICS)
+        before = baseline.get('results', {}).get(name, {}).get('validate_us')
+        if before:
+            line += f"  {results[name]['validate_us'] / before:.2f}x baseline"
+        print(line)
+    if missing:
+        print(f"No sample for {', '.join(missing)}, add them to SAMPLES")
+
+    if args.save:
+        save_baseline(args.baseline, results, merge=bool(args.cases))
+
+    if args.compare:
+        regressions = find_regressions(
+            results, baseline, ignore=lambda metric, before: metric.endswith('_us') and before < MIN_COMPARED_US
+        )
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+'''times whole runs of synthetic flows of different shapes, phase by phase, and compares them with
+saved baselines.
+
+every shape is run REPEATS times on a fresh engine with an empty result cache, the best time of
+each phase is kept. phases come from the run's profile, serialization is the time spent encoding
+node updates for the client. peak memory is measured in a separate run under tracemalloc, which
+would otherwise slow the timed runs down.
+
+run with: python -m benchmarks.graph_execution
+save a baseline with --save, compare against it with --compare (exits 1 on a regression)
+'''
+import argparse
+import asyncio
+import copy
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+from pne_backend.base_node import BaseNode
+from pne_backend.datatypes.basic import IntData
+from pne_backend.datatypes.compound import ListData
+from pne_backend.execution_wrapper import ExecutionWrapper
+
+from .common import (
+    BASELINE_DIR, FakeWebSocket, cached_image, chain_flow, edge, find_regressions, load_baseline, load_node_classes,
+    new_node, node_template, save_baseline,
+)
+
+REPEATS = 3
+# phases faster than this are too noisy to compare
+MIN_COMPARED_MS = 5
+BASELINE_PATH = os.path.join(BASELINE_DIR, 'graph_execution.json')
+
+PHASES = ['instantiate_ms', 'compile_ms', 'execute_ms', 'serialize_ms', 'total_ms', 'peak_mb']
+
+
+def fan_out_flow(source: dict, target: dict, width: int) -> dict:
+    '''one node feeding its first output into width others'''
+    root = new_node(source)
+    leaves = [new_node(target) for _ in range(width)]
+    return {'nodes': [root, *leaves], 'edges': [edge(root, 0, leaf, 0) for leaf in leaves]}
+
+
+def diamonds_flow(split: dict, join: dict, count: int) -> dict:
+    '''count diamonds in a row, each node splitting into two outputs that the next node adds back up'''
+    nodes, edges = [], []
+    previous = None
+    for _ in range(count):
+        a, b = new_node(split), new_node(join)
+        if previous is not None:
+            edges.append(edge(previous, 0, a, 0))
+        edges += [edge(a, 0, b, 0), edge(a, 1, b, 1)]
+        nodes += [a, b]
+        previous = b
+    return {'nodes': nodes, 'edges': edges}
+
+
+def nested_list(depth: int, breadth: int = 2) -> ListData:
+    if depth == 0:
+        return ListData(payload=[IntData(payload=i) for i in range(breadth)])
+    return ListData(payload=[nested_list(depth - 1, breadth) for _ in range(breadth)])
+
+
+def nested_lists_flow(template: dict, length: int, depth: int) -> dict:
+    '''a chain of list concatenations, the first fed a list nested depth levels deep'''
+    flow = chain_flow(template, length)
+    flow['nodes'][0]['data']['inputs'][0]['data'] = json.loads(nested_list(depth).model_dump_json())
+    return flow
+
+
+def image_chain_flow(templates: list[dict], length: int, size: int) -> dict:
+    nodes = [new_node(templates[i % len(templates)]) for i in range(length)]
+    nodes[0]['data']['inputs'][0]['data'] = cached_image(size, size)
+    return {'nodes': nodes, 'edges': [edge(a, 0, b, 0) for a, b in zip(nodes, nodes[1:])]}
+
+
+def shapes(node_classes: dict, scale: int) -> dict[str, Callable[[], dict]]:
+    '''the flows to time by name, scale multiplies their size'''
+    add = node_template(node_classes, 'AddNode')
+    join = node_template(node_classes, 'JoinNode')
+    return {
+        'math_chain': lambda: chain_flow(add, 500 * scale),
+        'math_fan_out': lambda: fan_out_flow(add, add, 500 * scale),
+        'math_diamonds': lambda: diamonds_flow(node_template(node_classes, 'SplitNode'), add, 250 * scale),
+        'text_chain': lambda: chain_flow(join, 500 * scale),
+        'nested_lists': lambda: nested_lists_flow(node_template(node_classes, 'AddListNode'), 20 * scale, 8),
+        'image_chain': lambda: image_chain_flow(
+            [node_template(node_classes, 'BlurImageNode'), node_template(node_classes, 'FlipHorizontallyNode')],
+            8 * scale, 512,
+        ),
+    }
+
+
+def run(flow: dict, node_classes: dict, profile: bool) -> ExecutionWrapper:
+    '''runs a flow on a fresh engine, it is modified in place'''
+    BaseNode.result_cache.clear()
+    wrapper = ExecutionWrapper()
+    wrapper.node_classes = node_classes
+    wrapper.set_websocket(FakeWebSocket())
+    if profile:
+        wrapper.profile = 'nodes'
+        wrapper.profile_allocations = False
+    try:
+        asyncio.run(wrapper.execute_graph(flow, quiet=True))
+    finally:
+        wrapper.shutdown()
+    return wrapper
+
+
+def measure(flow: dict, node_classes: dict) -> dict[str, float]:
+    best: dict[str, float] = {}
+    for _ in range(REPEATS):
+        flow_copy = copy.deepcopy(flow)
+        start = time.perf_counter()
+        wrapper = run(flow_copy, node_classes, profile=True)
+        total = (time.perf_counter() - start) * 1000
+        profile = wrapper.last_profile
+        timings = {
+            **profile['phases'],
+            'serialize_ms': sum(node['serialize_ms'] for node in profile['nodes'].values()),
+            'total_ms': total,
+        }
+        for phase, value in timings.items():
+            best[phase] = min(best.get(phase, value), value)
+
+    tracemalloc.start()
+    try:
+        run(copy.deepcopy(flow), node_classes, profile=False)
+        best['peak_mb'] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='times runs of synthetic flows')
+    parser.add_argument('--scale', type=int, default=1, help='multiplies the size of every flow')
+    parser.add_argument('--shapes', nargs='+', help='only these shapes')
+    parser.add_argument('--save', action='store_true', help='save the results as the baseline')
+    parser.add_argument('--compare', action='store_true', help='compare the results with the baseline')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    args = parser.parse_args()
+
+    node_classes = load_node_classes()
+    flows = shapes(node_classes, args.scale)
+    baseline = {}
+    if args.compare:
+        baseline = load_baseline(args.baseline)
+        if baseline.get('scale') != args.scale:
+            print(f"The baseline was saved at scale {baseline.get('scale')}, not {args.scale}")
+
+    print(f"{'shape':>14} {'nodes':>6} " + ' '.join(f'{phase:>13}' for phase in PHASES))
+    results = {}
+    for name, make_flow in flows.items():
+        if args.shapes and name not in args.shapes:
+            continue
+        flow = make_flow()
+        results[name] = measure(flow, node_classes)
+        line = f"{name:>14} {len(flow['nodes']):>6} " + ' '.join(f'{results[name][phase]:>13.2f}' for phase in PHASES)
+        before = baseline.get('results', {}).get(name, {}).get('total_ms')
+        if before:
+            line += f"  {results[name]['total_ms'] / before:.2f}x baseline"
+        print(line)
+
+    if args.save:
+        # saving some shapes keeps the baseline of the others
+        save_baseline(args.baseline, results, merge=bool(args.shapes), scale=args.scale)
+
+    if args.compare:
+        regressions = find_regressions(
+            results, baseline, ignore=lambda phase, before: phase.endswith('_ms') and before < MIN_COMPARED_MS
+        )
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+'''measures how graph compilation and edge routing scale with the size of the graph
+
+run with: python -m benchmarks.graph_routing
+'''
+import asyncio
+import copy
+import time
+
+from pne_backend.execution_wrapper import ExecutionWrapper
+from pne_backend.graph import CompiledGraph
+
+from .common import FakeWebSocket, chain_flow, load_node_classes, node_template
+
+SIZES = [1000, 2500, 5000, 10000]
+
+
+def main():
+    node_classes = load_node_classes()
+    template = node_template(node_classes, 'AddNode')
+
+    print(f"{'nodes':>8} {'compile (s)':>12} {'us/node':>8} {'execute (s)':>12} {'us/node':>8}")
+    for size in SIZES:
+        flow = chain_flow(template, size)
+
+        start = time.perf_counter()
+        CompiledGraph(flow['nodes'], flow['edges'])
+        compile_time = time.perf_counter() - start
+
+        wrapper = ExecutionWrapper()
+        wrapper.node_classes = node_classes
+        wrapper.set_websocket(FakeWebSocket())
+        start = time.perf_counter()
+        asyncio.run(wrapper.execute_graph(copy.deepcopy(flow), quiet=True))
+        execute_time = time.perf_counter() - start
+
+        print(
+            f"{size:>8} {compile_time:>12.4f} {compile_time / size * 1e6:>8.1f} "
+            f"{execute_time:>12.4f} {execute_time / size * 1e6:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
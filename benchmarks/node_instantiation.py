@@ -0,0 +1,49 @@
+'''compares instantiating nodes with a full model_validate against the per-class prototype path
+
+run with: python -m benchmarks.node_instantiation
+'''
+import copy
+import time
+
+from pne_backend.prototype import get_prototype
+from pne_backend.utils import node_registry
+
+from .common import load_node_classes, new_node, node_template
+
+COUNT = 10000
+CLASS_NAMES = ['AddNode', 'JoinNode', 'BlurImageNode']
+
+
+def timed(instantiate, nodes: list[dict]) -> float:
+    # instantiation mutates nothing, but copy anyway so both paths see identical input
+    nodes = copy.deepcopy(nodes)
+    start = time.perf_counter()
+    for node in nodes:
+        instantiate(node)
+    return time.perf_counter() - start
+
+
+def main():
+    node_classes = load_node_classes()
+    registry = node_registry(node_classes)
+
+    print(f"{'node':>14} {'validate (s)':>13} {'prototype (s)':>14} {'us/node':>8} {'speedup':>8}")
+    for class_name in CLASS_NAMES:
+        template = node_template(node_classes, class_name)
+        NodeClass = registry[(template['data']['namespace'], class_name)]
+        nodes = [new_node(template) for _ in range(COUNT)]
+
+        validate_time = timed(
+            lambda node: NodeClass.model_validate(node, context={'state': 'deserializing'}), nodes
+        )
+        prototype = get_prototype(NodeClass)
+        prototype_time = timed(prototype.instantiate, nodes)
+
+        print(
+            f"{class_name:>14} {validate_time:>13.3f} {prototype_time:>14.3f} "
+            f"{prototype_time / COUNT * 1e6:>8.1f} {validate_time / prototype_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+'''measures the speedup of running independent image branches on the worker pool
+
+run with: python -m benchmarks.parallel_branches
+'''
+import asyncio
+import copy
+import os
+import time
+
+from pne_backend.base_node import BaseNode
+from pne_backend.execution_wrapper import ExecutionWrapper
+
+from .common import FakeWebSocket, branches_flow, cached_image, load_node_classes, node_template
+
+BRANCHES = 16
+IMAGE_SIZE = 1024
+
+
+def run(flow: dict, node_classes: dict, max_workers: int) -> float:
+    # every run executes the nodes, rather than taking the previous run's results from the cache
+    BaseNode.result_cache.clear()
+    wrapper = ExecutionWrapper(max_workers=max_workers)
+    wrapper.node_classes = node_classes
+    wrapper.set_websocket(FakeWebSocket())
+    start = time.perf_counter()
+    asyncio.run(wrapper.execute_graph(copy.deepcopy(flow), quiet=True))
+    duration = time.perf_counter() - start
+    wrapper.shutdown()
+    return duration
+
+
+def main():
+    node_classes = load_node_classes()
+    templates = [
+        node_template(node_classes, 'BlurImageNode'),
+        node_template(node_classes, 'FlipHorizontallyNode'),
+    ]
+    flow = branches_flow(templates, BRANCHES, lambda: cached_image(IMAGE_SIZE, IMAGE_SIZE))
+
+    baseline = run(flow, node_classes, max_workers=1)
+    print(f"{'workers':>8} {'time (s)':>10} {'speedup':>8}")
+    print(f"{1:>8} {baseline:>10.3f} {1.0:>8.2f}")
+    workers = 2
+    while workers <= (os.cpu_count() or 1):
+        duration = run(flow, node_classes, max_workers=workers)
+        print(f"{workers:>8} {duration:>10.3f} {baseline / duration:>8.2f}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
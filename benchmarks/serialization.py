@@ -0,0 +1,51 @@
+'''compares round trips of array payloads encoded as json lists, base64 buffers and binary frames
+
+run with: python -m benchmarks.serialization
+'''
+import time
+
+import numpy as np
+
+from pne_backend.base_data import BaseData
+from pne_backend.datatypes.image import ImageData
+
+SIZES = [64, 256, 1024, 2048]
+ENCODINGS = ['list', 'base64', 'binary']
+REPEATS = 3
+
+
+def round_trip(image: ImageData, encoding: str) -> tuple[float, float, int]:
+    '''returns the best dump time, load time and bytes on the wire over a few repeats'''
+    dump_times, load_times = [], []
+    for _ in range(REPEATS):
+        frames = []
+        start = time.perf_counter()
+        dumped = image.model_dump_json(context={'array_encoding': encoding, 'binary_frames': frames})
+        dump_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        loaded = ImageData.model_validate_json(dumped, context={'binary_frames': frames})
+        load_times.append(time.perf_counter() - start)
+
+    assert np.array_equal(loaded.payload, image.payload)
+    size = len(dumped) + sum(len(frame) for frame in frames)
+    return min(dump_times), min(load_times), size
+
+
+def main():
+    # keep every payload inline instead of in the large data cache
+    BaseData.max_file_size_mb = float('inf')
+
+    print(f"{'size':>10} {'encoding':>9} {'dump (ms)':>10} {'load (ms)':>10} {'MB sent':>8}")
+    for size in SIZES:
+        image = ImageData(payload=np.random.randint(0, 255, (size, size, 3), dtype=np.uint8))
+        for encoding in ENCODINGS:
+            dump_time, load_time, nbytes = round_trip(image, encoding)
+            print(
+                f"{f'{size}x{size}':>10} {encoding:>9} {dump_time * 1000:>10.1f} "
+                f"{load_time * 1000:>10.1f} {nbytes / 1024 / 1024:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
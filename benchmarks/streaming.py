@@ -0,0 +1,78 @@
+'''measures how a high frequency streaming node reaches the client at different update intervals:
+messages sent, client-visible latency of the streamed value and server cpu time
+
+run with: python -m benchmarks.streaming
+'''
+import asyncio
+import json
+import time
+
+from pne_backend.base_node import StreamingBaseNode, node_definition
+from pne_backend.datatypes.basic import FloatData, IntData
+from pne_backend.execution_wrapper import ExecutionWrapper
+from pne_backend.field import InputNodeField, OutputNodeField
+
+from .common import FakeWebSocket
+
+YIELDS = 50000
+INTERVALS = [0, 0.01, 0.05, 0.1]
+
+
+class TimestampStreamNode(StreamingBaseNode):
+    '''yields as fast as it can, each partial output is the time it was produced'''
+
+    @classmethod
+    @node_definition(
+        inputs=[InputNodeField(label='yields', allowed_types=['IntData'], data=IntData(payload=YIELDS))],
+        outputs=[OutputNodeField(label='produced_at', allowed_types=['FloatData'])]
+    )
+    def exec_stream(cls, yields: IntData):
+        for i in range(yields.payload):
+            yield {'progress': i / yields.payload, 'outputs': [FloatData(payload=time.perf_counter())]}
+
+TimestampStreamNode.definition_path = ''
+
+
+class LatencyWebSocket(FakeWebSocket):
+    '''records how old the streamed value is when its update is sent'''
+
+    def __init__(self):
+        super().__init__()
+        self.latencies = []
+
+    async def send_text(self, text: str):
+        sent = time.perf_counter()
+        await super().send_text(text)
+        message = json.loads(text)
+        if message['event'] == 'single_node_update':
+            node = json.loads(message['node'])
+            if node['data']['status'] == 'streaming':
+                self.latencies.append(sent - node['data']['outputs'][0]['data']['payload'])
+
+
+def run(interval: float) -> tuple[LatencyWebSocket, float, float]:
+    node = json.loads(TimestampStreamNode(id='stream').model_dump_json())
+    wrapper = ExecutionWrapper(stream_update_interval=interval)
+    wrapper.node_classes = {node['data']['namespace']: [TimestampStreamNode]}
+    websocket = LatencyWebSocket()
+    wrapper.set_websocket(websocket)
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    asyncio.run(wrapper.execute_graph({'nodes': [node], 'edges': []}, quiet=True))
+    return websocket, time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+
+def main():
+    print(f"{YIELDS} yields")
+    print(f"{'interval (s)':>12} {'messages':>9} {'wall (s)':>9} {'cpu (s)':>8} {'mean lat (ms)':>14} {'max lat (ms)':>13}")
+    for interval in INTERVALS:
+        websocket, wall, cpu = run(interval)
+        latencies = websocket.latencies or [0]
+        print(
+            f"{interval:>12} {websocket.messages:>9} {wall:>9.3f} {cpu:>8.3f} "
+            f"{sum(latencies) / len(latencies) * 1000:>14.2f} {max(latencies) * 1000:>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
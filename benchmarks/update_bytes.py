@@ -0,0 +1,96 @@
+'''compares the bytes sent to the client with full node updates and with node deltas,
+on tests/materials/test_w_images.json and on wider versions of it
+
+run with: python -m benchmarks.update_bytes
+'''
+import asyncio
+import copy
+import json
+import os
+import uuid
+
+import numpy as np
+
+from pne_backend.datatypes.image import ImageData, image_from_base64
+from pne_backend.execution_wrapper import ExecutionWrapper
+
+from .common import FakeWebSocket, load_node_classes, node_template
+
+MATERIAL = os.path.join(os.path.dirname(__file__), '..', 'tests', 'materials', 'test_w_images.json')
+WIDTHS = [1, 8, 32]
+
+
+def field_index(fields: list[dict], label: str) -> int:
+    return next(i for i, field in enumerate(fields) if label in (field['label'], field.get('user_label')))
+
+
+def material_flow(node_classes: dict, width: int = 1) -> dict:
+    '''the material flow rebuilt with the current node definitions.
+
+    it predates the current handle and data formats, so its nodes are recreated from their
+    templates with the same ids and its embedded png is decoded into an ImageData.
+    width copies of the last node hang off the first, for a wider graph
+    '''
+    with open(MATERIAL) as f:
+        material = json.load(f)
+
+    nodes = {}
+    for old in material['nodes']:
+        node = node_template(node_classes, old['data']['class_name'])
+        node['id'] = old['id']
+        for old_input, new_input in zip(old['data']['inputs'], node['data']['inputs']):
+            if isinstance(old_input['data'], str):
+                image = np.array(image_from_base64(old_input['data']).convert('RGB'))
+                new_input['data'] = json.loads(ImageData(payload=image).model_dump_json())
+            elif old_input['data'] is not None:
+                new_input['data']['payload'] = old_input['data']
+        nodes[node['id']] = node
+
+    edges = []
+    for old in material['edges']:
+        source, target = nodes[old['source']], nodes[old['target']]
+        source_label = old['sourceHandle'].split('-output-')[-1]
+        target_label = old['targetHandle'].split('-input-')[-1]
+        targets = [target] + [dict(copy.deepcopy(target), id=str(uuid.uuid4())) for _ in range(width - 1)]
+        for node in targets[1:]:
+            nodes[node['id']] = node
+        for node in targets:
+            source_index = field_index(source['data']['outputs'], source_label)
+            target_index = field_index(node['data']['inputs'], target_label)
+            edges.append({
+                'source': source['id'],
+                'sourceHandle': f"{source['id']}:outputs:{source_index}:handle",
+                'target': node['id'],
+                'targetHandle': f"{node['id']}:inputs:{target_index}:handle",
+            })
+    return {'nodes': list(nodes.values()), 'edges': edges}
+
+
+def run(flow: dict, node_classes: dict, update_mode: str, array_encoding: str) -> FakeWebSocket:
+    wrapper = ExecutionWrapper()
+    wrapper.node_classes = node_classes
+    wrapper.update_mode = update_mode
+    wrapper.array_encoding = array_encoding
+    websocket = FakeWebSocket()
+    wrapper.set_websocket(websocket)
+    asyncio.run(wrapper.execute_graph(copy.deepcopy(flow), quiet=True))
+    return websocket
+
+
+def main():
+    node_classes = load_node_classes()
+
+    print(f"{'nodes':>6} {'encoding':>9} {'full (KB)':>10} {'delta (KB)':>11} {'reduction':>10}")
+    for width in WIDTHS:
+        flow = material_flow(node_classes, width)
+        for array_encoding in ('list', 'binary'):
+            full = run(flow, node_classes, 'full', array_encoding)
+            delta = run(flow, node_classes, 'delta', array_encoding)
+            print(
+                f"{len(flow['nodes']):>6} {array_encoding:>9} {full.bytes_sent / 1024:>10.1f} "
+                f"{delta.bytes_sent / 1024:>11.1f} {full.bytes_sent / delta.bytes_sent:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import argparse
+import sys
+import time
+
+from .runner import NODES_MODULE, FlowFailed, run_flow, write_outputs
+from .utils import find_and_load_classes
+
+
+def run(args: argparse.Namespace) -> int:
+    start = time.time()
+    node_classes = find_and_load_classes(args.nodes)
+    try:
+        results = run_flow(args.flow, outputs=args.output, node_classes=node_classes, quiet=not args.verbose)
+    except FlowFailed as e:
+        for node_id, error in e.errors.items():
+            print(f"{node_id}: {error}", file=sys.stderr)
+        print(e, file=sys.stderr)
+        return 1
+    except KeyError as e:
+        # an output that isn't in the flow
+        print(e.args[0], file=sys.stderr)
+        return 1
+
+    if args.out_dir:
+        for path in write_outputs(results, args.out_dir):
+            print(f"Wrote {path}")
+    else:
+        for node_id, outputs in results.items():
+            for label, data in outputs.items():
+                print(f"{node_id}:{label} = {data!r:.200}")
+    print(f"Ran {args.flow} in {time.time() - start:.2f} seconds")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m pne_backend', description='runs node editor flows without the editor')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='executes a saved flow')
+    run_parser.add_argument('flow', help='a flow json saved by the editor')
+    run_parser.add_argument(
+        '-o', '--output', action='append',
+        help='node_id or node_id:output to keep, can be repeated. defaults to the nodes that feed nothing',
+    )
+    run_parser.add_argument('-d', '--out-dir', help='writes the outputs here instead of printing them')
+    run_parser.add_argument('--nodes', default=NODES_MODULE, help='the package to load node classes from')
+    run_parser.add_argument('-v', '--verbose', action='store_true', help='prints the execution timings')
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,31 @@
+import atexit
+import os
+import tempfile
 from typing import Any, ClassVar, Union, Callable, Optional, Dict, Type
-from pydantic import BaseModel, computed_field, model_validator,model_serializer, Field, ValidationInfo
-from sys import getsizeof
+from pydantic import BaseModel, computed_field, model_validator,model_serializer, Field, ValidationInfo, PrivateAttr, SerializationInfo
 from functools import cached_property
 import uuid
+import numpy as np
 
+from .hashing import content_hash
+from .transport import encode_array, decode_array, is_encoded_array
+from .cache import LargeDataCache, process_spill_dir
+from .sizing import deep_sizeof
 
-LARGE_DATA_CACHE = {}
+
+# memory budget for payloads too large to send to the frontend
+LARGE_DATA_CACHE_MAX_MB = 2048
+# evicted arrays are spilled under here (set to None to drop them) within their own budget.
+# every process spills to its own directory, those left by processes that are gone are removed
+LARGE_DATA_SPILL_DIR = os.path.join(tempfile.gettempdir(), 'pne_large_data')
+LARGE_DATA_SPILL_MAX_MB = 8192
+
+LARGE_DATA_CACHE = LargeDataCache(
+    max_bytes=LARGE_DATA_CACHE_MAX_MB * 1024 * 1024,
+    spill_dir=process_spill_dir(LARGE_DATA_SPILL_DIR) if LARGE_DATA_SPILL_DIR else None,
+    max_spill_bytes=LARGE_DATA_SPILL_MAX_MB * 1024 * 1024,
+)
+atexit.register(LARGE_DATA_CACHE.close)
 
 CLASS_REGISTRY: Dict[str, Type[BaseModel]] = {}
 
@@ -19,12 +39,11 @@ def cache_key_exists(id: str) -> bool:
 
 
 def cache_get(id: str) -> Any:
-    return LARGE_DATA_CACHE[id]
+    return LARGE_DATA_CACHE.get(id)
 
 
 def cache_set(id: str, data: Any) -> None:
-    LARGE_DATA_CACHE.update({id: data})
-    return True
+    return LARGE_DATA_CACHE.set(id, data)
 
 
 class BaseData(BaseModel):
@@ -40,6 +59,34 @@ class BaseData(BaseModel):
     cache_key_exists: ClassVar[Callable] = None
     # cache_dict: ClassVar[dict] = None
 
+    # fields that identify or describe an instance rather than its content
+    identity_fields: ClassVar[set[str]] = {'id', 'preview', 'metadata'}
+
+    _content_hash: Optional[str] = PrivateAttr(default=None)
+    _nbytes: Optional[int] = PrivateAttr(default=None)
+
+    def __setattr__(self, name, value):
+        if name == 'payload':
+            # the payload was replaced, so anything derived from it is stale
+            self._content_hash = None
+            self._nbytes = None
+        super().__setattr__(name, value)
+
+    def payload_nbytes(self) -> int:
+        '''the memory held by the payload, including array buffers and nested data.
+        it is memoized like the content hash'''
+        if self._nbytes is None:
+            self._nbytes = deep_sizeof(self.payload)
+        return self._nbytes
+
+    def content_hash(self) -> str:
+        '''a stable hash of the class and payload, equal for equal data regardless of id.
+        it is memoized, so payloads are treated as immutable once hashed'''
+        if self._content_hash is None:
+            content = {k: v for k, v in self.__dict__.items() if k not in self.identity_fields}
+            self._content_hash = content_hash([self.__class__.__name__, content])
+        return self._content_hash
+
     @computed_field(repr=True)
     @property
     def class_name(self) -> str:
@@ -61,7 +108,7 @@ class BaseData(BaseModel):
     @computed_field(repr=True)
     @property
     def size_mb(self) -> float:
-        return round(getsizeof(self.payload) / 1024 / 1024, 2)
+        return round(self.payload_nbytes() / 1024 / 1024, 2)
     
     # @computed_field(repr=True)
     # @property
@@ -103,14 +150,18 @@ class BaseData(BaseModel):
 
             # if the id is not in the cache, deserialize the data
             else:
+                payload = input_values['payload']
+                # arrays sent as a raw buffer (base64 or a binary frame) with dtype and shape
+                if is_encoded_array(payload):
+                    payload = decode_array(payload, context.get('binary_frames'))
                 # if the payload is already the correct type
-                input_values['payload'] = cls.deserialize_payload(input_values['payload'])  
+                input_values['payload'] = cls.deserialize_payload(payload)  
 
         
             return input_values
     
     @model_serializer()
-    def serialize(self):
+    def serialize(self, info: SerializationInfo):
         # get the computed and non-computed fields in a dict
         self_as_dict = {k: getattr(self, k) for k in self.model_computed_fields}
         self_as_dict |= self.__dict__.copy()
@@ -122,7 +173,13 @@ class BaseData(BaseModel):
 
 
         else:
-            self_as_dict['payload'] = self.__class__.serialize_payload(self.payload)
+            # the serialization context can ask for arrays as raw buffers instead of lists
+            context = info.context or {}
+            array_encoding = context.get('array_encoding', 'list')
+            if isinstance(self.payload, np.ndarray) and array_encoding != 'list':
+                self_as_dict['payload'] = encode_array(self.payload, array_encoding, context.get('binary_frames'))
+            else:
+                self_as_dict['payload'] = self.__class__.serialize_payload(self.payload)
             # remove the preview field from the dict
             self_as_dict.pop('preview')
 
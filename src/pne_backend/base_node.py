@@ -2,9 +2,16 @@ from pydantic import BaseModel, Field
 from typing import List, Literal, ClassVar, Optional
 import uuid
 import sys
+import threading
+from contextvars import ContextVar
 from io import StringIO
 
 from .field import InputNodeField, OutputNodeField
+from .cache import SizedLRUCache
+from .sizing import deep_sizeof
+from .hashing import content_hash, UnhashableContent
+
+RESULT_CACHE_MAX_MB = 512
 
 def node_definition(inputs: list[InputNodeField], outputs: list[OutputNodeField]):
     '''decorator to define the inputs and outputs of a node'''
@@ -21,20 +28,87 @@ def node_definition(inputs: list[InputNodeField], outputs: list[OutputNodeField]
         return wrapper
     return decorator
 
+class ExecutionCancelled(Exception):
+    pass
+
+
+# set by the execution wrapper for the duration of a run, visible inside node execution
+current_cancel_event: ContextVar[Optional[threading.Event]] = ContextVar('current_cancel_event', default=None)
+
+
+def check_cancelled():
+    '''raises ExecutionCancelled if the run executing this node was cancelled,
+    long running nodes call this periodically so a cancel takes effect mid-node'''
+    event = current_cancel_event.get()
+    if event is not None and event.is_set():
+        raise ExecutionCancelled("Execution was cancelled")
+
+
+_capture_lock = threading.Lock()
+_capture_local = threading.local()
+_active_captures = 0
+
+
+class _CaptureRouter:
+    '''stands in for sys.stdout/sys.stderr while captures are active,
+    so nodes running on different threads only capture their own output'''
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    def _target(self):
+        return getattr(_capture_local, 'capture', None) or self.fallback
+
+    def write(self, message):
+        return self._target().write(message)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self.fallback, name)
+
+
+# routers by id of the stream they stand in for. print holds sys.stdout without a reference of
+# its own while it writes, so a router swapped out by a capture ending on another thread must
+# stay alive, they are made once per stream and reused
+_routers: dict[int, _CaptureRouter] = {}
+
+
+def _router_for(stream) -> _CaptureRouter:
+    router = _routers.get(id(stream))
+    if router is None:
+        router = _routers[id(stream)] = _CaptureRouter(stream)
+    return router
+
+
 class CaptureOutput:
     def __init__(self):
         self.stdout = StringIO()
         self.stderr = StringIO()
 
     def __enter__(self):
-        self.old_stdout, self.old_stderr = sys.stdout, sys.stderr
-        sys.stdout = self
-        sys.stderr = self
+        global _active_captures
+        with _capture_lock:
+            if _active_captures == 0 or not isinstance(sys.stdout, _CaptureRouter):
+                sys.stdout = _router_for(sys.stdout)
+                sys.stderr = _router_for(sys.stderr)
+            _active_captures += 1
+            fallback = sys.stdout.fallback
+        self.previous_capture = getattr(_capture_local, 'capture', None)
+        self.old_stdout = self.previous_capture or fallback
+        _capture_local.capture = self
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        sys.stdout = self.old_stdout
-        sys.stderr = self.old_stderr
+        global _active_captures
+        _capture_local.capture = self.previous_capture
+        with _capture_lock:
+            _active_captures -= 1
+            if _active_captures == 0:
+                if isinstance(sys.stdout, _CaptureRouter):
+                    sys.stdout = sys.stdout.fallback
+                if isinstance(sys.stderr, _CaptureRouter):
+                    sys.stderr = sys.stderr.fallback
 
     def write(self, message):
         self.old_stdout.write(message)
@@ -46,6 +120,14 @@ class CaptureOutput:
 
     def get_output(self):
         return self.stdout.getvalue(), self.stderr.getvalue()
+
+
+def exec_in_process(NodeClass: type, exec_kwargs: dict):
+    '''runs a node's exec in a worker process, returning the results with the captured output'''
+    with CaptureOutput() as output:
+        results = NodeClass.exec(**exec_kwargs)
+        stdout, stderr = output.get_output()
+    return results, stdout, stderr
     
 class NodePosition(BaseModel):
     x: float
@@ -72,6 +154,8 @@ class BaseNodeData(BaseModel):
     definition_path: str = ''
     min_width: Optional[int] = 200
     max_width: Optional[int] = 800
+    # memory held by the node's outputs after execution
+    output_size_mb: float = 0
 
 
 
@@ -79,6 +163,13 @@ class BaseNode(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     data: BaseNodeData = BaseNodeData()
     group: str = ''
+
+    # cpu bound nodes that hold the GIL can be sent to a process pool instead of a thread
+    cpu_bound: ClassVar[bool] = False
+    # results are cached by input content, nodes that aren't deterministic
+    # (random, remote or time dependent results) set this to False
+    memoize: ClassVar[bool] = True
+    result_cache: ClassVar[SizedLRUCache] = None
     
 
 
@@ -139,14 +230,39 @@ class BaseNode(BaseModel):
             else:
                 self.data.outputs = getattr(self.__class__, 'exec')._outputs
 
+    def exec_kwargs(self) -> dict:
+        '''the keyword arguments the node's exec method is called with'''
+        return {inp.label: inp.data for inp in self.data.inputs}
+
+    def memo_key(self) -> Optional[tuple]:
+        '''the result cache key, the node class with the content hashes of its inputs'''
+        if not self.memoize or self.result_cache is None:
+            return None
+        try:
+            return (self.__class__, tuple(content_hash(inp.data) for inp in self.data.inputs))
+        except UnhashableContent:
+            return None
+
     def meta_exec(self):
         '''executes the node's exec method, captures the execution output and updates the ouput data(s)'''
-        exec_kwargs = {inp.label: inp.data for inp in self.data.inputs}
+        memo_key = self.memo_key()
+        if memo_key is not None:
+            cached = self.result_cache.get(memo_key)
+            if cached is not None:
+                return self.set_results(*cached)
+
         with CaptureOutput() as output:
-            results = self.exec(**exec_kwargs)
+            results = self.exec(**self.exec_kwargs())
             stdout, stderr = output.get_output()
-            self.data.terminal_output = stdout
-            self.data.error_output = stderr
+
+        if memo_key is not None:
+            self.result_cache.set(memo_key, (results, stdout, stderr))
+        return self.set_results(results, stdout, stderr)
+
+    def set_results(self, results, stdout: str, stderr: str):
+        '''stores the results of an exec call and its captured output on the node'''
+        self.data.terminal_output = stdout
+        self.data.error_output = stderr
 
         # nodes with only one output will return a single FieldData object
         if len(self.data.outputs) == 1:
@@ -154,9 +270,17 @@ class BaseNode(BaseModel):
 
         for outp, res in zip(self.data.outputs, results):
             outp.data = res
+        self.data.output_size_mb = round(self.output_nbytes() / 1024 / 1024, 2)
 
         return results
 
+    def output_nbytes(self) -> int:
+        '''the memory held by the data currently on the node's outputs'''
+        return sum(deep_sizeof(outp.data) for outp in self.data.outputs if outp.data is not None)
+
+BaseNode.result_cache = SizedLRUCache(RESULT_CACHE_MAX_MB * 1024 * 1024, sizeof=deep_sizeof)
+
+
 class StreamingNodeData(BaseNodeData):
     '''inherits from BaseNodeData and adds a progress attribute'''
     progress: float = 0
@@ -164,22 +288,43 @@ class StreamingNodeData(BaseNodeData):
 class StreamingBaseNode(BaseNode):
     '''enables data to be streamed during sequential execution of a node'''
     data: StreamingNodeData = StreamingNodeData(streaming=True)
+
+    # inputs exec_stream receives as an iterable of values rather than a single value.
+    # fed by a streaming node, they yield its partial outputs while it is still running
+    stream_inputs: ClassVar[tuple[str, ...]] = ()
     
-    def meta_exec_stream(self):
-        '''executes the node's exec_stream method, captures the execution output and updates the ouput data(s)'''
-        kwargs = {inp.label: inp.data for inp in self.data.inputs}
+    def meta_exec_stream(self, streams: Optional[dict] = None):
+        '''executes the node's exec_stream method, captures the execution output and updates the ouput data(s).
+        streams holds the iterables for pipelined stream inputs, the others iterate over their single value'''
+        kwargs = self.exec_kwargs()
+        for label in self.stream_inputs:
+            if streams and label in streams:
+                kwargs[label] = streams[label]
+            else:
+                kwargs[label] = iter([] if kwargs.get(label) is None else [kwargs[label]])
+        self.data.terminal_output = ''
+        self.data.error_output = ''
+        self.data.progress = 0
 
         with CaptureOutput() as output:
             for result in self.__class__.exec_stream(**kwargs):
+                check_cancelled()
                 self.data.progress = result.get('progress', 0)
                 outputs = result.get('outputs', [])
                 for outp, res in zip(self.data.outputs, outputs):
                     outp.data = res
-                stdout, stderr = output.get_output()
-                self.data.terminal_output += stdout
-                self.data.error_output += stderr
-                output.stdout = StringIO()  # Reset stdout capture
-                output.stderr = StringIO()  # Reset stderr capture
+                self.collect_stream_output(output)
                 yield result
+            # output printed after the last yield
+            self.collect_stream_output(output)
+
+        self.data.output_size_mb = round(self.output_nbytes() / 1024 / 1024, 2)
+        self.data.status = 'evaluated'
 
-        self.data.status = 'evaluated'
\ No newline at end of file
+    def collect_stream_output(self, output: CaptureOutput):
+        '''appends what was printed since the last yield to the node's output'''
+        stdout, stderr = output.get_output()
+        self.data.terminal_output += stdout
+        self.data.error_output += stderr
+        output.stdout = StringIO()  # Reset stdout capture
+        output.stderr = StringIO()  # Reset stderr capture
@@ -0,0 +1,151 @@
+import asyncio
+import copy
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, NamedTuple, Optional, Union
+
+from .base_data import BaseData
+from .execution_wrapper import MAX_WORKERS, ExecutionWrapper
+from .graph import parse_handle_key, resolve_slot
+from .runner import NODES_MODULE, FlowFailed, collect_outputs, default_outputs, failed_nodes, load_flow
+from .utils import find_and_load_classes
+
+# variants executing at once, their nodes share one worker pool
+BATCH_MAX_CONCURRENT = 4
+
+# node id -> input label (or index) -> a payload or a BaseData
+Overrides = dict[str, dict[str, Any]]
+
+
+class BatchResult(NamedTuple):
+    index: int
+    outputs: dict[str, dict[str, Any]]
+    errors: dict[str, str]
+
+
+def downstream_of(flow: dict, node_ids: set[str]) -> set[str]:
+    '''the given nodes and every node they feed, directly or not'''
+    targets: dict[str, list[str]] = {}
+    for edge in flow['edges']:
+        targets.setdefault(str(edge['source']), []).append(str(edge['target']))
+    found = set()
+    stack = list(node_ids)
+    while stack:
+        node_id = stack.pop()
+        if node_id not in found:
+            found.add(node_id)
+            stack.extend(targets.get(node_id, []))
+    return found
+
+
+def set_input(node: dict, key: str, value: Any):
+    '''sets an input of a serialized node to a BaseData, or replaces the payload of its data'''
+    inputs = node['data']['inputs']
+    index = resolve_slot(inputs, key)
+    if index is None:
+        raise KeyError(f"Node {node['id']} has no input {key}")
+    data = inputs[index].get('data')
+    if isinstance(value, BaseData):
+        inputs[index]['data'] = value
+    elif isinstance(data, dict):
+        # without the id the payload isn't looked up in the large data cache
+        inputs[index]['data'] = {k: v for k, v in data.items() if k != 'id'} | {'payload': value}
+    else:
+        raise ValueError(f"Input {key} of node {node['id']} has no data to set the payload of, pass a BaseData")
+
+
+def new_wrapper(node_classes: dict, executor: ThreadPoolExecutor, keep: set[str]) -> ExecutionWrapper:
+    wrapper = ExecutionWrapper(executor=executor)
+    wrapper.node_classes = node_classes
+    wrapper.keep_outputs = keep
+    return wrapper
+
+
+async def stream_batch(
+    flow: Union[dict, str, os.PathLike],
+    variants: list[Overrides],
+    outputs: Optional[list[str]] = None,
+    node_classes: Optional[dict] = None,
+    max_concurrent: int = BATCH_MAX_CONCURRENT,
+    max_workers: int = MAX_WORKERS,
+) -> AsyncIterator[BatchResult]:
+    '''runs a flow once per set of input overrides, yielding each variant's outputs as it finishes.
+
+    the nodes no override reaches are run once, before the variants, and their outputs are handed
+    to every variant. the rest of the flow runs for each variant, max_concurrent at a time on one
+    pool of max_workers threads. raises FlowFailed if the shared nodes fail, errors of a variant
+    are in its result
+    '''
+    flow = load_flow(flow)
+    node_classes = node_classes if node_classes is not None else find_and_load_classes(NODES_MODULE)
+    outputs = default_outputs(flow) if outputs is None else outputs
+    nodes = {str(node['id']): node for node in flow['nodes']}
+    for overrides in variants:
+        for node_id in overrides:
+            if node_id not in nodes:
+                raise KeyError(f"No node {node_id} in the flow")
+
+    varying = downstream_of(flow, {node_id for overrides in variants for node_id in overrides})
+    shared_edges = [e for e in flow['edges'] if str(e['target']) not in varying]
+    variant_edges = [e for e in flow['edges'] if str(e['source']) in varying]
+    boundary = [e for e in flow['edges'] if str(e['source']) not in varying and str(e['target']) in varying]
+    shared_outputs = [spec for spec in outputs if spec.partition(':')[0] not in varying]
+    variant_outputs = [spec for spec in outputs if spec.partition(':')[0] in varying]
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pne-batch')
+    try:
+        shared = new_wrapper(
+            node_classes, executor,
+            keep={str(e['source']) for e in boundary} | {spec.partition(':')[0] for spec in shared_outputs},
+        )
+        shared_flow = {'nodes': [n for id, n in nodes.items() if id not in varying], 'edges': shared_edges}
+        await shared.execute_graph(copy.deepcopy(shared_flow), quiet=True, headless=True)
+        errors = failed_nodes(shared.node_instances)
+        if errors:
+            raise FlowFailed(errors)
+        shared_results = collect_outputs(shared.node_instances, shared_outputs)
+
+        semaphore = asyncio.Semaphore(max_concurrent)
+
+        async def run_variant(index: int, overrides: Overrides) -> BatchResult:
+            async with semaphore:
+                variant_nodes = {id: copy.deepcopy(node) for id, node in nodes.items() if id in varying}
+                # the shared outputs stand in for the edges from the shared nodes
+                for edge in boundary:
+                    source = shared.node_instances.get(str(edge['source']))
+                    output_index = resolve_slot(source.data.outputs, parse_handle_key(edge['sourceHandle'])) if source else None
+                    if output_index is not None:
+                        target = variant_nodes[str(edge['target'])]
+                        set_input(target, parse_handle_key(edge['targetHandle']), source.data.outputs[output_index].data)
+                for node_id, values in overrides.items():
+                    for key, value in values.items():
+                        set_input(variant_nodes[node_id], key, value)
+
+                wrapper = new_wrapper(node_classes, executor, keep={spec.partition(':')[0] for spec in variant_outputs})
+                await wrapper.execute_graph(
+                    {'nodes': list(variant_nodes.values()), 'edges': variant_edges}, quiet=True, headless=True
+                )
+                return BatchResult(
+                    index,
+                    shared_results | collect_outputs(wrapper.node_instances, variant_outputs),
+                    failed_nodes(wrapper.node_instances),
+                )
+
+        tasks = [asyncio.ensure_future(run_variant(i, overrides)) for i, overrides in enumerate(variants)]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            for task in tasks:
+                task.cancel()
+    finally:
+        executor.shutdown(wait=False)
+
+
+def run_batch(flow: Union[dict, str, os.PathLike], variants: list[Overrides], **kwargs) -> list[BatchResult]:
+    '''stream_batch for scripts, the results in the order of the variants'''
+
+    async def collect():
+        return [result async for result in stream_batch(flow, variants, **kwargs)]
+
+    return sorted(asyncio.run(collect()), key=lambda result: result.index)
@@ -0,0 +1,219 @@
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+import numpy as np
+
+from .sizing import deep_sizeof
+
+
+class SizedLRUCache:
+    '''a least recently used cache bounded by the total size of its values in bytes'''
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[Any], int] = deep_sizeof):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # nodes run on a thread pool, so the cache is shared between threads
+        self.lock = threading.RLock()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self.lock:
+            return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key][0]
+
+    def set(self, key: Hashable, value: Any) -> bool:
+        '''stores a value, evicting the least recently used entries to stay within budget.
+        values larger than the whole budget are not stored'''
+        size = self.sizeof(value)
+        evicted = []
+        with self.lock:
+            if key in self.entries:
+                self.current_bytes -= self.entries.pop(key)[1]
+            if size > self.max_bytes:
+                return False
+            self.entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                evicted_key, (evicted_value, evicted_size) = self.entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+                evicted.append((evicted_key, evicted_value))
+        # outside the lock, spilling an entry can take a while
+        for evicted_key, evicted_value in evicted:
+            self.on_evict(evicted_key, evicted_value)
+        return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self.lock:
+            if key not in self.entries:
+                return default
+            value, size = self.entries.pop(key)
+            self.current_bytes -= size
+            return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+
+    def on_evict(self, key: Hashable, value: Any):
+        '''called for every entry pushed out of the cache, without the lock held, subclasses can
+        spill it elsewhere'''
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self.entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+def process_spill_dir(root: str) -> str:
+    '''a spill directory of this process under root, removing those of processes that are gone'''
+    if os.path.isdir(root):
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if name.isdigit() and process_alive(int(name)):
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                discard_file(path)
+    return os.path.join(root, str(os.getpid()))
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class LargeDataCache(SizedLRUCache):
+    '''holds the payloads of data too large to send to the frontend, which refers to them by id.
+
+    when the memory budget is exceeded the least recently used payloads are evicted,
+    arrays are spilled to .npy files first so an id the frontend still holds can be
+    revived as a memory-mapped array. spilled files are bounded by their own budget.
+    files are written without the lock held, the payload is served from memory meanwhile
+    '''
+
+    def __init__(self, max_bytes: int, spill_dir: Optional[str] = None, max_spill_bytes: int = 0, **kwargs):
+        super().__init__(max_bytes, **kwargs)
+        self.spill_dir = spill_dir
+        self.max_spill_bytes = max_spill_bytes
+        self.spilled: OrderedDict[Hashable, tuple[str, int]] = OrderedDict()
+        # evicted arrays being written to disk
+        self.spilling: dict[Hashable, np.ndarray] = {}
+        self.spilled_bytes = 0
+        self.spills = 0
+        self.revivals = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self.lock:
+            return key in self.entries or key in self.spilling or key in self.spilled
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self.lock:
+            if key in self.spilling:
+                self.hits += 1
+                return self.spilling[key]
+            if key in self.entries or key not in self.spilled:
+                return super().get(key, default)
+            path, _ = self.spilled[key]
+            self.spilled.move_to_end(key)
+            self.hits += 1
+            self.revivals += 1
+        # copy-on-write, so a node modifying its input doesn't modify the file
+        return np.load(path, mmap_mode='c')
+
+    def set(self, key: Hashable, value: Any) -> bool:
+        with self.lock:
+            self.spilling.pop(key, None)
+            self.remove_spilled(key)
+        if super().set(key, value):
+            return True
+        # too large to hold in memory at all, spill it straight away
+        self.on_evict(key, value)
+        return key in self
+
+    def on_evict(self, key: Hashable, value: Any):
+        if not self.spill_dir or not isinstance(value, np.ndarray) or value.nbytes > self.max_spill_bytes:
+            return
+        with self.lock:
+            self.spilling[key] = value
+        path = os.path.join(self.spill_dir, f'{uuid.uuid4()}.npy')
+        np.save(path, value)
+        with self.lock:
+            # the key was set again or removed while the file was written
+            if self.spilling.get(key) is not value:
+                discard_file(path)
+                return
+            del self.spilling[key]
+            self.spilled[key] = (path, value.nbytes)
+            self.spilled_bytes += value.nbytes
+            self.spills += 1
+            while self.spilled_bytes > self.max_spill_bytes:
+                self.remove_spilled(next(iter(self.spilled)))
+
+    def remove_spilled(self, key: Hashable):
+        if key not in self.spilled:
+            return
+        path, nbytes = self.spilled.pop(key)
+        self.spilled_bytes -= nbytes
+        discard_file(path)
+
+    def clear(self):
+        with self.lock:
+            super().clear()
+            self.spilling.clear()
+            for key in list(self.spilled):
+                self.remove_spilled(key)
+
+    def close(self):
+        '''clears the cache and removes the spill directory'''
+        self.clear()
+        if self.spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def stats(self) -> dict:
+        return super().stats() | {
+            'spilled_entries': len(self.spilled),
+            'spilled_bytes': self.spilled_bytes,
+            'spills': self.spills,
+            'revivals': self.revivals,
+        }
+
+
+def discard_file(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
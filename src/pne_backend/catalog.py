@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import asyncio
+import hashlib
+import importlib
+import threading
+from typing import Awaitable, Callable, Optional
+
+try:
+    import watchfiles
+except ImportError:
+    watchfiles = None
+
+from .base_node import BaseNode
+from .utils import find_and_load_classes, load_node_module
+
+
+def without_ids(value):
+    if isinstance(value, dict):
+        return {k: without_ids(v) for k, v in value.items() if k != 'id'}
+    if isinstance(value, list):
+        return [without_ids(v) for v in value]
+    return value
+
+
+def serialize_node(node_class: type[BaseNode]) -> dict:
+    instance: BaseNode = node_class(id='')
+    return instance.model_dump()
+
+
+class NodeCatalog:
+    '''the loaded node classes and their serialized definitions for the frontend.
+
+    loading imports every node module and instantiates every node, so the result is
+    kept until a node module changes on disk (or a reload is forced). with the watcher
+    running only the changed module is reimported and patched into the catalog
+    '''
+
+    def __init__(self, module_path: str):
+        self.module_path = module_path
+        # category display name -> class name -> (class, serialized node)
+        self.entries: dict[str, dict[str, tuple[type[BaseNode], dict]]] = {}
+        self.node_classes: dict[str, list[type[BaseNode]]] = {}
+        self.body: bytes = b'{}'
+        self.etag: str = ''
+        self.mtimes: dict[str, float] = {}
+        self.lock = threading.RLock()
+
+    def package_dir(self) -> Optional[str]:
+        spec = importlib.util.find_spec(self.module_path)
+        if spec is None or not spec.submodule_search_locations:
+            return None
+        return spec.submodule_search_locations[0]
+
+    def module_mtimes(self) -> dict[str, float]:
+        '''modification times of every python file under the node package'''
+        package_dir = self.package_dir()
+        if package_dir is None:
+            return {}
+        mtimes = {}
+        for root, dirs, files in os.walk(package_dir):
+            dirs[:] = [d for d in dirs if not d.startswith('__')]
+            for filename in files:
+                if filename.endswith('.py'):
+                    path = os.path.join(root, filename)
+                    mtimes[path] = os.stat(path).st_mtime
+        return mtimes
+
+    def load(self):
+        '''(re)imports all the node modules and serializes the catalog'''
+        with self.lock:
+            # snapshot before importing, so an edit made during the load triggers another one
+            mtimes = self.module_mtimes()
+            self.entries = {
+                category: {node_class.__name__: (node_class, serialize_node(node_class)) for node_class in classes}
+                for category, classes in find_and_load_classes(self.module_path).items()
+            }
+            self.render()
+            self.mtimes = mtimes
+
+    def render(self):
+        '''rebuilds the class lists and the response body from the entries'''
+        # a new dict each time, so a running execution keeps a consistent view
+        self.node_classes = {
+            category: [node_class for node_class, _ in entries.values()]
+            for category, entries in self.entries.items()
+        }
+        nodes_dict = {
+            category: [node for _, node in entries.values()]
+            for category, entries in self.entries.items()
+        }
+        self.body = json.dumps(nodes_dict).encode()
+        # data ids are random per instance, leave them out so an unchanged catalog keeps its etag
+        stable = json.dumps(without_ids(nodes_dict), sort_keys=True).encode()
+        self.etag = f'"{hashlib.sha1(stable).hexdigest()}"'
+
+    def refresh(self) -> bool:
+        '''reloads the catalog if a node module was added, removed or modified since the last load'''
+        if self.module_mtimes() == self.mtimes:
+            return False
+        self.load()
+        return True
+
+    def matches(self, if_none_match: str | None) -> bool:
+        '''whether an If-None-Match header refers to the current catalog'''
+        if not if_none_match:
+            return False
+        tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return self.etag in tags or '*' in tags
+
+    def module_for_path(self, path: str) -> Optional[str]:
+        '''the dotted module path of a node module file, None for anything else'''
+        package_dir = self.package_dir()
+        if package_dir is None:
+            return None
+        parts = os.path.relpath(path, package_dir).split(os.sep)
+        if len(parts) != 2 or not parts[1].endswith('.py') or any(part.startswith('_') for part in parts):
+            return None
+        return f'{self.module_path}.{parts[0]}.{parts[1][:-3]}'
+
+    def reload_module(self, path: str) -> dict:
+        '''reimports the node module at a file path and patches it into the catalog.
+
+        returns a catalog_update message with the updated and removed nodes of its category,
+        anything that isn't a single node module (e.g. a category __init__) reloads the whole catalog
+        '''
+        module_full_path = self.module_for_path(path)
+        if module_full_path is None:
+            self.load()
+            return {'event': 'catalog_update', 'etag': self.etag, 'full': True}
+
+        with self.lock:
+            category_module_path = module_full_path.rsplit('.', 1)[0]
+            category_module = importlib.import_module(category_module_path)
+            category = getattr(category_module, 'DISPLAY_NAME', category_module_path.rsplit('.', 1)[1])
+
+            entries = dict(self.entries.get(category, {}))
+            previous = {name for name, (node_class, _) in entries.items() if node_class.__module__ == module_full_path}
+
+            if os.path.exists(path):
+                # classes imported from other node modules are listed under their own module
+                classes = [c for c in load_node_module(module_full_path) if c.__module__ == module_full_path]
+                self.mtimes[path] = os.stat(path).st_mtime
+            else:
+                classes = []
+                sys.modules.pop(module_full_path, None)
+                self.mtimes.pop(path, None)
+
+            removed = sorted(previous - {node_class.__name__ for node_class in classes})
+            for name in removed:
+                del entries[name]
+            for node_class in classes:
+                entries[node_class.__name__] = (node_class, serialize_node(node_class))
+
+            if entries:
+                self.entries[category] = entries
+            else:
+                self.entries.pop(category, None)
+            self.render()
+
+            return {
+                'event': 'catalog_update',
+                'etag': self.etag,
+                'full': False,
+                'category': category,
+                'updated': [entries[node_class.__name__][1] for node_class in classes],
+                'removed': removed,
+            }
+
+    async def watch(self, on_update: Callable[[dict], Awaitable[None]]):
+        '''hot reloads node modules as they change on disk, passing each catalog_update to on_update'''
+        package_dir = self.package_dir()
+        if watchfiles is None or package_dir is None:
+            print('Node hot reload is disabled, install watchfiles to enable it')
+            return
+
+        async for changes in watchfiles.awatch(package_dir, watch_filter=watchfiles.PythonFilter()):
+            for _, path in sorted(changes, key=lambda change: change[1]):
+                try:
+                    update = await asyncio.to_thread(self.reload_module, path)
+                except Exception as e:
+                    # keep watching, the module is picked up again on its next save
+                    print(f'Error reloading {path}: {e}')
+                    continue
+                await on_update(update)
@@ -2,6 +2,7 @@ from typing import List, ClassVar, Union, Dict, ForwardRef, Literal, Type, Any
 from pydantic import BaseModel, Field, model_validator, field_validator, computed_field, model_serializer
 import uuid
 from ..base_data import BaseData, register_class, CLASS_REGISTRY
+from ..hashing import content_hash
 from devtools import debug as d
 
 # Import all relevant data types from basic.py
@@ -36,7 +37,11 @@ class ListData(BaseData):
                     discriminator = class_parent or class_name
                     if discriminator and discriminator in CLASS_REGISTRY:
                         item_class = CLASS_REGISTRY[discriminator]
-                        new_item = item_class.model_validate(item)
+                        # dict items are serialized data, pass the context on so nested
+                        # cached or buffer encoded payloads are resolved
+                        new_item = item_class.model_validate(
+                            item, context={**(info.context or {}), 'state': 'deserializing'}
+                        )
                         new_list.append(new_item)
                     else:
                         new_list.append(item)
@@ -60,5 +65,10 @@ class ModelData(BaseModel):
         self_as_dict = {k: getattr(self, k) for k in self.model_computed_fields}
         self_as_dict |= self.__dict__.copy()
         return self_as_dict
+
+    def content_hash(self) -> str:
+        '''a stable hash of the model's fields, composed from the hashes of the data it holds'''
+        content = {k: v for k, v in self.__dict__.items() if k not in ('class_parent', 'metadata')}
+        return content_hash([self.__class__.__name__, content])
     
 
@@ -0,0 +1,79 @@
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from .base_node import BaseNode
+
+# how finished nodes are sent to the client:
+# 'full' the whole node as json in a single_node_update (what the frontend reads today),
+# 'delta' a node_delta with only the fields that changed, data the client has is sent as a reference
+UPDATE_MODES = ('full', 'delta')
+
+
+def data_id(data: Any) -> Optional[str]:
+    return getattr(data, 'id', None) if isinstance(data, BaseModel) else None
+
+
+class DeltaTracker:
+    '''remembers what the client has been sent, so a node update only carries what changed.
+
+    data is tracked by its id: a payload the client already holds (from the flow it sent or an
+    earlier update) is sent as {"ref": id} and the client copies it from wherever it has it
+    '''
+
+    def __init__(self):
+        self.sent_data_ids: set[str] = set()
+        # node id -> the node's scalar data as last sent
+        self.scalars: dict[str, dict] = {}
+        # (node id, 'inputs' | 'outputs', index) -> id of the data last sent in that slot
+        self.slots: dict[tuple[str, str, int], Optional[str]] = {}
+
+    def seed_flow(self, nodes: list[dict]):
+        '''records the nodes and data the client sent with the flow, which it already holds'''
+        for node in nodes:
+            node_id = str(node['id'])
+            node_data = node.get('data', {})
+            self.scalars[node_id] = {k: v for k, v in node_data.items() if k not in ('inputs', 'outputs')}
+            for kind in ('inputs', 'outputs'):
+                for index, field in enumerate(node_data.get(kind, [])):
+                    data = field.get('data')
+                    id = data.get('id') if isinstance(data, dict) else None
+                    if id:
+                        self.sent_data_ids.add(id)
+                    self.slots[(node_id, kind, index)] = id if data is not None else None
+
+    @staticmethod
+    def dump_scalars(node_instance: BaseNode) -> dict:
+        return node_instance.data.model_dump(mode='json', exclude={'inputs', 'outputs'})
+
+    def node_delta(self, node_id: str, node_instance: BaseNode, context: dict) -> dict:
+        '''the changes to a node since it was last sent, marking them as sent'''
+        delta = {}
+        scalars = self.dump_scalars(node_instance)
+        previous = self.scalars.get(node_id, {})
+        delta.update({key: value for key, value in scalars.items() if previous.get(key, object()) != value})
+        self.scalars[node_id] = scalars
+
+        for kind in ('inputs', 'outputs'):
+            changed = {}
+            for index, field in enumerate(getattr(node_instance.data, kind)):
+                slot = (node_id, kind, index)
+                current_id = data_id(field.data)
+                # unchanged when the slot still holds the same data, or still holds nothing
+                if slot in self.slots and self.slots[slot] == current_id and (current_id or field.data is None):
+                    continue
+                changed[str(index)] = {'data': self.encode_data(field.data, context)}
+                self.slots[slot] = current_id
+            if changed:
+                delta[kind] = changed
+        return delta
+
+    def encode_data(self, data: Any, context: dict) -> Any:
+        current_id = data_id(data)
+        if current_id is not None and current_id in self.sent_data_ids:
+            return {'ref': current_id}
+        if isinstance(data, BaseModel):
+            if current_id is not None:
+                self.sent_data_ids.add(current_id)
+            return data.model_dump(mode='json', context=context)
+        return data
@@ -1,17 +1,63 @@
+import os
 import time
+import threading
+import contextvars
 import json
 import traceback
 import cProfile
+from collections import deque
+from typing import Optional
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
 from pydantic import BaseModel
 
-from .base_node import BaseNode, StreamingBaseNode
-from .utils import topological_sort, autosave
+from .base_node import BaseNode, StreamingBaseNode, ExecutionCancelled, current_cancel_event, exec_in_process
+from .utils import autosave, node_registry
+from .prototype import get_prototype
+from .graph import CompiledGraph, EdgeRoute
+from .pipeline import StreamPipe
+from .delta import DeltaTracker
+from .liveness import LivenessTracker
+from .profiling import PROFILE_DIR, RunProfiler
+from . import metrics
 from fastapi import WebSocket
 import asyncio
 from devtools import debug as d
 
-class ExecutionCancelled(Exception):
-    pass
+# threads release the GIL inside numpy/Pillow, so image heavy branches overlap well
+MAX_WORKERS = os.cpu_count() or 4
+# nodes marked cpu_bound run in a process pool when this is above zero
+PROCESS_WORKERS = 0
+# how often the scheduler wakes up to check for a cancel while nodes are running
+CANCEL_POLL_INTERVAL = 0.1
+# minimum seconds between two updates of a streaming node, whatever it yields in between is coalesced
+STREAM_UPDATE_INTERVAL = 0.05
+# seconds status changes are held to be sent together in one status_update, 0 sends each right away
+STATUS_BATCH_INTERVAL = 0.016
+# drop intermediate outputs once every node reading them has run, headless runs always do
+LOW_MEMORY = False
+
+def start_thread(func, name: str) -> asyncio.Future:
+    '''runs a function on a new thread, for work that would hold a pool worker for too long'''
+    future = Future()
+
+    def target():
+        if future.set_running_or_notify_cancel():
+            try:
+                future.set_result(func())
+            except BaseException as e:
+                future.set_exception(e)
+
+    threading.Thread(target=target, name=name, daemon=True).start()
+    return asyncio.wrap_future(future)
+
+
+def close_pipes(pipes: list[StreamPipe], error: Optional[BaseException] = None):
+    for pipe in pipes:
+        try:
+            pipe.close(error)
+        except ExecutionCancelled:
+            pass
+
 
 class GraphDef(BaseModel):
     nodes: list
@@ -21,33 +67,321 @@ class ExecuteRequest(BaseModel):
     graph_def: GraphDef
 
 class ExecutionWrapper:
-    def __init__(self):
+    def __init__(
+        self,
+        max_workers: int = MAX_WORKERS,
+        process_workers: int = PROCESS_WORKERS,
+        stream_update_interval: float = STREAM_UPDATE_INTERVAL,
+        status_batch_interval: float = STATUS_BATCH_INTERVAL,
+        low_memory: bool = LOW_MEMORY,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ):
         self.current_node = None
         self.current_stream = []
         self.last_sent_index = -1
         self.node_instances = {}
         self.websocket: WebSocket | None = None
         self.node_classes = None
-        self.cancel_flag = False
+        self.cancel_event = threading.Event()
+        # events of the current run are tagged with it, for clients running several over one connection
+        self.run_id: Optional[str | int] = None
+        # how array payloads are sent to the client, see transport.ARRAY_ENCODINGS
+        self.array_encoding = 'list'
+        # how finished nodes are sent to the client, see delta.UPDATE_MODES
+        self.update_mode = 'full'
+        self.delta_tracker = DeltaTracker()
+        # what runs record about themselves, see profiling.PROFILE_MODES
+        self.profile = 'off'
+        # tracemalloc slows nodes down severalfold, runs profiled for their timings can turn it off
+        self.profile_allocations = True
+        self.profile_dir = PROFILE_DIR
+        self.profiler: Optional[RunProfiler] = None
+        # the profile event of the last profiled run
+        self.last_profile: dict = {}
+        # fingerprints of the last run's nodes, used to find the nodes that changed
+        self.node_fingerprints: dict[str, str] = {}
+        self.clean_nodes: set[str] = set()
+        self.stale_on_client: set[str] = set()
+        self.low_memory = low_memory
+        # nodes whose outputs are kept by low memory runs, like the outputs of nodes feeding nothing
+        self.keep_outputs: set[str] = set()
+        # set during a headless run, which sends nothing to the client
+        self.headless = False
+        self.liveness: Optional[LivenessTracker] = None
+        # nodes whose outputs were dropped by the last run, they can't be reused
+        self.released_nodes: set[str] = set()
+        # peak bytes held by outputs in the last run, see LivenessTracker.report
+        self.memory_report: dict = {}
+        # the error that failed the last run outside of its nodes, if any
+        self.run_error: Optional[str] = None
+        # wrappers running side by side can share one pool
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pne-node')
+        self.process_executor = ProcessPoolExecutor(max_workers=process_workers) if process_workers else None
+        self.stream_update_interval = stream_update_interval
+        self.status_batch_interval = status_batch_interval
+        self.reset_outbox()
+
+    @property
+    def cancel_flag(self) -> bool:
+        return self.cancel_event.is_set()
+
+    @cancel_flag.setter
+    def cancel_flag(self, value: bool):
+        '''the flag is backed by a threading event so nodes on worker threads can see it'''
+        if value:
+            self.cancel_event.set()
+        else:
+            self.cancel_event.clear()
 
     def set_websocket(self, websocket: WebSocket | None):
         self.websocket = websocket
 
+    def start_run(self, run_id: Optional[str | int] = None):
+        '''prepares the next run with its own cancel event, so nodes left running by a cancelled run
+        stay cancelled, and the id its events are tagged with'''
+        self.cancel_event = threading.Event()
+        self.run_id = run_id
+
+    @property
+    def node_classes(self) -> dict | None:
+        return self._node_classes
+
+    @node_classes.setter
+    def node_classes(self, node_classes: dict | None):
+        '''the categories from find_and_load_classes, also indexed for lookups by namespace and class name'''
+        self._node_classes = node_classes
+        self.node_registry = node_registry(node_classes)
+
     def set_node_classes(self, node_classes):
         self.node_classes = node_classes
 
-    async def send_update(self, message: dict):
-        if self.websocket:
-            await self.websocket.send_json(message)
+    def find_node_class(self, node: dict):
+        '''finds the class of a serialized node among the loaded node classes'''
+        return self.node_registry.get((node['data']['namespace'], node['data']['class_name']))
+
+    def shutdown(self):
+        '''stops the worker pools, waiting for running nodes to finish'''
+        self.executor.shutdown()
+        if self.process_executor:
+            self.process_executor.shutdown()
+
+    async def run_node(
+        self,
+        node_instance: BaseNode,
+        input_pipes: Optional[dict[str, StreamPipe]] = None,
+        output_pipes: Optional[list[tuple[int, StreamPipe]]] = None,
+    ):
+        '''executes a node on the worker pool without blocking the event loop'''
+        start = time.perf_counter()
+        try:
+            return await self.execute_node(node_instance, input_pipes, output_pipes)
+        finally:
+            metrics.NODE_SECONDS.observe(time.perf_counter() - start, node_class=node_instance.__class__.__name__)
+
+    async def execute_node(
+        self,
+        node_instance: BaseNode,
+        input_pipes: Optional[dict[str, StreamPipe]],
+        output_pipes: Optional[list[tuple[int, StreamPipe]]],
+    ):
+        loop = asyncio.get_running_loop()
+        # run in a copy of the current context so check_cancelled sees this run's cancel event
+        context = contextvars.copy_context()
+        if node_instance.data.streaming:
+            return await self.run_stream(node_instance, context, input_pipes or {}, output_pipes or [])
+        if node_instance.cpu_bound and self.process_executor:
+            memo_key = node_instance.memo_key()
+            cached = node_instance.result_cache.get(memo_key) if memo_key is not None else None
+            if cached is not None:
+                return node_instance.set_results(*cached)
+            start = time.time()
+            results, stdout, stderr = await loop.run_in_executor(
+                self.process_executor,
+                exec_in_process,
+                node_instance.__class__,
+                node_instance.exec_kwargs(),
+            )
+            if self.profiler:
+                self.profiler.waited(node_instance.id, node_instance.__class__.__name__, start, time.time())
+            if memo_key is not None:
+                node_instance.result_cache.set(memo_key, (results, stdout, stderr))
+            return node_instance.set_results(results, stdout, stderr)
+        return await loop.run_in_executor(self.executor, context.run, self.profiled(node_instance, node_instance.meta_exec))
+
+    def profiled(self, node_instance: BaseNode, func):
+        '''func measured for the node when the run is profiled'''
+        if self.profiler is None:
+            return func
+        return self.profiler.wrap(node_instance.id, node_instance.__class__.__name__, func)
+
+    async def run_stream(
+        self,
+        node_instance: StreamingBaseNode,
+        context: contextvars.Context,
+        input_pipes: dict[str, StreamPipe],
+        output_pipes: list[tuple[int, StreamPipe]],
+    ):
+        '''drives a streaming node's generator on its own thread and forwards its progress and
+        partial outputs, at most one update per stream_update_interval.
+
+        pipelined nodes read their stream inputs from input_pipes and put each partial output
+        into output_pipes as it is yielded, waiting while a downstream node catches up
+        '''
+        loop = asyncio.get_running_loop()
+        yielded = asyncio.Event()
+
+        def drain():
+            try:
+                for result in node_instance.meta_exec_stream(input_pipes):
+                    outputs = result.get('outputs', [])
+                    for index, pipe in output_pipes:
+                        if index < len(outputs):
+                            pipe.put(outputs[index])
+                    # only wake the loop when it has seen the previous yield
+                    if not yielded.is_set():
+                        loop.call_soon_threadsafe(yielded.set)
+            except BaseException as e:
+                close_pipes([pipe for _, pipe in output_pipes], e)
+                raise
+            else:
+                close_pipes([pipe for _, pipe in output_pipes])
+            finally:
+                for pipe in input_pipes.values():
+                    pipe.abandon()
+
+        # streaming nodes live as long as their stream, and pipelined ones wait on each other,
+        # so each gets its own thread rather than a pool worker
+        stream = start_thread(
+            lambda: context.run(self.profiled(node_instance, drain)), name=f'pne-stream-{node_instance.id}'
+        )
+        while not stream.done():
+            waiter = asyncio.ensure_future(yielded.wait())
+            await asyncio.wait({stream, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            if stream.done():
+                break
+            yielded.clear()
+            await self.send_node_update(node_instance)
+            # yields during the interval are picked up by the next update
+            await asyncio.wait({stream}, timeout=self.stream_update_interval)
+        # the final state is sent by the scheduler once the node is evaluated
+        return stream.result()
+
+    @staticmethod
+    def release_downstream(
+        graph: CompiledGraph,
+        node_id: str,
+        remaining_inputs: dict,
+        ready: deque,
+        routes: Optional[list[EdgeRoute]] = None,
+    ):
+        '''marks the edges out of a finished node (or the given routes) as satisfied and queues nodes that became ready'''
+        for route in graph.outgoing.get(node_id, []) if routes is None else routes:
+            remaining_inputs[route.target] -= 1
+            if remaining_inputs[route.target] == 0:
+                ready.append(route.target)
+
+    def reset_outbox(self):
+        # node id -> latest status not sent yet
+        self.pending_statuses: dict[str, str] = {}
+        self.status_flush: Optional[asyncio.Task] = None
+        # keeps a message and its binary frames together, and messages in the order they were sent
+        self.send_lock = asyncio.Lock()
+
+    async def send_update(self, message: dict, frames: Optional[list[bytes]] = None, node_id: Optional[str] = None):
+        '''sends a message to the client, status changes are batched.
+
+        a status_update is held for status_batch_interval and sent with the other status changes
+        in that window, keeping only the latest status of each node. a message about a node
+        (node_id) replaces that node's held status, as it carries a newer one. any other message
+        sends the held statuses first, so the client never sees an older status after it
+        '''
+        if self.headless:
+            return
+        if message.get("event") == "status_update" and self.status_batch_interval > 0:
+            for update in message["updates"]:
+                self.pending_statuses[update["node_id"]] = update["status"]
+            if self.status_flush is None:
+                self.status_flush = asyncio.create_task(self.flush_statuses_later())
+            return
+        if node_id is not None:
+            self.pending_statuses.pop(node_id, None)
         else:
-            print(f"Websocket not set, cannot send message: {message}")
+            await self.flush_statuses()
+        await self.send_now(message, frames or [])
+
+    async def flush_statuses_later(self):
+        await asyncio.sleep(self.status_batch_interval)
+        self.status_flush = None
+        await self.flush_statuses()
+
+    async def flush_statuses(self):
+        '''sends the held status changes as one status_update'''
+        if self.status_flush is not None:
+            self.status_flush.cancel()
+            self.status_flush = None
+        if not self.pending_statuses:
+            return
+        updates = [{"node_id": node_id, "status": status} for node_id, status in self.pending_statuses.items()]
+        self.pending_statuses = {}
+        await self.send_now({"event": "status_update", "updates": updates})
+
+    async def send_now(self, message: dict, frames: list[bytes] = (), tag_run: bool = True):
+        '''sends a message and the binary frames that belong to it, nothing else is sent in between.
+        events that aren't about a run, like catalog updates, are sent with tag_run=False'''
+        if tag_run and self.run_id is not None and "run_id" not in message:
+            message = {**message, "run_id": self.run_id}
+        async with self.send_lock:
+            if self.websocket:
+                start = time.perf_counter()
+                # serialized once, for the socket and the byte count. ascii only, so its length is its size
+                text = json.dumps(message, separators=(',', ':'))
+                await self.websocket.send_text(text)
+                for frame in frames:
+                    await self.websocket.send_bytes(frame)
+                metrics.SEND_SECONDS.observe(time.perf_counter() - start)
+                metrics.BYTES_SENT.inc(len(text), frame='text')
+                if frames:
+                    metrics.BYTES_SENT.inc(sum(len(frame) for frame in frames), frame='binary')
+            else:
+                print(f"Websocket not set, cannot send message: {message}")
+
+    async def send_node_update(self, node_instance: BaseNode):
+        '''sends a full node update, with array payloads encoded as the client asked for.
+        binary frames follow the json message in order, it says how many to expect'''
+        if self.headless:
+            return
+        # serializing a node (and making previews of its images) can take long enough to stall
+        # the loop, and with it cancels and every other session, it runs on the worker pool
+        loop = asyncio.get_running_loop()
+        message, frames = await loop.run_in_executor(self.executor, self.serialize_node_update, node_instance)
+        await self.send_update(message, frames, node_id=node_instance.id)
+
+    def serialize_node_update(self, node_instance: BaseNode) -> tuple[dict, list[bytes]]:
+        '''the message of a node update and the binary frames that follow it'''
+        frames = []
+        context = {'array_encoding': self.array_encoding, 'binary_frames': frames}
+        start = time.time()
+        if self.update_mode == 'delta':
+            delta = self.delta_tracker.node_delta(node_instance.id, node_instance, context)
+            message = {"event": "node_delta", "node_id": node_instance.id, "data": delta}
+        else:
+            message = {"event": "single_node_update", "node": node_instance.model_dump_json(context=context)}
+        if frames:
+            message["binary_frames"] = len(frames)
+        if self.profiler:
+            nbytes = len(json.dumps(message)) + sum(len(frame) for frame in frames)
+            self.profiler.serialized(node_instance.id, start, time.time(), nbytes)
+        return message, frames
 
     async def execute_graph(self, graph_def: dict, quiet: bool = False, headless: bool = False):
-        # Simplified version - ignoring quiet and headless parameters
+        # quiet runs don't print their progress, headless runs send nothing to the client,
+        # so nodes are never serialized, and drop intermediate outputs like low_memory
         
         # autosave(graph_def)
         
-        print("quiet", quiet)
+        log = (lambda *args, **kwargs: None) if quiet else print
+        self.headless = headless
         updated_nodes = []
 
         async def check_cancel_flag():
@@ -56,157 +390,306 @@ class ExecutionWrapper:
                 raise ExecutionCancelled("Execution was cancelled")
 
 
-        # profiler = cProfile.Profile()
-        # profiler.enable()
         start_time = time.time()
+        self.profiler = (
+            RunProfiler(python=self.profile == 'python', trace_allocations=self.profile_allocations)
+            if self.profile != 'off' else None
+        )
+        if self.profiler:
+            self.profiler.start()
+        # the outbox of a previous run belongs to its event loop
+        self.reset_outbox()
+        # instances from the previous run are kept to be reused by nodes that didn't change
+        previous_instances = self.node_instances
+        previous_fingerprints = self.node_fingerprints
         self.node_instances = {}
+        self.clean_nodes = set()
+        self.stale_on_client = set()
+        self.liveness = None
+        # nodes on worker threads check this run's cancel event through check_cancelled
+        current_cancel_event.set(self.cancel_event)
+        self.run_error = None
 
-        # d(graph_def)
-        graph_def = GraphDef.model_validate(graph_def)
-        
-        print(f"Starting graph execution... {len(graph_def.nodes)} nodes, {len(graph_def.edges)} edges")
-        
-        await check_cancel_flag()
-        # Node instantiation
-        node_instantiation_start = time.time()
-        for node in graph_def.nodes:
-            id = str(node['id'])
-
-            # Set data to None for connected inputs
-            for edge in graph_def.edges:
-                if edge['target'] == id:
-                    target_handle_parts = edge['targetHandle'].split(':')
-                    target_handle = target_handle_parts[2] if len(target_handle_parts) >= 3 else target_handle_parts[-1]
-                    if 'data' in node and 'inputs' in node['data']:
-                        for input in node['data']['inputs']:
-                            if input['label'] == target_handle or str(input.get('index', '')) == target_handle:
-                                input['data'] = None
-
-            # Set outputs to None
-            if 'data' in node and 'outputs' in node['data']:
-                for output in node['data']['outputs']:
-                    output['data'] = None
-
-            node_type = node['data']['class_name']
-            namespace = node['data']['namespace']
-            NodeClass = next((cls for cls in self.node_classes.get(namespace, []) if cls.__name__ == node_type), None)
-            if NodeClass:
-                instance = NodeClass.model_validate(node, context={'state': 'deserializing'})
-                self.node_instances[id] = instance
-        node_instantiation_end = time.time()
-        print(f"Node instantiation took {node_instantiation_end - node_instantiation_start:.4f} seconds")
-
-        # d(self.node_instances)
-
-        # Topological sort
-        sort_start = time.time()
-        sorted_nodes = topological_sort(graph_def.model_dump())
-        sort_end = time.time()
-        print(f"Topological sort took {sort_end - sort_start:.4f} seconds")
-
-        await check_cancel_flag()
+        outcome = 'ok'
+        try:
+            # d(graph_def)
+            graph_def = GraphDef.model_validate(graph_def)
+
+            log(f"Starting graph execution... {len(graph_def.nodes)} nodes, {len(graph_def.edges)} edges")
+
+            await check_cancel_flag()
+            # Graph compilation (edge index and topological sort)
+            compile_start = time.time()
+            graph = CompiledGraph(graph_def.nodes, graph_def.edges)
+            # the client holds the flow as it sent it, deltas are relative to that
+            self.delta_tracker = DeltaTracker()
+            if self.update_mode == 'delta':
+                self.delta_tracker.seed_flow(graph_def.nodes)
+            compile_end = time.time()
+            log(f"Graph compilation took {compile_end - compile_start:.4f} seconds")
+            if self.profiler:
+                self.profiler.phase('compile', compile_start, compile_end)
+
+            # Node instantiation
+            node_instantiation_start = time.time()
+            fingerprints = graph.fingerprints()
+            for id in graph.order:
+                node = graph.nodes[id]
+                # Nodes whose inputs and upstream nodes are unchanged keep last run's instance and outputs
+                previous = previous_instances.get(id)
+                if (
+                    previous is not None
+                    and type(previous) is self.find_node_class(node)
+                    and previous.data.status == 'evaluated'
+                    and id not in self.released_nodes
+                    and previous_fingerprints.get(id) == fingerprints[id]
+                    and all(route.source in self.clean_nodes for route in graph.incoming[id])
+                ):
+                    self.node_instances[id] = previous
+                    self.clean_nodes.add(id)
+                    # the client only needs the outputs again if it doesn't have them
+                    if any(o.get('data') is None for o in node['data'].get('outputs', [])):
+                        self.stale_on_client.add(id)
+
+            for id, node in graph.nodes.items():
+                if id in self.clean_nodes:
+                    continue
+
+                # Set data to None for connected inputs
+                if 'data' in node and 'inputs' in node['data']:
+                    for index in graph.connected_inputs(id):
+                        node['data']['inputs'][index]['data'] = None
+
+                # Set outputs to None
+                if 'data' in node and 'outputs' in node['data']:
+                    for output in node['data']['outputs']:
+                        output['data'] = None
+
+                NodeClass = self.find_node_class(node)
+                if NodeClass:
+                    instance = get_prototype(NodeClass).instantiate(node)
+                    self.node_instances[id] = instance
+            self.node_fingerprints = fingerprints
+            graph.bind(self.node_instances)
+            self.liveness = LivenessTracker(
+                graph, self.node_instances, free_outputs=self.low_memory or headless, keep=self.keep_outputs
+            )
+            node_instantiation_end = time.time()
+            log(f"Node instantiation took {node_instantiation_end - node_instantiation_start:.4f} seconds")
+            if self.profiler:
+                self.profiler.phase('instantiate', node_instantiation_start, node_instantiation_end)
+            log(f"{len(self.clean_nodes)} unchanged nodes will not be re-executed")
+
+            # d(self.node_instances)
+
+            sorted_nodes = graph.order
+
+            await check_cancel_flag()
 
-        
-        # Node execution
-        execution_start = time.time()
-        
-        # Send initial status update for all nodes
-        status_updates = [
-            {"node_id": node_id, "status": "pending"} 
-            for node_id in sorted_nodes
-        ]
-        await self.send_update({
-            "event": "status_update",
-            "updates": status_updates
-        })
-        
-        await self.send_update({"event": "execution_started"})
-        
-        for node_id in sorted_nodes:
-            node_instance: BaseNode = self.node_instances[str(node_id)]
             
-            # Update status to executing
-            node_instance.data.status = 'streaming' if node_instance.data.streaming else 'executing'
+            # Node execution
+            execution_start = time.time()
+            
+            # Send initial status update for all nodes
+            for node_id in sorted_nodes:
+                if node_id in self.node_instances and node_id not in self.clean_nodes:
+                    self.node_instances[node_id].data.status = 'pending'
+            status_updates = [
+                {"node_id": node_id, "status": "evaluated" if node_id in self.clean_nodes else "pending"}
+                for node_id in sorted_nodes
+            ]
             await self.send_update({
                 "event": "status_update",
-                "updates": [{"node_id": node_id, "status": node_instance.data.status}]
+                "updates": status_updates
             })
             
-            # Clear outputs
-            for o in node_instance.data.outputs:
-                o.data = None
-            
+            await self.send_update({"event": "execution_started"})
+
+            await self.schedule(graph, sorted_nodes)
+
+            execution_end = time.time()
+            log(f"Total node execution took {execution_end - execution_start:.4f} seconds")
+            if self.profiler:
+                self.profiler.phase('execute', execution_start, execution_end)
+            self.memory_report = self.liveness.report()
+            if any(node.data.status == 'error' for node in self.node_instances.values()):
+                outcome = 'error'
+            log(
+                f"Peak output memory {self.memory_report['peak_bytes'] / 1024 / 1024:.2f} MB, "
+                f"{self.memory_report['retained_bytes'] / 1024 / 1024:.2f} MB if every output was kept"
+            )
+
+        except ExecutionCancelled:
+            log("Execution cancelled")
+            outcome = 'cancelled'
+            await self.send_cancelled()
+
+        except Exception as e:
+            outcome = 'error'
+            self.run_error = f"Error: {str(e)}\n\nTraceback:\n{traceback.format_exc()}"
+            print(f"Execution failed: {str(e)}")
+            print(f"Traceback:\n{traceback.format_exc()}")
+            await self.send_update({"event": "execution_error", "error": self.run_error})
+
+        finally:
+            self.current_node = None
+            self.current_stream = []
+            self.released_nodes = self.liveness.released if self.liveness else set()
+
+            end_time = time.time()
+            total_time = end_time - start_time
+            log(f"Total graph execution took {total_time:.4f} seconds")
+            metrics.RUNS.inc(outcome=outcome)
+            metrics.RUN_SECONDS.observe(total_time)
+
+            # if not quiet and not headless:
+            #     await self.send_update({"event": "full_graph_update", "all_nodes": updated_nodes})
+
             try:
-                # Execute node
-                if node_instance.data.streaming:
-                    # Streaming node handling...
-                    pass
-                else:
-                    node_instance.meta_exec()
-                
-                # Update status to evaluated and send ONE final node update
-                node_instance.data.status = 'evaluated'
-                await self.send_update({
-                    "event": "single_node_update",
-                    "node": node_instance.model_dump_json()
-                })
-                
-            except Exception as e:
-                node_instance.data.status = 'error'
-                node_instance.data.error_output = f"Error: {str(e)}\n\nTraceback:\n{traceback.format_exc()}"
-                await self.send_update({
-                    "event": "status_update",
-                    "updates": [{"node_id": node_id, "status": "error"}]
-                })
-                print(f"Error executing node {node_id}: {str(e)}")
-                print(f"Traceback:\n{traceback.format_exc()}")
-            
-            # Edge processing...
-            for edge in graph_def.edges:
-                if edge['source'] == node_id:
-                    source_node = self.node_instances[str(edge['source'])]
-                    target_node = self.node_instances[str(edge['target'])]
-                    
-                    # Extract indices from the new handle format
-                    source_handle_parts = edge['sourceHandle'].split(':')
-                    target_handle_parts = edge['targetHandle'].split(':')
-                    
-                    # The index is now the third part in the handle ID
-                    source_index = source_handle_parts[2] if len(source_handle_parts) >= 3 else source_handle_parts[-1]
-                    target_index = target_handle_parts[2] if len(target_handle_parts) >= 3 else target_handle_parts[-1]
-                    
-                    # Find the corresponding output and input
-                    source_output = next((o for i, o in enumerate(source_node.data.outputs) 
-                                         if str(i) == source_index or o.label == source_index), None)
-                    target_input = next((i for j, i in enumerate(target_node.data.inputs) 
-                                        if str(j) == target_index or i.label == target_index), None)
-                    
-                    if source_output and target_input:
-                        # Transfer data from source output to target input
-                        target_input.data = source_output.data
-        
-        execution_end = time.time()
-        print(f"Total node execution took {execution_end - execution_start:.4f} seconds")
+                # stops the profiler first, tracemalloc must not outlive the run
+                if self.profiler:
+                    await self.send_profile(log)
+                # the websocket stays open for the next run, the client stops waiting on execution_finished
+                await self.flush_statuses()
+                if self.websocket:
+                    await self.send_update({"event": "execution_finished"})
+            finally:
+                self.headless = False
 
+        return updated_nodes
 
-        self.current_node = None
-        self.current_stream = []
+    async def send_profile(self, log=print):
+        '''sends what the profiler recorded as a profile event, writing the trace and cProfile dump
+        the profile mode asks for to profile_dir'''
+        self.profiler.stop()
+        report = self.profiler.report()
+        run = self.run_id if self.run_id is not None else int(self.profiler.start_time)
+        name = 'run_' + ''.join(c if c.isalnum() or c in '-_' else '_' for c in str(run))
+        if self.profile in ('trace', 'python'):
+            report['trace'] = self.profiler.export_trace(os.path.join(self.profile_dir, f'{name}_trace.json'))
+        if self.profile == 'python':
+            report['cprofile'] = self.profiler.export_cprofile(os.path.join(self.profile_dir, f'{name}.pstat'))
+        self.last_profile = report
+
+        slowest = sorted(report['nodes'].items(), key=lambda item: item[1]['wall_ms'], reverse=True)[:5]
+        for node_id, stats in slowest:
+            log(f"{stats['class_name']} {node_id}: {stats['wall_ms']:.1f} ms wall, {stats['serialize_ms']:.1f} ms serializing")
+        await self.send_update({"event": "profile", **report})
+
+    async def schedule(self, graph: CompiledGraph, sorted_nodes: list[str]):
+        '''runs the nodes of a compiled graph, raising ExecutionCancelled if the run is cancelled'''
+        # Ready-queue scheduling: every node whose upstream nodes have finished
+        # is dispatched to the executor, so independent branches run concurrently
+        remaining_inputs = graph.dependency_counts()
+        ready = deque(node_id for node_id in sorted_nodes if remaining_inputs[node_id] == 0)
+        running: dict[asyncio.Future, str] = {}
+
+        # streaming nodes feeding each other are run side by side, connected by bounded pipes
+        stream_routes = graph.stream_routes(self.node_instances, self.clean_nodes)
+        input_pipes: dict[str, dict[str, StreamPipe]] = {}
+        output_pipes: dict[str, list[tuple[int, StreamPipe]]] = {}
+        for producer_id, routes in stream_routes.items():
+            for stream_route in routes:
+                pipe = StreamPipe()
+                input_pipes.setdefault(stream_route.route.target, {})[stream_route.input_label] = pipe
+                output_pipes.setdefault(producer_id, []).append((stream_route.output_index, pipe))
+        piped_routes = {node_id: [sr.route for sr in routes] for node_id, routes in stream_routes.items()}
+
+        try:
+            while ready or running:
+                while ready:
+                    if self.cancel_flag:
+                        raise ExecutionCancelled("Execution was cancelled")
 
-        end_time = time.time()
-        total_time = end_time - start_time
-        print(f"Total graph execution took {total_time:.4f} seconds")
+                    node_id = ready.popleft()
+                    node_instance = self.node_instances.get(node_id)
+                    if node_instance is None:
+                        # nodes whose class could not be found are skipped
+                        self.release_downstream(graph, node_id, remaining_inputs, ready)
+                        self.liveness.node_finished(node_id)
+                        continue
 
-        # if not quiet and not headless:
-        #     await self.send_update({"event": "full_graph_update", "all_nodes": updated_nodes})
+                    # Unchanged nodes pass their previous outputs on without executing
+                    if node_id in self.clean_nodes:
+                        if node_id in self.stale_on_client:
+                            await self.send_node_update(node_instance)
+                        graph.transfer_outputs(node_id)
+                        self.release_downstream(graph, node_id, remaining_inputs, ready)
+                        self.liveness.node_finished(node_id)
+                        continue
 
-        if self.websocket:
-            await self.websocket.send_json({"event": "execution_finished"})
-            await self.websocket.close()
-            self.websocket = None
+                    # Update status to executing
+                    node_instance.data.status = 'streaming' if node_instance.data.streaming else 'executing'
+                    await self.send_update({
+                        "event": "status_update",
+                        "updates": [{"node_id": node_id, "status": node_instance.data.status}]
+                    })
 
+                    # Clear outputs
+                    for o in node_instance.data.outputs:
+                        o.data = None
 
+                    running[asyncio.ensure_future(self.run_node(
+                        node_instance, input_pipes.get(node_id), output_pipes.get(node_id)
+                    ))] = node_id
+                    # pipelined consumers start alongside their producer
+                    self.release_downstream(graph, node_id, remaining_inputs, ready, piped_routes.get(node_id, []))
 
-        # profiler.disable()
-        # profiler.dump_stats("execution_profile.pstat")
+                if not running:
+                    continue
 
-        return updated_nodes
\ No newline at end of file
+                # wake up regularly so a cancel doesn't wait for the running nodes to finish,
+                # nodes that don't call check_cancelled are left to finish in the background
+                done, _ = await asyncio.wait(running, timeout=CANCEL_POLL_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+                if self.cancel_flag:
+                    raise ExecutionCancelled("Execution was cancelled")
+
+                for task in done:
+                    node_id = running.pop(task)
+                    node_instance = self.node_instances[node_id]
+                    try:
+                        task.result()
+
+                        # Update status to evaluated and send ONE final node update
+                        node_instance.data.status = 'evaluated'
+                        await self.send_node_update(node_instance)
+
+                    except ExecutionCancelled:
+                        raise
+
+                    except Exception as e:
+                        node_instance.data.status = 'error'
+                        metrics.NODE_ERRORS.inc(node_class=node_instance.__class__.__name__)
+                        node_instance.data.error_output = f"Error: {str(e)}\n\nTraceback:\n{traceback.format_exc()}"
+                        await self.send_update({
+                            "event": "status_update",
+                            "updates": [{"node_id": node_id, "status": "error"}]
+                        })
+                        print(f"Error executing node {node_id}: {str(e)}")
+                        print(f"Traceback:\n{traceback.format_exc()}")
+
+                    graph.transfer_outputs(node_id)
+                    piped = piped_routes.get(node_id, [])
+                    self.release_downstream(
+                        graph, node_id, remaining_inputs, ready,
+                        [route for route in graph.outgoing.get(node_id, []) if route not in piped],
+                    )
+                    self.liveness.node_finished(node_id)
+        finally:
+            # nodes left running by a cancel finish in the background, their errors are expected
+            for task in running:
+                task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    async def send_cancelled(self):
+        '''resets the nodes that did not get to finish and tells the client the run was cancelled'''
+        status_updates = []
+        for node_id, node_instance in self.node_instances.items():
+            if node_instance.data.status in ('pending', 'executing', 'streaming'):
+                node_instance.data.status = 'not evaluated'
+                status_updates.append({"node_id": node_id, "status": 'not evaluated'})
+        if status_updates:
+            await self.send_update({
+                "event": "status_update",
+                "updates": status_updates
+            })
+        await self.send_update({"event": "execution_cancelled"})
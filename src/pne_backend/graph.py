@@ -0,0 +1,173 @@
+import hashlib
+import json
+from typing import Any, NamedTuple, Optional
+
+from .base_node import BaseNode
+from .utils import topological_sort
+
+
+def parse_handle_key(handle: str) -> str:
+    '''extracts the field key from a handle id like "<node_id>:inputs:<index>:handle"'''
+    handle_parts = handle.split(':')
+    return handle_parts[2] if len(handle_parts) >= 3 else handle_parts[-1]
+
+
+def resolve_slot(fields: list, key: str) -> Optional[int]:
+    '''finds the position of the field a handle key refers to, by index or by label'''
+    for i, field in enumerate(fields):
+        label = field['label'] if isinstance(field, dict) else field.label
+        if str(i) == key or label == key:
+            return i
+    return None
+
+
+# parts of serialized data that don't change what a node computes
+VOLATILE_DATA_KEYS = {'id', 'preview', 'metadata', 'cached', 'size_mb'}
+
+
+def stable_data(data: Any) -> Any:
+    '''strips ids, previews and ui metadata from serialized data so only the content is left'''
+    if isinstance(data, dict):
+        # cached data is sent without a payload and is only identified by its id
+        keep_id = 'payload' in data and data['payload'] is None
+        return {
+            key: stable_data(value) for key, value in data.items()
+            if key not in VOLATILE_DATA_KEYS or (key == 'id' and keep_id)
+        }
+    if isinstance(data, list):
+        return [stable_data(item) for item in data]
+    return data
+
+
+class EdgeRoute(NamedTuple):
+    source: str
+    source_key: str
+    target: str
+    target_key: str
+
+
+class StreamRoute(NamedTuple):
+    '''an edge between two streaming nodes that run concurrently, resolved to its fields'''
+    route: EdgeRoute
+    output_index: int
+    input_label: str
+
+
+class CompiledGraph:
+    '''an indexed view of a graph definition, built once per run
+
+    edges are grouped by source and target node with their handles already parsed,
+    so instantiation and output transfer only touch the edges of the node at hand
+    '''
+
+    def __init__(self, nodes: list[dict], edges: list[dict]):
+        self.nodes: dict[str, dict] = {str(node['id']): node for node in nodes}
+        self.outgoing: dict[str, list[EdgeRoute]] = {node_id: [] for node_id in self.nodes}
+        self.incoming: dict[str, list[EdgeRoute]] = {node_id: [] for node_id in self.nodes}
+        self.transfers: dict[str, list[tuple]] = {}
+
+        for edge in edges:
+            route = EdgeRoute(
+                source=str(edge['source']),
+                source_key=parse_handle_key(edge['sourceHandle']),
+                target=str(edge['target']),
+                target_key=parse_handle_key(edge['targetHandle']),
+            )
+            self.outgoing[route.source].append(route)
+            self.incoming[route.target].append(route)
+
+        self.order: list[str] = topological_sort({'nodes': nodes, 'edges': edges})
+
+    def dependency_counts(self) -> dict[str, int]:
+        '''the number of incoming edges of every node, for ready-queue scheduling'''
+        return {node_id: len(routes) for node_id, routes in self.incoming.items()}
+
+    def fingerprints(self) -> dict[str, str]:
+        '''hashes each node's class and unconnected input data together with the fingerprints
+        of the nodes feeding it, so a change anywhere upstream changes the fingerprint'''
+        fingerprints = {}
+        for node_id in self.order:
+            node_data = self.nodes[node_id].get('data', {})
+            connected = self.connected_inputs(node_id)
+            inputs = [
+                (index, stable_data(inp.get('data')))
+                for index, inp in enumerate(node_data.get('inputs', []))
+                if index not in connected
+            ]
+            upstream = sorted(
+                (route.target_key, fingerprints.get(route.source, ''), route.source_key)
+                for route in self.incoming[node_id]
+            )
+            key = json.dumps(
+                [node_data.get('namespace'), node_data.get('class_name'), inputs, upstream],
+                sort_keys=True,
+                default=str,
+            )
+            fingerprints[node_id] = hashlib.sha1(key.encode()).hexdigest()
+        return fingerprints
+
+    def connected_inputs(self, node_id: str) -> set[int]:
+        '''returns the positions of the inputs of a (raw) node that are fed by an edge'''
+        inputs = self.nodes[node_id].get('data', {}).get('inputs', [])
+        connected = set()
+        for route in self.incoming[node_id]:
+            index = resolve_slot(inputs, route.target_key)
+            if index is not None:
+                connected.add(index)
+        return connected
+
+    def bind(self, node_instances: dict[str, BaseNode]):
+        '''resolves every edge to the (output field, input field) pair it moves data between'''
+        self.transfers = {node_id: [] for node_id in node_instances}
+        for node_id, source_node in node_instances.items():
+            for route in self.outgoing.get(node_id, []):
+                target_node = node_instances.get(route.target)
+                if target_node is None:
+                    continue
+                source_index = resolve_slot(source_node.data.outputs, route.source_key)
+                target_index = resolve_slot(target_node.data.inputs, route.target_key)
+                if source_index is None or target_index is None:
+                    continue
+                self.transfers[node_id].append((
+                    source_node.data.outputs[source_index],
+                    target_node.data.inputs[target_index],
+                ))
+
+    def stream_routes(self, node_instances: dict[str, BaseNode], skip: set[str]) -> dict[str, list[StreamRoute]]:
+        '''finds the edges along which streaming nodes can be pipelined, grouped by the producing node.
+
+        a consumer is pipelined when every edge into it comes from a single executed streaming
+        node into one of its stream_inputs. it then starts together with that node, so it never
+        waits on anything the producer could be blocked on
+        '''
+        routes = {}
+        for node_id, consumer in node_instances.items():
+            stream_inputs = getattr(consumer, 'stream_inputs', ())
+            incoming = self.incoming.get(node_id, [])
+            if node_id in skip or not consumer.data.streaming or not stream_inputs or not incoming:
+                continue
+            producer_id = incoming[0].source
+            producer = node_instances.get(producer_id)
+            if producer is None or producer_id in skip or not producer.data.streaming:
+                continue
+            if any(route.source != producer_id for route in incoming):
+                continue
+
+            resolved = []
+            for route in incoming:
+                output_index = resolve_slot(producer.data.outputs, route.source_key)
+                input_index = resolve_slot(consumer.data.inputs, route.target_key)
+                if output_index is None or input_index is None:
+                    break
+                input_label = consumer.data.inputs[input_index].label
+                if input_label not in stream_inputs:
+                    break
+                resolved.append(StreamRoute(route, output_index, input_label))
+            else:
+                routes.setdefault(producer_id, []).extend(resolved)
+        return routes
+
+    def transfer_outputs(self, node_id: str):
+        '''copies the outputs of an executed node into the inputs connected to them'''
+        for source_output, target_input in self.transfers.get(node_id, []):
+            target_input.data = source_output.data
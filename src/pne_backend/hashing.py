@@ -0,0 +1,44 @@
+import hashlib
+from typing import Any
+
+import numpy as np
+from pydantic import BaseModel
+
+
+class UnhashableContent(TypeError):
+    pass
+
+
+def content_hash(value: Any) -> str:
+    '''a stable hash of a value's content, equal for equal data across instances and runs'''
+    hasher = hashlib.blake2b(digest_size=16)
+    update_hash(hasher, value)
+    return hasher.hexdigest()
+
+
+def update_hash(hasher, value: Any):
+    '''feeds a value into a hasher, tagging each part with its type so 1, 1.0 and '1' differ'''
+    if hasattr(value, 'content_hash') and isinstance(value, BaseModel):
+        # BaseData and ModelData memoize/compose their own hashes
+        hasher.update(b'model:')
+        hasher.update(value.content_hash().encode())
+    elif isinstance(value, np.ndarray):
+        # hash the raw buffer instead of converting to python objects
+        hasher.update(f'ndarray:{value.dtype.str}:{value.shape}:'.encode())
+        hasher.update(np.ascontiguousarray(value).data)
+    elif isinstance(value, (list, tuple)):
+        hasher.update(f'{type(value).__name__}:{len(value)}:'.encode())
+        for item in value:
+            update_hash(hasher, item)
+    elif isinstance(value, dict):
+        hasher.update(f'dict:{len(value)}:'.encode())
+        for key in sorted(value, key=repr):
+            update_hash(hasher, key)
+            update_hash(hasher, value[key])
+    elif isinstance(value, bytes):
+        hasher.update(f'bytes:{len(value)}:'.encode())
+        hasher.update(value)
+    elif value is None or isinstance(value, (str, int, float, bool, np.generic)):
+        hasher.update(f'{type(value).__name__}:{value!r};'.encode())
+    else:
+        raise UnhashableContent(f"Cannot hash content of type {type(value).__name__}")
@@ -0,0 +1,108 @@
+from typing import Any
+
+from .base_data import BaseData
+from .base_node import BaseNode
+from .graph import CompiledGraph
+from .sizing import deep_sizeof
+
+
+def held_by_cache(data: Any) -> bool:
+    '''data whose payload was moved to the large data cache, dropping it here frees nothing'''
+    return isinstance(data, BaseData) and data.id is not None and BaseData.cache_key_exists(data.id)
+
+
+class LivenessTracker:
+    '''follows which node outputs are still needed during a run and measures the memory they hold.
+
+    an output is live until every node it feeds has run. with free_outputs the outputs of a node
+    are dropped once it stops being live, and a node's inputs once it has run, as edges only copy
+    references. outputs of nodes feeding nothing are kept, they are the results of the run,
+    as are the outputs of the nodes in keep. dropped outputs are evicted from the result cache
+    too, which would otherwise keep them alive.
+
+    the report compares the peak bytes held by outputs with what keeping every output would hold
+    '''
+
+    def __init__(
+        self,
+        graph: CompiledGraph,
+        node_instances: dict[str, BaseNode],
+        free_outputs: bool = False,
+        keep: set[str] = frozenset(),
+    ):
+        self.graph = graph
+        self.node_instances = node_instances
+        self.free_outputs = free_outputs
+        self.keep = keep
+        self.remaining_consumers = {
+            node_id: len({route.target for route in routes}) for node_id, routes in graph.outgoing.items()
+        }
+        # node id -> the input fields that edges copy data into
+        fed = {id(target_input) for transfers in graph.transfers.values() for _, target_input in transfers}
+        self.fed_inputs: dict[str, list] = {
+            node_id: [field for field in node_instance.data.inputs if id(field) in fed]
+            for node_id, node_instance in node_instances.items()
+        }
+        # id(data) -> [size, number of unreleased nodes holding it as an output]
+        self.live: dict[int, list[int]] = {}
+        self.live_bytes = 0
+        self.peak_bytes = 0
+        self.retained_bytes = 0
+        self.finished: set[str] = set()
+        self.released: set[str] = set()
+        # node id -> its result cache key, taken before its inputs are dropped
+        self.memo_keys: dict = {}
+
+    def outputs(self, node_id: str) -> list:
+        node_instance = self.node_instances.get(node_id)
+        return [] if node_instance is None else [o for o in node_instance.data.outputs if o.data is not None]
+
+    def node_finished(self, node_id: str):
+        '''call once a node has run (or was skipped) and its outputs were passed on'''
+        for output in self.outputs(node_id):
+            entry = self.live.get(id(output.data))
+            if entry is None:
+                size = deep_sizeof(output.data)
+                self.live[id(output.data)] = [size, 1]
+                self.live_bytes += size
+                self.retained_bytes += size
+            else:
+                entry[1] += 1
+        self.peak_bytes = max(self.peak_bytes, self.live_bytes)
+        self.finished.add(node_id)
+
+        if self.free_outputs:
+            node_instance = self.node_instances.get(node_id)
+            if node_instance is not None and self.graph.outgoing.get(node_id) and node_id not in self.keep:
+                self.memo_keys[node_id] = node_instance.memo_key()
+            for field in self.fed_inputs.get(node_id, []):
+                field.data = None
+        # pipelined consumers can finish before the node streaming into them
+        if self.graph.outgoing.get(node_id) and self.remaining_consumers[node_id] == 0:
+            self.release(node_id)
+        for producer_id in {route.source for route in self.graph.incoming.get(node_id, [])}:
+            self.remaining_consumers[producer_id] -= 1
+            if self.remaining_consumers[producer_id] == 0 and producer_id in self.finished:
+                self.release(producer_id)
+
+    def release(self, node_id: str):
+        '''a node's outputs have been read by all its consumers'''
+        if node_id in self.keep:
+            return
+        for output in self.outputs(node_id):
+            entry = self.live.get(id(output.data))
+            if entry is None:
+                continue
+            if self.free_outputs and not held_by_cache(output.data):
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self.live[id(output.data)]
+                    self.live_bytes -= entry[0]
+                output.data = None
+                self.released.add(node_id)
+        memo_key = self.memo_keys.pop(node_id, None)
+        if memo_key is not None and node_id in self.released:
+            BaseNode.result_cache.pop(memo_key)
+
+    def report(self) -> dict:
+        return {'peak_bytes': self.peak_bytes, 'retained_bytes': self.retained_bytes}
@@ -1,21 +1,62 @@
 import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import APIRouter, WebSocket
 from starlette.websockets import WebSocketState, WebSocketDisconnect
 
 from .routes.large_files_upload import large_files_router
 from .routes.autosave import autosave_router
+from .catalog import NodeCatalog
+from .sessions import SessionRegistry
 from .execution_wrapper import ExecutionWrapper
-from .utils import find_and_load_classes
-from .base_node import BaseNode
 from .datatypes.compound import ListData
 from .field import InputNodeField
+from .transport import ARRAY_ENCODINGS, INBOUND_ARRAY_ENCODINGS, has_binary_arrays
+from .delta import UPDATE_MODES
+from .profiling import PROFILE_MODES
+from .metrics import METRICS, stats_metrics
 
 CACHE_SAVE_INTERVAL_MINS = 1
+# reload edited node modules while the server runs, needs watchfiles
+HOT_RELOAD_NODES = True
 
-app = FastAPI()
+# every open /execute connection with the engine of its session, catalog updates are pushed to all of them
+CONNECTED_CLIENTS: dict[WebSocket, ExecutionWrapper] = {}
+
+
+async def broadcast(message: dict):
+    for websocket, wrapper in list(CONNECTED_CLIENTS.items()):
+        try:
+            if wrapper.websocket is websocket:
+                # through the engine, so the message can't land between a node update and its frames
+                await wrapper.send_now(message, tag_run=False)
+            else:
+                await websocket.send_json(message)
+        except (WebSocketDisconnect, RuntimeError):
+            CONNECTED_CLIENTS.pop(websocket, None)
+
+
+async def on_catalog_update(update: dict):
+    SESSIONS.set_node_classes(NODE_CATALOG.node_classes)
+    if update['full']:
+        print('Reloaded all nodes')
+    else:
+        print(f"Reloaded {len(update['updated'])} nodes, removed {len(update['removed'])} in {update['category']}")
+    await broadcast(update)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    watcher = asyncio.create_task(NODE_CATALOG.watch(on_catalog_update)) if HOT_RELOAD_NODES else None
+    evictor = asyncio.create_task(SESSIONS.evict_periodically())
+    yield
+    evictor.cancel()
+    if watcher:
+        watcher.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,8 +70,12 @@ app.add_middleware(
 app.include_router(large_files_router)
 app.include_router(autosave_router)
 
-EXECUTION_WRAPPER = ExecutionWrapper()
-EXECUTION_WRAPPER.node_classes = find_and_load_classes("pne_backend.nodes")
+NODE_CATALOG = NodeCatalog("pne_backend.nodes")
+NODE_CATALOG.load()
+
+# every editor gets its own execution engine, clients name their session with ?session=<id>
+SESSIONS = SessionRegistry(NODE_CATALOG.node_classes)
+METRICS.add_collector(lambda: stats_metrics('pne', SESSIONS.stats(), help='editor'))
 
 # # load basic and compund datatypes defined in the datatypes directory
 # DATATYPE_REGISTRY = dynamic_datatype_load('pne_backend.datatypes')
@@ -46,50 +91,92 @@ EXECUTION_WRAPPER.node_classes = find_and_load_classes("pne_backend.nodes")
 @app.websocket("/execute")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    EXECUTION_WRAPPER.set_websocket(websocket)
-    tasks = []
+    # clients that don't name a session get one of their own, dropped when the connection closes
+    session = SESSIONS.connect(websocket.query_params.get("session"))
+    wrapper = session.wrapper
+    wrapper.set_websocket(websocket)
+    CONNECTED_CLIENTS[websocket] = wrapper
     try:
         while True:
             if websocket.client_state == WebSocketState.CONNECTED:
                 data = await websocket.receive_json()
+                session.touch()
                 if data.get("action") == "execute":
-                    EXECUTION_WRAPPER.cancel_flag = False
+                    # clients that decode raw array buffers can opt out of nested lists
+                    array_encoding = data.get("array_encoding", "list")
+                    # clients that apply node_delta messages get only what changed in each node
+                    update_mode = data.get("update_mode", "full")
+                    # profiled runs end with a profile event of per node timings
+                    profile = data.get("profile", "off")
                     flow = data["flow"]
+                    if any(
+                        has_binary_arrays(node_input.get('data'))
+                        for node in flow["nodes"] for node_input in node.get('data', {}).get('inputs', [])
+                    ):
+                        # the frames aren't read, the flow couldn't be deserialized
+                        await wrapper.send_now({
+                            "event": "execution_rejected",
+                            "run_id": data.get("run_id"),
+                            "error": f"Arrays sent to the server must be encoded as one of {INBOUND_ARRAY_ENCODINGS}",
+                        })
+                        continue
                     # print(f'Executing {flow["metadata"]["filename"]}')
                     print(f'Executing flow')
-                    task = asyncio.create_task(EXECUTION_WRAPPER.execute_graph(
-                        flow, 
-                    ))
-                    tasks.append(task)
-                    await websocket.send_json({"event": 'execution_started'})
+                    # the connection stays open between runs and every event carries the id of its run.
+                    # requests in quick succession (a dragged slider) are debounced to the latest,
+                    # which supersedes the run in flight
+                    await session.submit(
+                        flow,
+                        data.get("run_id"),
+                        array_encoding=array_encoding if array_encoding in ARRAY_ENCODINGS else "list",
+                        update_mode=update_mode if update_mode in UPDATE_MODES else "full",
+                        profile=profile if profile in PROFILE_MODES else "off",
+                    )
                 elif data.get("action") == "cancel":
-                    EXECUTION_WRAPPER.cancel_flag = True
+                    await session.cancel(data.get("run_id"))
     except WebSocketDisconnect:
         pass
     finally:
-        EXECUTION_WRAPPER.set_websocket(None)
+        CONNECTED_CLIENTS.pop(websocket, None)
+        SESSIONS.disconnect(session)
+        # a newer connection to the session may have taken over its websocket
+        if wrapper.websocket is websocket:
+            wrapper.set_websocket(None)
 
 @app.get("/all_nodes")
-def get_all_nodes():
-    """Finds and retrieves all nodes in the nodes directory"""
+def get_all_nodes(request: Request):
+    """Returns all nodes in the nodes directory, reloading them only when a node module changed"""
     import time
     start_time = time.time()
-    
-    global EXECUTION_WRAPPER
-    EXECUTION_WRAPPER.node_classes = find_and_load_classes("pne_backend.nodes")
-
-    nodes_dict = {}
-    for key, value in EXECUTION_WRAPPER.node_classes.items():
-        category_list = []
-        for node_class in value:
-            instance: BaseNode = node_class(id='')
-            category_list.append(instance.model_dump())
-        nodes_dict[key] = category_list
+
+    if NODE_CATALOG.refresh():
+        SESSIONS.set_node_classes(NODE_CATALOG.node_classes)
+
+    # no-cache makes the browser revalidate with the etag instead of reusing a stale catalog
+    headers = {"ETag": NODE_CATALOG.etag, "Cache-Control": "no-cache"}
+    if NODE_CATALOG.matches(request.headers.get("if-none-match")):
+        response = Response(status_code=304, headers=headers)
+    else:
+        response = Response(content=NODE_CATALOG.body, media_type="application/json", headers=headers)
 
     duration = time.time() - start_time
     print(f"get_all_nodes took {duration:.3f} seconds")
-    
-    return nodes_dict
+
+    return response
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Run, node, cache and websocket metrics in the prometheus text format"""
+    return Response(content=METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.post("/reload_nodes")
+def reload_nodes():
+    """Forces the node modules to be reimported, for changes the file times don't reveal"""
+    NODE_CATALOG.load()
+    SESSIONS.set_node_classes(NODE_CATALOG.node_classes)
+    return {"etag": NODE_CATALOG.etag}
 
 
 if __name__ == "__main__":
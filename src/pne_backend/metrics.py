@@ -0,0 +1,177 @@
+import math
+import threading
+from typing import Callable, ClassVar, Iterable
+
+from .base_data import LARGE_DATA_CACHE
+from .base_node import BaseNode
+from .cache import SizedLRUCache
+
+# upper bounds of the buckets of run and node durations, in seconds
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# upper bounds of the buckets of websocket send durations, in seconds
+SEND_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1)
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + '}'
+
+
+class Metric:
+    '''a metric in the prometheus text format, with a value for every combination of its labels'''
+
+    kind: ClassVar[str] = 'untyped'
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values: dict[tuple[str, ...], float] = {}
+        # observed from worker threads as well as the event loop
+        self.lock = threading.Lock()
+
+    def key(self, labels: dict) -> tuple[str, ...]:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes the labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self) -> list[tuple[str, dict[str, str], float]]:
+        with self.lock:
+            return [(self.name, dict(zip(self.labels, key)), value) for key, value in self.values.items()]
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        lines += [f'{name}{format_labels(labels)} {format_value(value)}' for name, labels, value in self.samples()]
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Iterable[float] = DURATION_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [count per bucket, sum, count]
+        self.values: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self.key(labels)
+        with self.lock:
+            entry = self.values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self) -> list[tuple[str, dict[str, str], float]]:
+        samples = []
+        with self.lock:
+            for key, (counts, total, count) in self.values.items():
+                labels = dict(zip(self.labels, key))
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append((f'{self.name}_bucket', labels | {'le': format_value(bound)}, cumulative))
+                samples.append((f'{self.name}_sum', labels, total))
+                samples.append((f'{self.name}_count', labels, count))
+        return samples
+
+
+class MetricsRegistry:
+    '''the metrics of the server, rendered for a prometheus scrape.
+
+    collectors are called on every scrape for metrics read from elsewhere, like cache stats
+    '''
+
+    def __init__(self):
+        self.metrics: list[Metric] = []
+        self.collectors: list[Callable[[], list[Metric]]] = []
+
+    def add(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+        return self.add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Iterable[str] = ()) -> Gauge:
+        return self.add(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Iterable[str] = (), buckets: Iterable[float] = DURATION_BUCKETS) -> Histogram:
+        return self.add(Histogram(name, help, labels, buckets))
+
+    def add_collector(self, collector: Callable[[], list[Metric]]):
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        metrics = list(self.metrics)
+        for collector in self.collectors:
+            metrics += collector()
+        return '\n'.join(line for metric in metrics for line in metric.render()) + '\n'
+
+
+def stats_metrics(prefix: str, stats: dict, counters: Iterable[str] = (), help: str = '') -> list[Metric]:
+    '''a gauge for every number in a stats dict, and a counter named <key>_total for the keys in counters'''
+    metrics = []
+    for key, value in stats.items():
+        if key in counters:
+            metric = Counter(f'{prefix}_{key}_total', f'{help} {key}'.strip())
+        else:
+            metric = Gauge(f'{prefix}_{key}', f'{help} {key}'.strip())
+        metric.values[()] = value
+        metrics.append(metric)
+    return metrics
+
+
+def cache_metrics(prefix: str, cache: SizedLRUCache, help: str) -> list[Metric]:
+    '''the stats of a cache, with the share of lookups that were hits'''
+    stats = cache.stats()
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+    return stats_metrics(prefix, stats, counters={'hits', 'misses', 'evictions', 'spills', 'revivals'}, help=help)
+
+
+METRICS = MetricsRegistry()
+
+RUNS = METRICS.counter('pne_runs_total', 'graph runs by how they ended, ok, error (a node failed) or cancelled', ['outcome'])
+RUN_SECONDS = METRICS.histogram('pne_run_duration_seconds', 'duration of graph runs')
+NODE_SECONDS = METRICS.histogram('pne_node_duration_seconds', 'duration of node executions, by node class', ['node_class'])
+NODE_ERRORS = METRICS.counter('pne_node_errors_total', 'node executions that raised, by node class', ['node_class'])
+SEND_SECONDS = METRICS.histogram('pne_websocket_send_seconds', 'time to send a message to a client', buckets=SEND_BUCKETS)
+BYTES_SENT = METRICS.counter('pne_websocket_sent_bytes_total', 'bytes sent to clients, by frame type', ['frame'])
+
+METRICS.add_collector(lambda: cache_metrics('pne_large_data_cache', LARGE_DATA_CACHE, 'large data cache'))
+METRICS.add_collector(lambda: cache_metrics('pne_result_cache', BaseNode.result_cache, 'node result cache'))
@@ -4,6 +4,8 @@ import base64
 import io
 from math import sqrt
 
+from ...base_node import check_cancelled
+
 class StrokeOptim:
     def __init__(self, url, api_key):
         self.url = url
@@ -84,6 +86,8 @@ class StrokeOptim:
         status = None
         iteration_status = None  # Initialize iteration_status outside the loop
         while True:
+            # stop polling if the run was cancelled from the frontend
+            check_cancelled()
             response = self.status()
             if response['status'] != status:
                 print(f"Status: {response['status']}")
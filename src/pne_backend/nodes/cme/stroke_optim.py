@@ -104,6 +104,8 @@ class ConstructStrokeOptimParamsNode(BaseNode):
 class StrokeOptimNode(BaseNode):
     '''Analyzes an image and returns an svg made up of "paint strokes" that represent the image.'''
     min_width: int = 250
+    # the optimization is stochastic, so the same inputs give a different svg every run
+    memoize = False
 
     @classmethod
     @node_definition(
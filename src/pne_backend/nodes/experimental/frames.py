@@ -0,0 +1,78 @@
+import numpy as np
+from PIL import Image, ImageFilter
+from typing import ClassVar
+
+from ...base_node import StreamingBaseNode, node_definition
+from ...field import InputNodeField, OutputNodeField
+from ...datatypes.basic import IntData
+from ...datatypes.image import ImageData
+
+
+class FrameSequenceNode(StreamingBaseNode):
+    '''Streams an image as a sequence of frames, shifted a little further each frame'''
+    group: str = 'Frames'
+
+    @classmethod
+    @node_definition(
+        inputs=[
+            InputNodeField(label='image', allowed_types=['ImageData']),
+            InputNodeField(label='frames', allowed_types=['IntData'], data=IntData(payload=30)),
+            InputNodeField(label='step', allowed_types=['IntData'], data=IntData(payload=4)),
+        ],
+        outputs=[
+            OutputNodeField(label='frame', allowed_types=['ImageData'])
+        ]
+    )
+    def exec_stream(cls, image: ImageData, frames: IntData, step: IntData):
+        if image is None:
+            raise ValueError("FrameSequenceNode needs an image")
+        for i in range(frames.payload):
+            frame = np.roll(image.payload, i * step.payload, axis=1)
+            yield {'progress': (i + 1) / frames.payload, 'outputs': [ImageData(payload=frame)]}
+
+
+class FrameBlurNode(StreamingBaseNode):
+    '''Blurs every frame of a stream as it arrives'''
+    group: str = 'Frames'
+    stream_inputs: ClassVar[tuple[str, ...]] = ('frames',)
+
+    @classmethod
+    @node_definition(
+        inputs=[
+            InputNodeField(label='frames', allowed_types=['ImageData']),
+            InputNodeField(label='radius', allowed_types=['IntData'], data=IntData(payload=3)),
+        ],
+        outputs=[
+            OutputNodeField(label='frame', allowed_types=['ImageData'])
+        ]
+    )
+    def exec_stream(cls, frames, radius: IntData):
+        for frame in frames:
+            img = Image.fromarray(frame.payload.astype(np.uint8))
+            img = img.filter(ImageFilter.GaussianBlur(radius=radius.payload))
+            yield {'outputs': [ImageData(payload=np.array(img))]}
+
+
+class FrameAverageNode(StreamingBaseNode):
+    '''Averages the frames of a stream, holding only the running sum'''
+    group: str = 'Frames'
+    stream_inputs: ClassVar[tuple[str, ...]] = ('frames',)
+
+    @classmethod
+    @node_definition(
+        inputs=[
+            InputNodeField(label='frames', allowed_types=['ImageData']),
+        ],
+        outputs=[
+            OutputNodeField(label='average', allowed_types=['ImageData'])
+        ]
+    )
+    def exec_stream(cls, frames):
+        total = None
+        count = 0
+        for frame in frames:
+            total = frame.payload.astype(np.float64) if total is None else total + frame.payload
+            count += 1
+            yield {'outputs': [ImageData(payload=(total / count).astype(np.uint8))]}
+        if total is None:
+            raise ValueError("FrameAverageNode received no frames")
@@ -10,7 +10,12 @@ from ...datatypes.basic import StringData
 from ...datatypes.image import ImageData
 from ...base_node import BaseNode, node_definition
 
+REQUEST_TIMEOUT_S = 30
+
 class ImageFromUrlNode(BaseNode):
+    # the image behind a url can change between runs
+    memoize = False
+
     @classmethod
     @node_definition(
         inputs=[
@@ -27,7 +32,7 @@ class ImageFromUrlNode(BaseNode):
         ]
     )
     def exec(cls, url: StringData) -> ImageData:
-        response = requests.get(url.payload)
+        response = requests.get(url.payload, timeout=REQUEST_TIMEOUT_S)
         response.raise_for_status()  # Raise an exception for bad status codes
         image = Image.open(BytesIO(response.content))
         
@@ -2,8 +2,6 @@ from typing import Union
 from ...base_node import BaseNode, node_definition
 from ...field import InputNodeField, OutputNodeField
 from ...datatypes.basic import IntData, FloatData
-from functools import lru_cache
-MAXSIZE = 10
 
 class DivideNode(BaseNode):
     group: str = 'Basic'
@@ -34,7 +32,6 @@ class DivideNode(BaseNode):
             OutputNodeField(label='result', allowed_types=['FloatData'])
         ]
     )
-    @lru_cache(maxsize=MAXSIZE)
     def exec(cls, a: Union[IntData, FloatData], b: Union[IntData, FloatData]) -> FloatData:
         if b.payload == 0:
             raise ValueError("Cannot divide by zero")
@@ -2,8 +2,6 @@ from typing import Union
 from ...base_node import BaseNode, node_definition
 from ...field import InputNodeField, OutputNodeField
 from ...datatypes.basic import IntData, FloatData
-from functools import lru_cache
-MAXSIZE = 10
 
 class MultiplyNode(BaseNode):
     group: str = 'Basic'
@@ -35,7 +33,6 @@ class MultiplyNode(BaseNode):
             OutputNodeField(label='result', allowed_types=['IntData', 'FloatData'])
         ]
     )
-    @lru_cache(maxsize=MAXSIZE)
     def exec(cls, a: Union[IntData, FloatData], b: Union[IntData, FloatData]) -> FloatData:
         if isinstance(a, IntData) and isinstance(b, IntData):
             result = a.payload * b.payload
@@ -1,12 +1,8 @@
-from functools import lru_cache
 from typing import Tuple, Union
 from ...base_node import BaseNode, node_definition
 from ...field import InputNodeField, OutputNodeField
 from ...datatypes.basic import IntData, FloatData
 
-MAXSIZE = 10
-
-
 class SplitNode(BaseNode):
     group: str = 'Special'
     @classmethod
@@ -37,7 +33,6 @@ class SplitNode(BaseNode):
             OutputNodeField(label='split_1_minus_t', allowed_types=['FloatData'])
         ]
     )
-    @lru_cache(maxsize=MAXSIZE)
     def exec(cls, number: Union[IntData, FloatData], t: FloatData) -> Tuple[FloatData, FloatData]:
         if not 0 <= t.payload <= 1:
             raise ValueError("t must be between 0 and 1")
@@ -1,12 +1,8 @@
 from typing import Union
-from functools import lru_cache
 from ...base_node import BaseNode, node_definition
 from ...field import InputNodeField, OutputNodeField
 from ...datatypes.basic import IntData, FloatData
 
-
-MAXSIZE = 10
-
 class SubtractNode(BaseNode):
     group: str = 'Basic'
     @classmethod
@@ -36,7 +32,6 @@ class SubtractNode(BaseNode):
             OutputNodeField(label='result', user_label='Result', allowed_types=['IntData', 'FloatData'])
         ]
     )
-    @lru_cache(maxsize=MAXSIZE)
     def exec(cls, a: Union[IntData, FloatData], b: Union[IntData, FloatData]) -> FloatData:
         # if both are ints, return an int
         if isinstance(a, IntData) and isinstance(b, IntData):
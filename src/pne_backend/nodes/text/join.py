@@ -1,11 +1,7 @@
-from functools import lru_cache
-
 from ...base_node import BaseNode, node_definition
 from ...field import InputNodeField, OutputNodeField
 from ...datatypes.basic import StringData
 
-MAXSIZE = 10
-
 class JoinNode(BaseNode):
     group: str = 'Basic'
 
@@ -39,7 +35,6 @@ class JoinNode(BaseNode):
             )
         ]
     )
-    @lru_cache(maxsize=MAXSIZE)
     def exec(cls, a: StringData, b: StringData, separator: StringData) -> StringData:
         join_result = separator.payload.join([a.payload, b.payload])
         return StringData(payload=join_result)
\ No newline at end of file
@@ -0,0 +1,60 @@
+import queue
+from typing import Any, Iterator, Optional
+
+from .base_node import check_cancelled
+
+# partial outputs buffered between two pipelined streaming nodes before the producer has to wait
+PIPE_MAX_ITEMS = 4
+# how often a producer or consumer waiting on a pipe checks for a cancel
+PIPE_POLL_INTERVAL = 0.1
+
+
+class UpstreamStreamFailed(Exception):
+    pass
+
+
+class PipeEnd:
+    '''marks the end of a stream, carrying the producer's error if it failed'''
+    def __init__(self, error: Optional[BaseException] = None):
+        self.error = error
+
+
+class StreamPipe:
+    '''a bounded queue carrying one output of a streaming node to the input of a streaming node
+    running alongside it. a full pipe blocks the producer, so a chain of streaming nodes runs
+    at the pace of its slowest node and holds at most PIPE_MAX_ITEMS partial outputs per edge
+    '''
+
+    def __init__(self, max_items: int = PIPE_MAX_ITEMS):
+        self.queue = queue.Queue(maxsize=max_items)
+        # set when the consumer stops reading, so the producer doesn't wait on it forever
+        self.abandoned = False
+
+    def put(self, item: Any):
+        '''waits for room in the pipe, dropping the item if the consumer has gone away'''
+        while not self.abandoned:
+            check_cancelled()
+            try:
+                self.queue.put(item, timeout=PIPE_POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def close(self, error: Optional[BaseException] = None):
+        self.put(PipeEnd(error))
+
+    def abandon(self):
+        self.abandoned = True
+
+    def __iter__(self) -> Iterator[Any]:
+        while True:
+            check_cancelled()
+            try:
+                item = self.queue.get(timeout=PIPE_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if isinstance(item, PipeEnd):
+                if item.error is not None:
+                    raise UpstreamStreamFailed(f"Upstream streaming node failed: {item.error}") from item.error
+                return
+            yield item
@@ -0,0 +1,147 @@
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+
+# what a run records about itself:
+# 'off' nothing, 'nodes' per node timings and memory sent as a profile event,
+# 'trace' also a chrome trace of the run, 'python' also a cProfile dump of every node
+PROFILE_MODES = ('off', 'nodes', 'trace', 'python')
+# where profiled runs write their trace and cProfile dump
+PROFILE_DIR = 'profiles'
+# before 3.12 a cProfile profiler only sees the thread that enabled it, every node gets its own.
+# from 3.12 on it sees every thread and only one can be enabled at a time, the loop's covers the nodes
+PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+
+class RunProfiler:
+    '''records where the time and memory of a run go, per node.
+
+    wall and cpu time are measured on the thread the node runs on (cpu time isn't available for
+    nodes in the process pool). peak allocation comes from tracemalloc, which is process wide,
+    so nodes running at the same time share their peaks. serialization time and bytes sent are
+    those of the node's updates to the client.
+
+    with python=True every node, and the event loop, also run under cProfile, see PER_THREAD_PROFILES
+    '''
+
+    def __init__(self, python: bool = False, trace_allocations: bool = True):
+        self.python = python
+        self.trace_allocations = trace_allocations
+        self.started_tracing = False
+        self.start_time = time.time()
+        self.nodes: dict[str, dict[str, Any]] = {}
+        self.phases: dict[str, float] = {}
+        # chrome trace events, timestamps in microseconds since the start of the run
+        self.events: list[dict] = []
+        self.profiles: list[cProfile.Profile] = []
+        self.loop_profile: Optional[cProfile.Profile] = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        if self.python:
+            self.loop_profile = cProfile.Profile()
+            try:
+                self.loop_profile.enable()
+            except ValueError as e:
+                # another profiler is active, which is process wide from 3.12 on
+                print(f"Not profiling the run with cProfile: {e}")
+                self.loop_profile = None
+
+    def stop(self):
+        if self.loop_profile:
+            self.loop_profile.disable()
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def node(self, node_id: str) -> dict[str, Any]:
+        with self.lock:
+            return self.nodes.setdefault(node_id, {
+                'class_name': None, 'wall_ms': 0.0, 'cpu_ms': None, 'serialize_ms': 0.0,
+                'bytes_sent': 0, 'peak_alloc_bytes': None,
+            })
+
+    def add_event(self, name: str, category: str, start: float, end: float, tid: Optional[int] = None, **args):
+        with self.lock:
+            self.events.append({
+                'name': name, 'cat': category, 'ph': 'X', 'pid': os.getpid(),
+                'tid': tid if tid is not None else threading.get_ident(),
+                'ts': (start - self.start_time) * 1e6, 'dur': (end - start) * 1e6, 'args': args,
+            })
+
+    def phase(self, name: str, start: float, end: float):
+        '''a step of the run on the event loop, like compilation or instantiation'''
+        self.phases[f'{name}_ms'] = (end - start) * 1000
+        self.add_event(name, 'run', start, end)
+
+    def wrap(self, node_id: str, class_name: str, func: Callable) -> Callable:
+        '''func measured on the thread that calls it'''
+
+        def profiled(*args, **kwargs):
+            profile = cProfile.Profile() if self.python and PER_THREAD_PROFILES else None
+            tracing = tracemalloc.is_tracing()
+            if tracing:
+                base = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+            start, cpu_start = time.time(), time.thread_time()
+            if profile:
+                profile.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                if profile:
+                    profile.disable()
+                end, cpu_end = time.time(), time.thread_time()
+                stats = self.node(node_id)
+                stats['class_name'] = class_name
+                stats['wall_ms'] += (end - start) * 1000
+                stats['cpu_ms'] = (stats['cpu_ms'] or 0) + (cpu_end - cpu_start) * 1000
+                if tracing:
+                    stats['peak_alloc_bytes'] = max(0, tracemalloc.get_traced_memory()[1] - base)
+                with self.lock:
+                    if profile:
+                        self.profiles.append(profile)
+                self.add_event(class_name, 'node', start, end, node_id=node_id)
+
+        return profiled
+
+    def waited(self, node_id: str, class_name: str, start: float, end: float):
+        '''a node that ran out of this process, only its wall time is known'''
+        stats = self.node(node_id)
+        stats['class_name'] = class_name
+        stats['wall_ms'] += (end - start) * 1000
+        self.add_event(class_name, 'node', start, end, tid=0, node_id=node_id)
+
+    def serialized(self, node_id: str, start: float, end: float, nbytes: int):
+        stats = self.node(node_id)
+        stats['serialize_ms'] += (end - start) * 1000
+        stats['bytes_sent'] += nbytes
+        self.add_event('serialize', 'update', start, end, node_id=node_id, bytes=nbytes)
+
+    def report(self) -> dict:
+        return {'nodes': self.nodes, 'phases': self.phases}
+
+    def export_trace(self, path: str) -> str:
+        '''writes the run as chrome trace events, for chrome://tracing or perfetto'''
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
+        return path
+
+    def export_cprofile(self, path: str) -> Optional[str]:
+        '''writes the merged cProfile stats of the loop and every node, viewable with tuna'''
+        profiles = [p for p in [self.loop_profile, *self.profiles] if p is not None]
+        if not profiles:
+            return None
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        pstats.Stats(*profiles).dump_stats(path)
+        return path
@@ -0,0 +1,134 @@
+from weakref import WeakKeyDictionary
+
+from pydantic import BaseModel
+
+from .base_node import BaseNode
+from .field import InputNodeField, OutputNodeField
+from .datatypes.compound import CLASS_REGISTRY
+
+
+# node data recomputed from the class on every instantiation, never taken from the flow
+STATIC_NODE_KEYS = ('class_name', 'namespace', 'definition_path', 'description', 'streaming')
+# the parts of a field the user (or the frontend) changes, the rest is fixed by the node definition
+EDITABLE_FIELD_KEYS = ('user_label', 'is_edge_connected', 'metadata')
+
+
+def construct(model_class: type[BaseModel], values: dict) -> BaseModel:
+    '''model_construct for values that already hold every field, skipping its per-field default lookups'''
+    if model_class.__private_attributes__ or model_class.__pydantic_post_init__:
+        return model_class.model_construct(**values)
+    instance = model_class.__new__(model_class)
+    # in field order, which is the order they are serialized in
+    object.__setattr__(instance, '__dict__', {key: values[key] for key in model_class.model_fields})
+    object.__setattr__(instance, '__pydantic_fields_set__', set(values))
+    object.__setattr__(instance, '__pydantic_extra__', None)
+    object.__setattr__(instance, '__pydantic_private__', None)
+    return instance
+
+
+class NodePrototype:
+    '''what every instance of a node class shares, computed once from a template instance:
+    the static metadata, the input/output layout and the datatypes each input accepts.
+
+    instantiating from the prototype builds the node with model_construct and only validates
+    the data on its inputs, instead of running BaseNode.__init__ and every field validator
+    '''
+
+    def __init__(self, NodeClass: type[BaseNode]):
+        self.NodeClass = NodeClass
+        self.DataClass = NodeClass.model_fields['data'].annotation
+        template = NodeClass(id='')
+
+        # fields node classes declare themselves, like group or min_width
+        self.node_defaults = {key: getattr(template, key) for key in NodeClass.model_fields if key not in ('id', 'data')}
+        self.data_keys = frozenset(self.DataClass.model_fields) - {'inputs', 'outputs'}
+        self.data_defaults = {key: getattr(template.data, key) for key in self.data_keys}
+        self.static = {key: getattr(template.data, key) for key in STATIC_NODE_KEYS}
+        self.display_name = template.data.display_name
+        # widths set as class attributes always win over the flow, like in BaseNode.__init__
+        self.widths = {key: getattr(NodeClass, key) for key in ('min_width', 'max_width') if hasattr(NodeClass, key)}
+
+        self.inputs = [inp.model_dump(exclude={'data'}) for inp in template.data.inputs]
+        self.outputs = [outp.model_dump(exclude={'data'}) for outp in template.data.outputs]
+        self.input_labels = [inp.label for inp in template.data.inputs]
+        self.output_labels = [outp.label for outp in template.data.outputs]
+        # None for AnyData inputs, which accept whatever is registered when the data is validated,
+        # including datatypes registered by node modules loaded later
+        self.allowed_types = [
+            None if inp.allowed_types == ['AnyData'] else set(inp.allowed_types)
+            for inp in template.data.inputs
+        ]
+
+    def matches(self, node_data: dict) -> bool:
+        '''whether a serialized node has this prototype's field layout'''
+        inputs = node_data.get('inputs') or []
+        outputs = node_data.get('outputs') or []
+        return (
+            [inp.get('label') for inp in inputs] == self.input_labels
+            and [outp.get('label') for outp in outputs] == self.output_labels
+        )
+
+    def field_values(self, static: dict, field: dict) -> dict:
+        values = static | {key: field[key] for key in EDITABLE_FIELD_KEYS if key in field}
+        if 'metadata' not in field:
+            # the prototype's metadata would otherwise be shared by every instance
+            values['metadata'] = dict(static['metadata'])
+        return values
+
+    def validate_input_data(self, index: int, data):
+        '''the same check as InputNodeField.validate_data, against the precomputed allowed types'''
+        if not isinstance(data, dict):
+            return data
+        discriminator = data.get('class_name')
+        allowed = self.allowed_types[index]
+        if allowed is None:
+            allowed = CLASS_REGISTRY
+        if discriminator not in allowed:
+            raise ValueError(f"Type '{discriminator}' is not allowed. Allowed types: {sorted(allowed)}.")
+        data_class = CLASS_REGISTRY.get(discriminator)
+        if data_class is None:
+            raise ValueError(f"Discriminator '{discriminator}' not found in CLASS_REGISTRY.")
+        return data_class.model_validate(data, context={'state': 'deserializing'})
+
+    def instantiate(self, node: dict) -> BaseNode:
+        '''builds a node instance from its serialized form'''
+        node_data = node.get('data', {})
+        if not self.matches(node_data):
+            # the fields were changed from the definition, validate everything
+            return self.NodeClass.model_validate(node, context={'state': 'deserializing'})
+
+        inputs = []
+        for index, inp in enumerate(node_data['inputs']):
+            fields = self.field_values(self.inputs[index], inp)
+            fields['data'] = self.validate_input_data(index, inp.get('data'))
+            inputs.append(construct(InputNodeField, fields))
+        outputs = []
+        for index, outp in enumerate(node_data['outputs']):
+            fields = self.field_values(self.outputs[index], outp)
+            fields['data'] = outp.get('data')
+            outputs.append(construct(OutputNodeField, fields))
+
+        data_fields = self.data_defaults | {key: value for key, value in node_data.items() if key in self.data_keys}
+        data_fields |= self.static | self.widths
+        data_fields['display_name'] = node_data.get('display_name') or self.display_name
+        data_fields['inputs'] = inputs
+        data_fields['outputs'] = outputs
+
+        node_fields = self.node_defaults | {key: node[key] for key in self.node_defaults if key in node}
+        node_fields['data'] = construct(self.DataClass, data_fields)
+        if 'id' not in node:
+            return self.NodeClass.model_construct(**node_fields)
+        node_fields['id'] = node['id']
+        return construct(self.NodeClass, node_fields)
+
+
+# keyed weakly by class so hot reloaded classes don't keep their old prototypes alive
+PROTOTYPES: WeakKeyDictionary[type, NodePrototype] = WeakKeyDictionary()
+
+
+def get_prototype(NodeClass: type[BaseNode]) -> NodePrototype:
+    prototype = PROTOTYPES.get(NodeClass)
+    if prototype is None:
+        prototype = PROTOTYPES[NodeClass] = NodePrototype(NodeClass)
+    return prototype
+
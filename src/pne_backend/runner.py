@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+from typing import Any, Optional, Union
+
+import numpy as np
+from PIL import Image
+from pydantic import BaseModel
+
+from .base_data import BaseData
+from .datatypes.image import ImageData
+from .execution_wrapper import ExecutionWrapper
+from .graph import resolve_slot
+from .utils import find_and_load_classes
+
+NODES_MODULE = "pne_backend.nodes"
+
+
+class FlowFailed(Exception):
+    '''raised by run_flow when nodes of the flow ended in an error or their class could not be loaded'''
+
+    def __init__(self, errors: dict[str, str]):
+        self.errors = errors
+        super().__init__(f"{len(errors)} node(s) failed: {', '.join(errors)}")
+
+
+def load_flow(flow: Union[dict, str, os.PathLike]) -> dict:
+    '''a flow as saved by the editor, or the path of one'''
+    if isinstance(flow, dict):
+        return flow
+    with open(flow) as f:
+        return json.load(f)
+
+
+def default_outputs(flow: dict) -> list[str]:
+    '''the nodes that feed nothing, their outputs are the results of a flow'''
+    sources = {str(edge['source']) for edge in flow['edges']}
+    return [str(node['id']) for node in flow['nodes'] if str(node['id']) not in sources]
+
+
+def select_outputs(node_instances: dict, outputs: list[str]) -> list[tuple[str, int]]:
+    '''resolves "node_id" or "node_id:output" (a label or an index) to (node id, output index)'''
+    selected = []
+    for spec in outputs:
+        node_id, _, key = spec.partition(':')
+        node_instance = node_instances.get(node_id)
+        if node_instance is None:
+            raise KeyError(f"No node {node_id} in the flow, or its class could not be loaded")
+        if not key:
+            selected.extend((node_id, index) for index in range(len(node_instance.data.outputs)))
+            continue
+        index = resolve_slot(node_instance.data.outputs, key)
+        if index is None:
+            raise KeyError(f"Node {node_id} has no output {key}")
+        selected.append((node_id, index))
+    return selected
+
+
+def collect_outputs(node_instances: dict, outputs: list[str]) -> dict[str, dict[str, Any]]:
+    '''the selected outputs by node id and output label'''
+    results = {}
+    for node_id, index in select_outputs(node_instances, outputs):
+        output = node_instances[node_id].data.outputs[index]
+        results.setdefault(node_id, {})[output.label] = output.data
+    return results
+
+
+def failed_nodes(node_instances: dict) -> dict[str, str]:
+    return {node_id: node.data.error_output for node_id, node in node_instances.items() if node.data.status == 'error'}
+
+
+def unloaded_nodes(flow: dict, node_instances: dict) -> dict[str, str]:
+    '''the nodes of a flow that were not instantiated, as their class is missing or did not load'''
+    return {
+        str(node['id']): (
+            f"Node class {node.get('data', {}).get('namespace')}.{node.get('data', {}).get('class_name')} could not be loaded"
+        )
+        for node in flow['nodes'] if str(node['id']) not in node_instances
+    }
+
+
+def write_output(data: Any, path: str) -> str:
+    '''writes an output next to path, as a png for images, npy for arrays and json otherwise'''
+    if isinstance(data, ImageData):
+        path += '.png'
+        payload = data.payload[:, :, 0] if data.payload.shape[2] == 1 else data.payload
+        Image.fromarray(payload.astype(np.uint8)).save(path)
+    elif isinstance(data, BaseData) and isinstance(data.payload, np.ndarray):
+        path += '.npy'
+        np.save(path, data.payload)
+    else:
+        path += '.json'
+        payload = data.__class__.serialize_payload(data.payload) if isinstance(data, BaseData) else data
+        with open(path, 'w') as f:
+            json.dump(
+                {'class_name': data.__class__.__name__, 'payload': payload}, f,
+                default=lambda value: value.model_dump(mode='json') if isinstance(value, BaseModel) else str(value),
+            )
+    return path
+
+
+def run_flow(
+    flow: Union[dict, str, os.PathLike],
+    outputs: Optional[list[str]] = None,
+    output_dir: Optional[str] = None,
+    node_classes: Optional[dict] = None,
+    quiet: bool = True,
+) -> dict[str, dict[str, Any]]:
+    '''executes a flow without a client and returns the selected outputs by node id and output label.
+
+    nothing is serialized for a client and no previews are made, and outputs that aren't selected
+    are dropped as soon as nothing reads them. with output_dir the selected outputs are also
+    written there, named <node id>_<output label>. raises FlowFailed if a node ends in an error
+    or its class could not be loaded
+    '''
+    flow = load_flow(flow)
+    outputs = default_outputs(flow) if outputs is None else outputs
+    wrapper = ExecutionWrapper()
+    wrapper.keep_outputs = {spec.partition(':')[0] for spec in outputs}
+    wrapper.node_classes = node_classes if node_classes is not None else find_and_load_classes(NODES_MODULE)
+    try:
+        asyncio.run(wrapper.execute_graph(flow, quiet=quiet, headless=True))
+    finally:
+        wrapper.shutdown()
+
+    errors = unloaded_nodes(flow, wrapper.node_instances) | failed_nodes(wrapper.node_instances)
+    if wrapper.run_error:
+        # the run failed outside of its nodes
+        errors['flow'] = wrapper.run_error
+    if errors:
+        raise FlowFailed(errors)
+
+    results = collect_outputs(wrapper.node_instances, outputs)
+    if output_dir:
+        write_outputs(results, output_dir)
+    return results
+
+
+def write_outputs(results: dict[str, dict[str, Any]], output_dir: str) -> list[str]:
+    '''writes collected outputs to a directory, named <node id>_<output label>'''
+    os.makedirs(output_dir, exist_ok=True)
+    return [
+        write_output(data, os.path.join(output_dir, f'{node_id}_{label}'))
+        for node_id, outputs in results.items() for label, data in outputs.items() if data is not None
+    ]
@@ -0,0 +1,209 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from typing import Optional
+from uuid import uuid4
+
+from .execution_wrapper import MAX_WORKERS, ExecutionWrapper
+
+# sessions nobody is connected to are dropped after this many seconds
+SESSION_IDLE_TIMEOUT = 30 * 60
+# the least recently used idle sessions are dropped beyond this many
+MAX_SESSIONS = 64
+# how often the registry looks for idle sessions
+SESSION_EVICT_INTERVAL = 60
+# seconds an execute request waits for a newer one, which replaces it, before it runs
+EXECUTE_DEBOUNCE = 0.05
+
+
+class Session:
+    '''an editor's execution engine, kept with its warm node instances between runs and reconnects'''
+
+    def __init__(self, id: str, wrapper: ExecutionWrapper, debounce: float = EXECUTE_DEBOUNCE):
+        self.id = id
+        self.wrapper = wrapper
+        self.debounce = debounce
+        self.connections = 0
+        # made for a connection that didn't name a session, nobody can come back to it
+        self.unnamed = False
+        self.last_active = time.monotonic()
+        # the run in flight, a newer run supersedes it
+        self.run_task: Optional[asyncio.Task] = None
+        self.run_ids = count(1)
+        # the latest request waiting out the debounce window, as (flow, run id, wrapper settings)
+        self.pending: Optional[tuple[dict, str | int, dict]] = None
+        self.debouncer: Optional[asyncio.Task] = None
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+    async def supersede(self):
+        '''cancels the run in flight, waiting for it to end with its execution_cancelled and
+        execution_finished, so a new run can take over the engine'''
+        if self.run_task is not None and not self.run_task.done():
+            self.wrapper.cancel_flag = True
+            await asyncio.wait({self.run_task})
+
+    async def submit(self, flow: dict, run_id: Optional[str | int] = None, **settings) -> str | int:
+        '''asks for a run of the flow with the given wrapper settings, returning its id.
+
+        the request waits debounce seconds and is dropped for any newer request in that time, the
+        client is told with an execution_superseded. the one left supersedes the run in flight, so
+        only the latest flow runs to completion
+        '''
+        run_id = next(self.run_ids) if run_id is None else run_id
+        superseded = None
+        if self.debouncer is not None:
+            self.debouncer.cancel()
+            superseded = self.pending[1]
+        self.pending = (flow, run_id, settings)
+        self.debouncer = asyncio.create_task(self.start_pending())
+        if superseded is not None:
+            await self.wrapper.send_now({"event": "execution_superseded", "run_id": superseded})
+        return run_id
+
+    async def start_pending(self):
+        await asyncio.sleep(self.debounce)
+        await self.supersede()
+        flow, run_id, settings = self.pending
+        self.pending = self.debouncer = None
+        for name, value in settings.items():
+            setattr(self.wrapper, name, value)
+        self.start(flow, run_id)
+
+    def start(self, flow: dict, run_id: Optional[str | int] = None) -> str | int:
+        '''starts a run of the flow in the background, returning its id'''
+        run_id = next(self.run_ids) if run_id is None else run_id
+        self.wrapper.start_run(run_id)
+        self.run_task = asyncio.create_task(self.wrapper.execute_graph(flow))
+        return run_id
+
+    async def cancel(self, run_id: Optional[str | int] = None):
+        '''cancels the run in flight and the request waiting out the debounce window, if they are
+        the ones named. the waiting request never started, the client is told with an execution_cancelled'''
+        if self.debouncer is not None and (run_id is None or run_id == self.pending[1]):
+            self.debouncer.cancel()
+            cancelled = self.pending[1]
+            self.pending = self.debouncer = None
+            await self.wrapper.send_now({"event": "execution_cancelled", "run_id": cancelled})
+        if run_id is None or run_id == self.wrapper.run_id:
+            self.wrapper.cancel_flag = True
+
+    def close(self):
+        '''cancels the run in flight and the request waiting out the debounce window, for a session
+        that is dropped. its run lets go of the session's node instances once it has ended'''
+        if self.debouncer is not None:
+            self.debouncer.cancel()
+            self.pending = self.debouncer = None
+        self.wrapper.cancel_flag = True
+
+    @property
+    def idle(self) -> bool:
+        return self.connections == 0
+
+
+class SessionRegistry:
+    '''hands every editor session its own ExecutionWrapper, so concurrent editors don't share
+    websockets, cancels or node instances, and drops the sessions nobody has used for a while.
+    sessions made for a connection that didn't name one are dropped when it closes.
+
+    the wrappers share one worker pool, so dropping a session only drops its state. the result
+    cache and the large data cache are shared too: they are bounded by size, and editors working
+    on the same inputs reuse each other's results. dropping a session frees nothing in them
+    '''
+
+    def __init__(
+        self,
+        node_classes: Optional[dict] = None,
+        idle_timeout: float = SESSION_IDLE_TIMEOUT,
+        max_sessions: int = MAX_SESSIONS,
+        max_workers: int = MAX_WORKERS,
+        debounce: float = EXECUTE_DEBOUNCE,
+    ):
+        self.node_classes = node_classes
+        self.debounce = debounce
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pne-node')
+        self.sessions: dict[str, Session] = {}
+        # the catalog is refreshed from request threads while the event loop uses the sessions
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.sessions
+
+    def get(self, session_id: str) -> Session:
+        '''the session with this id, created if it doesn't exist (or was evicted)'''
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                wrapper = ExecutionWrapper(executor=self.executor)
+                wrapper.node_classes = self.node_classes
+                session = self.sessions[session_id] = Session(session_id, wrapper, self.debounce)
+                self.evict_idle()
+            session.touch()
+            return session
+
+    def connect(self, session_id: Optional[str] = None) -> Session:
+        '''the session of a new connection, connections that don't name one get a session of their own'''
+        with self.lock:
+            session = self.get(uuid4().hex if session_id is None else session_id)
+            session.unnamed = session_id is None
+            session.connections += 1
+            return session
+
+    def disconnect(self, session: Session):
+        with self.lock:
+            session.connections -= 1
+            session.touch()
+            if session.unnamed and session.idle and self.sessions.get(session.id) is session:
+                # its node instances would hold every output until the idle timeout
+                del self.sessions[session.id]
+                session.close()
+
+    def set_node_classes(self, node_classes: dict):
+        '''hands reloaded node classes to every session'''
+        with self.lock:
+            self.node_classes = node_classes
+            for session in self.sessions.values():
+                session.wrapper.node_classes = node_classes
+
+    def evict_idle(self, now: Optional[float] = None) -> list[str]:
+        '''drops the sessions idle for longer than idle_timeout, and the least recently used idle
+        ones while there are more than max_sessions. sessions with a connection are kept'''
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            idle = sorted((s for s in self.sessions.values() if s.idle), key=lambda s: s.last_active)
+            evicted = [s for s in idle if now - s.last_active > self.idle_timeout]
+            excess = len(self.sessions) - len(evicted) - self.max_sessions
+            if excess > 0:
+                evicted += [s for s in idle if s not in evicted][:excess]
+            for session in evicted:
+                del self.sessions[session.id]
+        return [session.id for session in evicted]
+
+    async def evict_periodically(self, interval: float = SESSION_EVICT_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            evicted = self.evict_idle()
+            if evicted:
+                print(f"Evicted {len(evicted)} idle sessions, {len(self.sessions)} left")
+
+    def stats(self) -> dict:
+        with self.lock:
+            sessions = list(self.sessions.values())
+        return {
+            'sessions': len(sessions),
+            'connections': sum(session.connections for session in sessions),
+            'active_runs': sum(1 for session in sessions if session.run_task is not None and not session.run_task.done()),
+            # requests waiting out the debounce window
+            'queued_runs': sum(1 for session in sessions if session.pending is not None),
+        }
+
+    def shutdown(self):
+        self.executor.shutdown()
@@ -0,0 +1,21 @@
+import sys
+from typing import Any
+
+import numpy as np
+from pydantic import BaseModel
+
+
+def deep_sizeof(value: Any) -> int:
+    '''estimates the memory held by a value, counting array buffers and recursing into containers'''
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, BaseModel):
+        # BaseData memoizes the size of its payload
+        if hasattr(value, 'payload_nbytes'):
+            return value.payload_nbytes()
+        return sum(deep_sizeof(field) for field in value.__dict__.values())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(deep_sizeof(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(deep_sizeof(k) + deep_sizeof(v) for k, v in value.items())
+    return sys.getsizeof(value)
@@ -0,0 +1,62 @@
+import base64
+from typing import Any, Optional
+
+import numpy as np
+
+# how array payloads are written when data is serialized:
+# 'list' nested python lists (what the frontend reads today),
+# 'base64' the raw buffer as a base64 string with dtype and shape,
+# 'binary' the raw buffer as a separate binary websocket frame, referenced by index
+ARRAY_ENCODINGS = ('list', 'base64', 'binary')
+# binary frames only go out to clients, flows sent to the server carry arrays as lists or base64
+INBOUND_ARRAY_ENCODINGS = ('list', 'base64')
+
+
+def encode_array(array: np.ndarray, encoding: str, frames: Optional[list] = None) -> Any:
+    '''encodes an array for transport, binary frames are appended to the frames list'''
+    if encoding == 'list':
+        return array.tolist()
+
+    array = np.ascontiguousarray(array)
+    encoded = {'encoding': encoding, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+    if encoding == 'base64':
+        encoded['data'] = base64.b64encode(array.data).decode('ascii')
+    elif encoding == 'binary':
+        if frames is None:
+            raise ValueError("Binary array encoding needs a 'binary_frames' list in the serialization context")
+        encoded['frame'] = len(frames)
+        frames.append(array.tobytes())
+    else:
+        raise ValueError(f"Unknown array encoding '{encoding}'. Allowed encodings: {ARRAY_ENCODINGS}.")
+    return encoded
+
+
+def is_encoded_array(value: Any) -> bool:
+    return isinstance(value, dict) and value.get('encoding') in ARRAY_ENCODINGS and 'dtype' in value
+
+
+def decode_array(encoded: dict, frames: Optional[list] = None) -> np.ndarray:
+    '''recreates an array from its base64 or binary frame encoding'''
+    if encoded['encoding'] == 'base64':
+        buffer = base64.b64decode(encoded['data'])
+    else:
+        if frames is None:
+            raise ValueError(
+                "Binary encoded array received without its 'binary_frames', "
+                f"send arrays to the server encoded as one of {INBOUND_ARRAY_ENCODINGS}"
+            )
+        buffer = frames[encoded['frame']]
+    # copy so the array owns a writable buffer
+    return np.frombuffer(buffer, dtype=np.dtype(encoded['dtype'])).reshape(encoded['shape']).copy()
+
+
+def has_binary_arrays(value: Any) -> bool:
+    '''whether serialized data holds arrays encoded as binary frames. encoded arrays are dicts,
+    so lists of anything else (like arrays as nested lists) aren't walked'''
+    if isinstance(value, dict):
+        if value.get('encoding') == 'binary' and 'dtype' in value:
+            return True
+        return any(has_binary_arrays(item) for item in value.values())
+    if isinstance(value, list) and value and isinstance(value[0], dict):
+        return any(has_binary_arrays(item) for item in value)
+    return False
@@ -1,4 +1,5 @@
 import os
+import sys
 import importlib
 import inspect
 import json
@@ -39,22 +40,7 @@ def find_and_load_classes(module_path: str):
                     module_full_path = f"{category_module_path}.{module_name}"
 
                     try:
-                        importlib.invalidate_caches()
-                        module = importlib.import_module(module_full_path)
-                        importlib.reload(module)
-
-                        for name, obj in inspect.getmembers(module):
-                            # Find all node classes in the module
-                            if (inspect.isclass(obj) and 
-                                issubclass(obj, BaseNode) and 
-                                obj not in (BaseNode, StreamingBaseNode)):
-                                try:
-                                    source_file = inspect.getsourcefile(obj)
-                                    start_line = inspect.getsourcelines(obj)[1]
-                                    obj.definition_path = f"{source_file}:{start_line}"
-                                    classes.append(obj)
-                                except (OSError, TypeError) as e:
-                                    print(f"Error getting source file for {obj.__name__}: {e}")
+                        classes.extend(load_node_module(module_full_path))
                     except ModuleNotFoundError as e:
                         print(f"Error loading module {module_full_path}: {e}")
                         continue
@@ -69,6 +55,38 @@ def find_and_load_classes(module_path: str):
     return all_classes
 
 
+def node_registry(node_classes: dict | None) -> dict[tuple[str, str], type[BaseNode]]:
+    '''indexes the categories returned by find_and_load_classes by (namespace, class name)'''
+    registry = {}
+    for namespace, classes in (node_classes or {}).items():
+        for node_class in classes:
+            registry.setdefault((namespace, node_class.__name__), node_class)
+    return registry
+
+
+def load_node_module(module_full_path: str) -> list[type[BaseNode]]:
+    '''(re)imports a single node module and returns the node classes found in it'''
+    importlib.invalidate_caches()
+    # import from scratch rather than importlib.reload, which would keep renamed or deleted classes around
+    sys.modules.pop(module_full_path, None)
+    module = importlib.import_module(module_full_path)
+
+    classes = []
+    for name, obj in inspect.getmembers(module):
+        # Find all node classes in the module
+        if (inspect.isclass(obj) and 
+            issubclass(obj, BaseNode) and 
+            obj not in (BaseNode, StreamingBaseNode)):
+            try:
+                source_file = inspect.getsourcefile(obj)
+                start_line = inspect.getsourcelines(obj)[1]
+                obj.definition_path = f"{source_file}:{start_line}"
+                classes.append(obj)
+            except (OSError, TypeError) as e:
+                print(f"Error getting source file for {obj.__name__}: {e}")
+    return classes
+
+
 def topological_sort(graph_def: dict):
     '''performs a topological sort on a graph definition of nodes and edges'''
     in_degree = {}
@@ -9,8 +9,23 @@ import mergeWithExpandedPreserved from '../utils/mergeWithExpandedPreserved';
 // Using Record<string, unknown> & BaseNodeData to satisfy the constraint
 type CustomNode = Node<Record<string, unknown> & BaseNodeData>;
 
+// the server keeps an execution engine per session, with the warm nodes of the last run.
+// the id is kept for the tab, so reloads and reconnects get their engine back
+const SESSION_STORAGE_KEY = 'pne-session';
+
+function getSessionId(): string {
+  let sessionId = sessionStorage.getItem(SESSION_STORAGE_KEY);
+  if (!sessionId) {
+    sessionId = crypto.randomUUID();
+    sessionStorage.setItem(SESSION_STORAGE_KEY, sessionId);
+  }
+  return sessionId;
+}
+
 export default function useExecuteFlow() {
   const websocketRef = useRef<WebSocket | null>(null);
+  // the connection is kept between runs, events of older (superseded) runs are ignored
+  const runIdRef = useRef(0);
   const nodes = useStore(state => state.nodes);
   const edges = useStore(state => state.edges);
   const setNodes = useStore(state => state.setNodes);
@@ -23,11 +38,14 @@ export default function useExecuteFlow() {
     }
 
     // prepare the data in an additional dict for sending
+    runIdRef.current += 1;
     const sendData = {
       action: 'execute',
       flow: flow,
+      run_id: runIdRef.current,
     }
 
+    setLoading(true);
     websocketRef.current?.send(JSON.stringify(sendData))
     console.log('sent execute message:', sendData)
   }, [nodes, edges])
@@ -41,16 +59,20 @@ export default function useExecuteFlow() {
 
     // open websocket connection and send execute message
     if (!websocketRef.current || websocketRef.current.readyState !== WebSocket.OPEN) {
-      websocketRef.current = new WebSocket('ws://localhost:8000/execute');
+      websocketRef.current = new WebSocket(`ws://localhost:8000/execute?session=${getSessionId()}`);
       websocketRef.current.onopen = () => {
         console.log('WebSocket connection established');
-        setLoading(true);
         sendExecuteMessage();
       };
 
       websocketRef.current.onmessage = (event) => {
         const data = JSON.parse(event.data);
         // console.log("DEBUG: Received websocket message:", data.event);
+        if (data.run_id !== undefined && data.run_id !== runIdRef.current) {
+          return;
+        }
+        // the handler outlives the render it was created in, so read the current nodes
+        const nodes = useStore.getState().nodes;
 
         if (data.event === 'status_update') {
           // Handle batch status updates
@@ -95,6 +117,9 @@ export default function useExecuteFlow() {
               }
             })
           );
+        } else if (data.event === 'execution_error') {
+          // the run failed outside of its nodes, execution_finished follows
+          console.error('Execution failed:', data.error);
         } else if (data.event === 'execution_finished') {
           // Handle execution finished event
           console.log('Execution finished');
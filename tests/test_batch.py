@@ -0,0 +1,70 @@
+import asyncio
+import json
+import time
+from typing import ClassVar
+
+from pne_backend.base_node import BaseNode, node_definition
+from pne_backend.batch import run_batch, stream_batch
+from pne_backend.field import InputNodeField, OutputNodeField
+from pne_backend.datatypes.basic import IntData
+
+from tests.test_graph import make_edge
+
+
+class OffsetNode(BaseNode):
+    '''adds an offset, recording every call and sleeping for the given time'''
+    calls: ClassVar[list[str]] = []
+
+    @classmethod
+    @node_definition(
+        inputs=[
+            InputNodeField(label='value', allowed_types=['IntData'], data=IntData(payload=0)),
+            InputNodeField(label='offset', allowed_types=['IntData'], data=IntData(payload=1)),
+            InputNodeField(label='sleep_ms', allowed_types=['IntData'], data=IntData(payload=0)),
+        ],
+        outputs=[OutputNodeField(label='value', allowed_types=['IntData'])]
+    )
+    def exec(cls, value: IntData, offset: IntData, sleep_ms: IntData) -> IntData:
+        cls.calls.append(offset.payload)
+        time.sleep(sleep_ms.payload / 1000)
+        return IntData(payload=value.payload + offset.payload)
+
+OffsetNode.definition_path = ''
+
+
+def offset_chain(length: int) -> tuple[dict, dict]:
+    nodes = [json.loads(OffsetNode(id=f'offset_{i}').model_dump_json()) for i in range(length)]
+    edges = [make_edge(f'offset_{i}', 0, f'offset_{i + 1}', 0) for i in range(length - 1)]
+    return {'nodes': nodes, 'edges': edges}, {nodes[0]['data']['namespace']: [OffsetNode]}
+
+
+def test_shared_nodes_run_once():
+    flow, node_classes = offset_chain(3)
+    OffsetNode.calls.clear()
+    variants = [{'offset_1': {'offset': offset}} for offset in (10, 20, 30)]
+    results = run_batch(flow, variants, node_classes=node_classes)
+
+    assert [r.outputs['offset_2']['value'].payload for r in results] == [12, 22, 32]
+    assert all(r.errors == {} for r in results)
+    # offset_0 ran once, offset_1 and offset_2 once per variant
+    assert sorted(OffsetNode.calls) == [1, 1, 1, 1, 10, 20, 30]
+
+
+def test_results_stream_as_variants_finish():
+    flow, node_classes = offset_chain(2)
+    variants = [{'offset_1': {'sleep_ms': 300, 'offset': 1}}, {'offset_1': {'sleep_ms': 0, 'offset': 2}}]
+
+    async def collect():
+        return [result async for result in stream_batch(flow, variants, node_classes=node_classes, max_workers=2)]
+
+    results = asyncio.run(collect())
+    assert [r.index for r in results] == [1, 0]
+    assert results[1].outputs['offset_1']['value'].payload == 2
+
+
+def test_variant_errors_are_reported():
+    flow, node_classes = offset_chain(2)
+    results = run_batch(flow, [{'offset_1': {'sleep_ms': -1}}, {}], node_classes=node_classes)
+
+    assert 'offset_1' in results[0].errors
+    assert results[1].errors == {}
@@ -0,0 +1,156 @@
+import asyncio
+import json
+import os
+import sys
+import textwrap
+
+from fastapi.testclient import TestClient
+
+from pne_backend.catalog import NodeCatalog
+from pne_backend.execution_wrapper import ExecutionWrapper
+from pne_backend.main import CONNECTED_CLIENTS, app, broadcast
+
+
+NODE_SOURCE = textwrap.dedent('''
+    from pne_backend.base_node import BaseNode, node_definition
+    from pne_backend.field import InputNodeField, OutputNodeField
+    from pne_backend.datatypes.basic import IntData
+
+
+    class {name}(BaseNode):
+        @classmethod
+        @node_definition(
+            inputs=[InputNodeField(label='a', allowed_types=['IntData'], data=IntData(payload=1))],
+            outputs=[OutputNodeField(label='a', allowed_types=['IntData'])]
+        )
+        def exec(cls, a: IntData) -> IntData:
+            return a
+''')
+
+
+def write_node_package(root, name: str):
+    category = root / 'catalog_nodes' / 'demo'
+    category.mkdir(parents=True, exist_ok=True)
+    (root / 'catalog_nodes' / '__init__.py').touch()
+    (category / '__init__.py').touch()
+    (category / 'node.py').write_text(NODE_SOURCE.format(name=name))
+    return category / 'node.py'
+
+
+def forget_node_package(root):
+    sys.path.remove(str(root))
+    for module in [m for m in sys.modules if m.startswith('catalog_nodes')]:
+        del sys.modules[module]
+
+
+def test_catalog_reloads_on_change(tmp_path):
+    node_file = write_node_package(tmp_path, 'FirstNode')
+    sys.path.insert(0, str(tmp_path))
+    try:
+        catalog = NodeCatalog('catalog_nodes')
+        assert catalog.refresh()
+        etag = catalog.etag
+        assert [node['data']['display_name'] for node in json.loads(catalog.body)['demo']] == ['First']
+
+        # nothing changed on disk, nothing is reloaded
+        assert not catalog.refresh()
+        assert catalog.matches(etag)
+
+        node_file.write_text(NODE_SOURCE.format(name='SecondNode'))
+        mtime = os.stat(node_file).st_mtime + 1
+        os.utime(node_file, (mtime, mtime))
+        assert catalog.refresh()
+        assert catalog.etag != etag
+        assert not catalog.matches(etag)
+        assert [node['data']['display_name'] for node in json.loads(catalog.body)['demo']] == ['Second']
+    finally:
+        forget_node_package(tmp_path)
+
+
+def test_reload_single_module(tmp_path):
+    write_node_package(tmp_path, 'FirstNode')
+    sys.path.insert(0, str(tmp_path))
+    try:
+        catalog = NodeCatalog('catalog_nodes')
+        catalog.load()
+        first_class = catalog.node_classes['demo'][0]
+
+        # a new module only adds its own nodes
+        other_file = tmp_path / 'catalog_nodes' / 'demo' / 'other.py'
+        other_file.write_text(NODE_SOURCE.format(name='OtherNode'))
+        update = catalog.reload_module(str(other_file))
+        assert update['category'] == 'demo'
+        assert [node['data']['class_name'] for node in update['updated']] == ['OtherNode']
+        assert catalog.node_classes['demo'][0] is first_class
+        assert not catalog.refresh()
+
+        # renaming a class within the module replaces it
+        other_file.write_text(NODE_SOURCE.format(name='RenamedNode'))
+        update = catalog.reload_module(str(other_file))
+        assert update['removed'] == ['OtherNode']
+        assert [c.__name__ for c in catalog.node_classes['demo']] == ['FirstNode', 'RenamedNode']
+        assert 'RenamedNode' in catalog.body.decode()
+
+        other_file.unlink()
+        update = catalog.reload_module(str(other_file))
+        assert update['removed'] == ['RenamedNode']
+        assert [c.__name__ for c in catalog.node_classes['demo']] == ['FirstNode']
+
+        # anything but a node module falls back to a full reload
+        assert catalog.reload_module(str(tmp_path / 'catalog_nodes' / 'demo' / '__init__.py'))['full']
+    finally:
+        forget_node_package(tmp_path)
+
+
+def test_all_nodes_etag():
+    client = TestClient(app)
+    response = client.get('/all_nodes')
+    assert response.status_code == 200
+    assert 'Mathematics' in response.json()
+
+    etag = response.headers['etag']
+    revalidated = client.get('/all_nodes', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b''
+
+    # a forced reload serves whatever the reimported modules produce under its new etag
+    etag = client.post('/reload_nodes').json()['etag']
+    assert client.get('/all_nodes', headers={'If-None-Match': etag}).status_code == 304
+
+
+class SlowWebSocket:
+    '''yields to the event loop on every send, recording what was sent in order'''
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text: str):
+        await asyncio.sleep(0.01)
+        self.sent.append(json.loads(text)['event'])
+
+    async def send_bytes(self, data: bytes):
+        await asyncio.sleep(0.01)
+        self.sent.append('frame')
+
+
+def test_broadcast_waits_for_a_node_update_and_its_frames():
+    websocket = SlowWebSocket()
+    wrapper = ExecutionWrapper()
+    wrapper.set_websocket(websocket)
+    CONNECTED_CLIENTS[websocket] = wrapper
+
+    async def update_during_send():
+        wrapper.reset_outbox()
+        sending = asyncio.create_task(
+            wrapper.send_now({'event': 'single_node_update', 'binary_frames': 2}, [b'a', b'b'])
+        )
+        await asyncio.sleep(0.005)
+        await broadcast({'event': 'catalog_update'})
+        await sending
+
+    try:
+        asyncio.run(update_during_send())
+    finally:
+        CONNECTED_CLIENTS.pop(websocket)
+
+    assert websocket.sent == ['single_node_update', 'frame', 'frame', 'catalog_update']
@@ -0,0 +1,74 @@
+import asyncio
+import copy
+import json
+
+from pne_backend.execution_wrapper import ExecutionWrapper
+
+from tests.test_graph import NODE_CLASSES, RecordingWebSocket, add_chain, make_edge, make_node
+
+
+def run_delta(flow: dict) -> tuple[ExecutionWrapper, RecordingWebSocket]:
+    wrapper = ExecutionWrapper()
+    wrapper.node_classes = NODE_CLASSES
+    wrapper.update_mode = 'delta'
+    websocket = RecordingWebSocket()
+    wrapper.set_websocket(websocket)
+    asyncio.run(wrapper.execute_graph(flow))
+    return wrapper, websocket
+
+
+def apply_delta(nodes: dict[str, dict], message: dict):
+    '''what a client does with a node_delta, references are looked up among the data it holds'''
+    known = {
+        field['data']['id']: field['data']
+        for node in nodes.values() for kind in ('inputs', 'outputs') for field in node['data'][kind]
+        if isinstance(field['data'], dict) and 'id' in field['data']
+    }
+    node = nodes[message['node_id']]
+    for key, value in message['data'].items():
+        if key in ('inputs', 'outputs'):
+            for index, change in value.items():
+                data = change['data']
+                if isinstance(data, dict) and 'ref' in data:
+                    data = known[data['ref']]
+                node['data'][key][int(index)]['data'] = data
+        else:
+            node['data'][key] = value
+
+
+def test_deltas_rebuild_the_nodes():
+    '''a client applying the deltas to the flow it sent ends up with the nodes the server has'''
+    nodes = [make_node('AddNode', id) for id in ('top', 'left', 'right', 'bottom')]
+    edges = [
+        make_edge('top', 0, 'left', 0),
+        make_edge('top', 0, 'right', 0),
+        make_edge('left', 0, 'bottom', 0),
+        make_edge('right', 0, 'bottom', 1),
+    ]
+    flow = {'nodes': nodes, 'edges': edges}
+    client = {node['id']: node for node in copy.deepcopy(nodes)}
+    wrapper, websocket = run_delta(flow)
+
+    deltas = [m for m in websocket.messages if m['event'] == 'node_delta']
+    assert len(deltas) == 4
+    assert not any(m['event'] == 'single_node_update' for m in websocket.messages)
+    for message in deltas:
+        apply_delta(client, message)
+
+    for node_id, instance in wrapper.node_instances.items():
+        assert client[node_id]['data'] == json.loads(instance.model_dump_json())['data']
+
+
+def test_delta_sends_only_changes():
+    wrapper, websocket = run_delta(add_chain(2))
+    deltas = {m['node_id']: m['data'] for m in websocket.messages if m['event'] == 'node_delta'}
+
+    # static fields and unconnected inputs the client sent aren't repeated
+    assert 'display_name' not in deltas['add_0']
+    assert 'inputs' not in deltas['add_0']
+    assert deltas['add_0']['status'] == 'evaluated'
+    sent_output = deltas['add_0']['outputs']['0']['data']
+    assert sent_output['payload'] == 3
+
+    # the output of add_0 arrived at add_1's input, which the client already has
+    assert deltas['add_1']['inputs'] == {'0': {'data': {'ref': sent_output['id']}}}
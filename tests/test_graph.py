@@ -0,0 +1,282 @@
+import asyncio
+import json
+import threading
+import time
+
+from devtools import debug as d
+
+from pne_backend.base_node import BaseNode, CaptureOutput, check_cancelled, node_definition
+from pne_backend.field import InputNodeField, OutputNodeField
+from pne_backend.datatypes.basic import IntData
+from pne_backend.execution_wrapper import ExecutionWrapper
+from pne_backend.graph import CompiledGraph, parse_handle_key
+from pne_backend.utils import find_and_load_classes
+
+
+NODE_CLASSES = find_and_load_classes("pne_backend.nodes")
+
+
+class RecordingWebSocket:
+    def __init__(self):
+        self.messages = []
+
+    async def send_text(self, text: str):
+        self.messages.append(json.loads(text))
+
+    async def close(self):
+        pass
+
+
+def make_node(class_name: str, id: str) -> dict:
+    NodeClass = next(cls for classes in NODE_CLASSES.values() for cls in classes if cls.__name__ == class_name)
+    return json.loads(NodeClass(id=id).model_dump_json())
+
+
+def make_edge(source: str, source_index: int, target: str, target_index: int) -> dict:
+    return {
+        'source': source,
+        'sourceHandle': f'{source}:outputs:{source_index}:handle',
+        'target': target,
+        'targetHandle': f'{target}:inputs:{target_index}:handle',
+    }
+
+
+def add_chain(length: int) -> dict:
+    nodes = [make_node('AddNode', f'add_{i}') for i in range(length)]
+    edges = [make_edge(f'add_{i}', 0, f'add_{i + 1}', 0) for i in range(length - 1)]
+    return {'nodes': nodes, 'edges': edges}
+
+
+def run_flow(flow: dict, max_workers: int = 4) -> tuple[ExecutionWrapper, RecordingWebSocket]:
+    wrapper = ExecutionWrapper(max_workers=max_workers)
+    wrapper.node_classes = NODE_CLASSES
+    websocket = RecordingWebSocket()
+    wrapper.set_websocket(websocket)
+    asyncio.run(wrapper.execute_graph(flow))
+    return wrapper, websocket
+
+
+def test_parse_handle_key():
+    assert parse_handle_key('abc:inputs:1:handle') == '1'
+    assert parse_handle_key('abc-input-a') == 'abc-input-a'
+
+
+def test_compiled_graph_routes():
+    '''edges are indexed by source and target and the order respects them'''
+    flow = add_chain(3)
+    graph = CompiledGraph(flow['nodes'], flow['edges'])
+    d(graph.outgoing)
+
+    assert graph.order == ['add_0', 'add_1', 'add_2']
+    assert [route.target for route in graph.outgoing['add_0']] == ['add_1']
+    assert graph.outgoing['add_2'] == []
+    assert graph.connected_inputs('add_1') == {0}
+    assert graph.connected_inputs('add_0') == set()
+
+
+def test_connected_inputs_are_cleared():
+    '''stale data on a connected input is dropped before instantiation'''
+    flow = add_chain(2)
+    flow['nodes'][1]['data']['inputs'][0]['data']['payload'] = 1000
+    wrapper, websocket = run_flow(flow)
+
+    # 1 + 2 = 3, then 3 + 2 = 5
+    assert wrapper.node_instances['add_1'].data.outputs[0].data.payload == 5
+
+
+def test_chain_execution():
+    wrapper, websocket = run_flow(add_chain(50))
+    last = wrapper.node_instances['add_49']
+
+    assert last.data.status == 'evaluated'
+    assert last.data.outputs[0].data.payload == 1 + 2 * 50
+
+
+def test_diamond_execution():
+    '''a node waits for all of its upstream branches before it runs'''
+    nodes = [make_node('AddNode', id) for id in ('top', 'left', 'right', 'bottom')]
+    edges = [
+        make_edge('top', 0, 'left', 0),
+        make_edge('top', 0, 'right', 0),
+        make_edge('left', 0, 'bottom', 0),
+        make_edge('right', 0, 'bottom', 1),
+    ]
+    wrapper, websocket = run_flow({'nodes': nodes, 'edges': edges})
+
+    # top = 3, left = right = 5, bottom = 10
+    assert wrapper.node_instances['bottom'].data.outputs[0].data.payload == 10
+
+    statuses = [m for m in websocket.messages if m['event'] == 'single_node_update']
+    assert len(statuses) == 4
+    assert json.loads(statuses[-1]['node'])['id'] == 'bottom'
+
+
+def test_capture_output_per_thread():
+    '''prints from concurrently running nodes end up in their own capture'''
+    barrier = threading.Barrier(4)
+    captured = {}
+
+    def work(i):
+        with CaptureOutput() as output:
+            barrier.wait()
+            print(f'thread {i}')
+            captured[i] = output.get_output()[0]
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert captured == {i: f'thread {i}\n' for i in range(4)}
+
+
+class SlowNode(BaseNode):
+    '''sleeps in small steps, checking for a cancel in between'''
+
+    @classmethod
+    @node_definition(
+        inputs=[InputNodeField(label='steps', allowed_types=['IntData'], data=IntData(payload=200))],
+        outputs=[OutputNodeField(label='steps', allowed_types=['IntData'])]
+    )
+    def exec(cls, steps: IntData) -> IntData:
+        for _ in range(steps.payload):
+            check_cancelled()
+            time.sleep(0.01)
+        return steps
+
+SlowNode.definition_path = ''
+
+
+def test_node_updates_are_serialized_off_the_event_loop():
+    threads = set()
+
+    class ThreadRecordingWrapper(ExecutionWrapper):
+        def serialize_node_update(self, node_instance):
+            threads.add(threading.current_thread())
+            return super().serialize_node_update(node_instance)
+
+    wrapper = ThreadRecordingWrapper()
+    wrapper.node_classes = NODE_CLASSES
+    websocket = RecordingWebSocket()
+    wrapper.set_websocket(websocket)
+    asyncio.run(wrapper.execute_graph(add_chain(3)))
+
+    assert threads and threading.main_thread() not in threads
+    updates = [json.loads(m['node']) for m in websocket.messages if m['event'] == 'single_node_update']
+    assert [node['id'] for node in updates] == ['add_0', 'add_1', 'add_2']
+
+
+def test_cancel_within_node():
+    '''a cancel stops a cooperative node mid-execution and skips everything downstream'''
+    nodes = [json.loads(SlowNode(id=id).model_dump_json()) for id in ('first', 'second')]
+    flow = {'nodes': nodes, 'edges': [make_edge('first', 0, 'second', 0)]}
+
+    wrapper = ExecutionWrapper()
+    wrapper.node_classes = {nodes[0]['data']['namespace']: [SlowNode]}
+    websocket = RecordingWebSocket()
+    wrapper.set_websocket(websocket)
+
+    async def run_and_cancel():
+        task = asyncio.create_task(wrapper.execute_graph(flow))
+        await asyncio.sleep(0.2)
+        wrapper.cancel_flag = True
+        await task
+
+    start = time.time()
+    asyncio.run(run_and_cancel())
+
+    assert time.time() - start < 1
+    events = [m['event'] for m in websocket.messages]
+    assert 'execution_cancelled' in events
+    assert 'single_node_update' not in events
+    assert wrapper.node_instances['second'].data.status == 'not evaluated'
+
+
+def run_with_batching(flow: dict, status_batch_interval: float) -> RecordingWebSocket:
+    wrapper = ExecutionWrapper(status_batch_interval=status_batch_interval)
+    wrapper.node_classes = NODE_CLASSES
+    websocket = RecordingWebSocket()
+    wrapper.set_websocket(websocket)
+    asyncio.run(wrapper.execute_graph(flow))
+    return websocket
+
+
+def test_status_updates_are_batched():
+    flow = add_chain(30)
+    unbatched = run_with_batching(json.loads(json.dumps(flow)), status_batch_interval=0)
+    batched = run_with_batching(json.loads(json.dumps(flow)), status_batch_interval=0.016)
+
+    def status_messages(websocket):
+        return [m for m in websocket.messages if m['event'] == 'status_update']
+
+    assert len(status_messages(unbatched)) == 31
+    assert len(status_messages(batched)) < len(status_messages(unbatched))
+    assert [m['event'] for m in batched.messages if m['event'] != 'status_update'] == \
+        [m['event'] for m in unbatched.messages if m['event'] != 'status_update']
+
+    # no status reaches the client after the node's final update
+    updated = set()
+    for message in batched.messages:
+        if message['event'] == 'single_node_update':
+            updated.add(json.loads(message['node'])['id'])
+        elif message['event'] == 'status_update':
+            assert not updated & {u['node_id'] for u in message['updates']}
+    assert batched.messages[-1]['event'] == 'execution_finished'
+
+
+class SquareInProcessNode(BaseNode):
+    '''squares its input in a worker process, failing on negative numbers'''
+    cpu_bound = True
+
+    @classmethod
+    @node_definition(
+        inputs=[InputNodeField(label='number', allowed_types=['IntData'], data=IntData(payload=3))],
+        outputs=[OutputNodeField(label='square', allowed_types=['IntData'])]
+    )
+    def exec(cls, number: IntData) -> IntData:
+        if number.payload < 0:
+            raise ValueError('negative numbers are not squared here')
+        print(f'squaring {number.payload}')
+        return IntData(payload=number.payload ** 2)
+
+SquareInProcessNode.definition_path = ''
+
+
+def run_in_process(flow: dict) -> tuple[ExecutionWrapper, RecordingWebSocket]:
+    wrapper = ExecutionWrapper(process_workers=1)
+    wrapper.node_classes = {flow['nodes'][0]['data']['namespace']: [SquareInProcessNode]}
+    websocket = RecordingWebSocket()
+    wrapper.set_websocket(websocket)
+    try:
+        asyncio.run(wrapper.execute_graph(flow))
+    finally:
+        wrapper.shutdown()
+    return wrapper, websocket
+
+
+def test_cpu_bound_nodes_run_in_a_process():
+    '''inputs and results are pickled across the process boundary, output is captured there'''
+    BaseNode.result_cache.clear()
+    nodes = [json.loads(SquareInProcessNode(id=id).model_dump_json()) for id in ('first', 'second')]
+    wrapper, websocket = run_in_process({'nodes': nodes, 'edges': [make_edge('first', 0, 'second', 0)]})
+
+    second = wrapper.node_instances['second']
+    assert second.data.status == 'evaluated'
+    assert second.data.outputs[0].data.payload == 81
+    assert second.data.terminal_output == 'squaring 9\n'
+
+
+def test_cpu_bound_node_errors_reach_its_status():
+    BaseNode.result_cache.clear()
+    node = json.loads(SquareInProcessNode(id='negative').model_dump_json())
+    node['data']['inputs'][0]['data']['payload'] = -2
+    wrapper, websocket = run_in_process({'nodes': [node], 'edges': []})
+
+    failed = wrapper.node_instances['negative']
+    assert failed.data.status == 'error'
+    assert 'negative numbers are not squared here' in failed.data.error_output
+    assert any(
+        update == {'node_id': 'negative', 'status': 'error'}
+        for m in websocket.messages if m['event'] == 'status_update' for update in m['updates']
+    )
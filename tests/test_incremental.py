@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from pne_backend.execution_wrapper import ExecutionWrapper
+
+from tests.test_graph import NODE_CLASSES, RecordingWebSocket, add_chain
+
+
+def client_flow(wrapper: ExecutionWrapper, flow: dict) -> dict:
+    '''the flow as the client holds it after a run, with the outputs it was sent'''
+    nodes = [json.loads(wrapper.node_instances[node['id']].model_dump_json()) for node in flow['nodes']]
+    return {'nodes': nodes, 'edges': flow['edges']}
+
+
+def executed_nodes(websocket: RecordingWebSocket) -> list[str]:
+    '''the nodes the run started with as pending, unchanged nodes start as evaluated'''
+    return [
+        update['node_id']
+        for message in websocket.messages if message['event'] == 'status_update'
+        for update in message['updates'] if update['status'] == 'pending'
+    ]
+
+
+def rerun(wrapper: ExecutionWrapper, flow: dict) -> RecordingWebSocket:
+    websocket = RecordingWebSocket()
+    wrapper.set_websocket(websocket)
+    asyncio.run(wrapper.execute_graph(flow))
+    return websocket
+
+
+def test_unchanged_flow_is_not_executed():
+    wrapper = ExecutionWrapper()
+    wrapper.node_classes = NODE_CLASSES
+    flow = add_chain(5)
+    rerun(wrapper, json.loads(json.dumps(flow)))
+
+    websocket = rerun(wrapper, client_flow(wrapper, flow))
+
+    assert executed_nodes(websocket) == []
+    assert not any(message['event'] == 'single_node_update' for message in websocket.messages)
+    assert wrapper.node_instances['add_4'].data.outputs[0].data.payload == 11
+
+
+def test_only_downstream_of_a_change_is_executed():
+    wrapper = ExecutionWrapper()
+    wrapper.node_classes = NODE_CLASSES
+    flow = add_chain(5)
+    rerun(wrapper, json.loads(json.dumps(flow)))
+
+    changed = client_flow(wrapper, flow)
+    changed['nodes'][2]['data']['inputs'][1]['data']['payload'] = 10
+    websocket = rerun(wrapper, changed)
+
+    assert executed_nodes(websocket) == ['add_2', 'add_3', 'add_4']
+    # 1 + 2 + 2 + 10 + 2 + 2
+    assert wrapper.node_instances['add_4'].data.outputs[0].data.payload == 19
+
+
+def test_ui_metadata_does_not_dirty_nodes():
+    wrapper = ExecutionWrapper()
+    wrapper.node_classes = NODE_CLASSES
+    flow = add_chain(3)
+    rerun(wrapper, json.loads(json.dumps(flow)))
+
+    changed = client_flow(wrapper, flow)
+    changed['nodes'][0]['data']['inputs'][1]['data']['metadata'] = {'expanded': True}
+    websocket = rerun(wrapper, changed)
+
+    assert executed_nodes(websocket) == []
+
+
+def test_client_without_outputs_is_resent_them():
+    wrapper = ExecutionWrapper()
+    wrapper.node_classes = NODE_CLASSES
+    flow = add_chain(2)
+    rerun(wrapper, json.loads(json.dumps(flow)))
+
+    websocket = rerun(wrapper, json.loads(json.dumps(flow)))
+
+    assert executed_nodes(websocket) == []
+    assert len([m for m in websocket.messages if m['event'] == 'single_node_update']) == 2
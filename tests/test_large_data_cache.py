@@ -0,0 +1,95 @@
+import os
+import threading
+
+import numpy as np
+
+from pne_backend import cache as cache_module
+from pne_backend.cache import LargeDataCache, process_spill_dir
+
+
+def test_eviction_without_spill():
+    cache = LargeDataCache(max_bytes=1000)
+    cache.set('a', np.zeros(100, dtype=np.float64))
+    cache.set('b', np.zeros(100, dtype=np.float64))
+
+    assert 'a' not in cache
+    assert cache.get('a') is None
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_spilled_arrays_are_revived(tmp_path):
+    cache = LargeDataCache(max_bytes=1000, spill_dir=str(tmp_path), max_spill_bytes=10_000)
+    array = np.arange(100, dtype=np.float64)
+    cache.set('a', array)
+    cache.set('b', np.zeros(100, dtype=np.float64))
+
+    # 'a' was pushed out of memory but still resolves, memory-mapped from disk
+    assert 'a' in cache
+    revived = cache.get('a')
+    assert isinstance(revived, np.memmap)
+    assert np.array_equal(revived, array)
+    assert cache.stats()['spills'] == 1
+    assert cache.stats()['revivals'] == 1
+
+    # writes to a revived array don't touch the spilled file
+    revived[0] = 42
+    assert cache.get('a')[0] == 0
+
+
+def test_spill_budget(tmp_path):
+    cache = LargeDataCache(max_bytes=800, spill_dir=str(tmp_path), max_spill_bytes=1600)
+    for key in 'abcd':
+        cache.set(key, np.zeros(100, dtype=np.float64))
+
+    # a and b were spilled, then a was removed to keep the spill directory within budget
+    assert 'a' not in cache
+    assert 'b' in cache
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_oversized_arrays_go_straight_to_disk(tmp_path):
+    cache = LargeDataCache(max_bytes=100, spill_dir=str(tmp_path), max_spill_bytes=10_000)
+
+    assert cache.set('big', np.ones(100))
+    assert cache.current_bytes == 0
+    assert cache.get('big').sum() == 100
+
+
+def test_spills_are_written_without_the_lock(tmp_path, monkeypatch):
+    '''other threads use the cache while an evicted array is written, and get it from memory'''
+    cache = LargeDataCache(max_bytes=1000, spill_dir=str(tmp_path), max_spill_bytes=10_000)
+    array = np.arange(100, dtype=np.float64)
+    seen_while_writing = []
+    save = np.save
+
+    def slow_save(path, value):
+        reader = threading.Thread(target=lambda: seen_while_writing.append(cache.get('a')))
+        reader.start()
+        reader.join(timeout=1)
+        assert not reader.is_alive(), 'the cache lock was held during the write'
+        save(path, value)
+
+    monkeypatch.setattr(cache_module.np, 'save', slow_save)
+    cache.set('a', array)
+    cache.set('b', np.zeros(100, dtype=np.float64))
+
+    assert seen_while_writing[0] is array
+    assert isinstance(cache.get('a'), np.memmap)
+
+
+def test_spill_dirs_of_dead_processes_are_removed(tmp_path):
+    own = process_spill_dir(str(tmp_path))
+    os.makedirs(own)
+    # no process gets a pid this large
+    dead = tmp_path / str(2 ** 22 + 1)
+    dead.mkdir()
+    (dead / 'left.npy').write_bytes(b'')
+    (tmp_path / 'stray.npy').write_bytes(b'')
+
+    assert process_spill_dir(str(tmp_path)) == own
+    assert sorted(os.listdir(tmp_path)) == [str(os.getpid())]
+
+    cache = LargeDataCache(max_bytes=1000, spill_dir=own, max_spill_bytes=10_000)
+    cache.close()
+    assert not os.path.exists(own)
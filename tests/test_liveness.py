@@ -0,0 +1,118 @@
+import asyncio
+import gc
+import json
+import weakref
+
+import numpy as np
+
+from pne_backend.base_node import BaseNode, node_definition
+from pne_backend.field import InputNodeField, OutputNodeField
+from pne_backend.datatypes.basic import IntData
+from pne_backend.datatypes.image import ImageData
+from pne_backend.execution_wrapper import ExecutionWrapper
+
+from tests.test_graph import RecordingWebSocket, make_edge
+
+
+class BlankImageNode(BaseNode):
+    @classmethod
+    @node_definition(
+        inputs=[InputNodeField(label='size', allowed_types=['IntData'], data=IntData(payload=64))],
+        outputs=[OutputNodeField(label='image', allowed_types=['ImageData'])]
+    )
+    def exec(cls, size: IntData) -> ImageData:
+        return ImageData(payload=np.zeros((size.payload, size.payload, 3), dtype=np.uint8))
+
+BlankImageNode.definition_path = ''
+
+
+class BrightenNode(BaseNode):
+    @classmethod
+    @node_definition(
+        inputs=[InputNodeField(label='image', allowed_types=['ImageData'])],
+        outputs=[OutputNodeField(label='image', allowed_types=['ImageData'])]
+    )
+    def exec(cls, image: ImageData) -> ImageData:
+        return ImageData(payload=image.payload + 1)
+
+BrightenNode.definition_path = ''
+
+
+def image_chain(length: int) -> dict:
+    nodes = [json.loads(BlankImageNode(id='blank').model_dump_json())]
+    nodes += [json.loads(BrightenNode(id=f'brighten_{i}').model_dump_json()) for i in range(length)]
+    ids = [node['id'] for node in nodes]
+    edges = [make_edge(source, 0, target, 0) for source, target in zip(ids, ids[1:])]
+    return {'nodes': nodes, 'edges': edges}
+
+
+def run_chain(wrapper: ExecutionWrapper, flow: dict, headless: bool = False):
+    wrapper.node_classes = {flow['nodes'][0]['data']['namespace']: [BlankImageNode, BrightenNode]}
+    wrapper.set_websocket(RecordingWebSocket())
+    asyncio.run(wrapper.execute_graph(json.loads(json.dumps(flow)), headless=headless))
+
+
+def test_outputs_are_dropped_once_consumed():
+    flow = image_chain(6)
+    kept = ExecutionWrapper()
+    run_chain(kept, flow)
+    freed = ExecutionWrapper(low_memory=True)
+    run_chain(freed, flow)
+
+    image_bytes = 64 * 64 * 3
+    assert kept.memory_report['peak_bytes'] == kept.memory_report['retained_bytes'] == 7 * image_bytes
+    assert freed.memory_report['retained_bytes'] == 7 * image_bytes
+    assert freed.memory_report['peak_bytes'] == 2 * image_bytes
+
+    # only the result is left
+    assert all(node.data.outputs[0].data is None for id, node in freed.node_instances.items() if id != 'brighten_5')
+    assert all(node.data.inputs[0].data is None for node in list(freed.node_instances.values())[1:])
+    assert freed.node_instances['brighten_5'].data.outputs[0].data.payload[0, 0, 0] == 6
+
+
+def test_headless_rerun_recomputes_dropped_outputs():
+    wrapper = ExecutionWrapper()
+    flow = image_chain(3)
+    run_chain(wrapper, flow, headless=True)
+    flow['nodes'][-1]['data']['outputs'][0]['data'] = None
+    run_chain(wrapper, flow, headless=True)
+
+    assert wrapper.released_nodes == {'blank', 'brighten_0', 'brighten_1'}
+    assert wrapper.node_instances['brighten_2'].data.outputs[0].data.payload[0, 0, 0] == 3
+
+
+
+# weak references to every image a TrackedBrightenNode made
+TRACKED_IMAGES = []
+
+
+class TrackedBrightenNode(BaseNode):
+    @classmethod
+    @node_definition(
+        inputs=[InputNodeField(label='image', allowed_types=['ImageData'])],
+        outputs=[OutputNodeField(label='image', allowed_types=['ImageData'])]
+    )
+    def exec(cls, image: ImageData) -> ImageData:
+        result = ImageData(payload=image.payload + 1)
+        TRACKED_IMAGES.append(weakref.ref(result))
+        return result
+
+TrackedBrightenNode.definition_path = ''
+
+
+def test_dropped_outputs_are_unreachable():
+    TRACKED_IMAGES.clear()
+    nodes = [json.loads(BlankImageNode(id='blank').model_dump_json())]
+    nodes += [json.loads(TrackedBrightenNode(id=f'tracked_{i}').model_dump_json()) for i in range(3)]
+    ids = [node['id'] for node in nodes]
+    flow = {'nodes': nodes, 'edges': [make_edge(source, 0, target, 0) for source, target in zip(ids, ids[1:])]}
+
+    wrapper = ExecutionWrapper(low_memory=True)
+    wrapper.node_classes = {nodes[0]['data']['namespace']: [BlankImageNode, TrackedBrightenNode]}
+    wrapper.set_websocket(RecordingWebSocket())
+    asyncio.run(wrapper.execute_graph(flow))
+    gc.collect()
+
+    # the result cache let go of the dropped outputs, only the result of the run is alive
+    assert [ref() is not None for ref in TRACKED_IMAGES] == [False, False, True]
+    assert TRACKED_IMAGES[-1]() is wrapper.node_instances['tracked_2'].data.outputs[0].data
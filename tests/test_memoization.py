@@ -0,0 +1,94 @@
+import numpy as np
+
+from pne_backend.base_node import BaseNode
+from pne_backend.cache import SizedLRUCache
+from pne_backend.datatypes.basic import IntData, FloatData, StringData, NumpyData
+from pne_backend.datatypes.compound import ListData
+from pne_backend.datatypes.image import ImageData
+
+from tests.test_graph import NODE_CLASSES, make_node
+
+
+def find_class(class_name: str):
+    return next(cls for classes in NODE_CLASSES.values() for cls in classes if cls.__name__ == class_name)
+
+
+def test_content_hash_ignores_id():
+    a = IntData(payload=1)
+    b = IntData(payload=1)
+
+    assert a.id != b.id
+    assert a.content_hash() == b.content_hash()
+    assert a.content_hash() != FloatData(payload=1.0).content_hash()
+    assert a.content_hash() != StringData(payload='1').content_hash()
+
+
+def test_content_hash_of_arrays():
+    '''arrays are hashed by buffer, dtype and shape'''
+    array = np.random.randint(0, 255, (64, 64, 3), dtype=np.uint8)
+
+    assert ImageData(payload=array).content_hash() == ImageData(payload=array.copy()).content_hash()
+    assert NumpyData(payload=array).content_hash() != NumpyData(payload=array.astype(np.int64)).content_hash()
+    assert NumpyData(payload=array).content_hash() != NumpyData(payload=array.reshape(64, 192)).content_hash()
+
+
+def test_content_hash_of_nested_lists():
+    def nested(value):
+        return ListData(payload=[IntData(payload=1), ListData(payload=[StringData(payload=value)])])
+
+    assert nested('a').content_hash() == nested('a').content_hash()
+    assert nested('a').content_hash() != nested('b').content_hash()
+
+
+def test_content_hash_follows_payload_changes():
+    data = IntData(payload=1)
+    first = data.content_hash()
+    data.payload = 2
+
+    assert data.content_hash() != first
+
+
+def test_results_are_memoized_across_instances():
+    cache = SizedLRUCache(1024 * 1024)
+    BaseNode.result_cache, previous = cache, BaseNode.result_cache
+    try:
+        AddNode = find_class('AddNode')
+        AddNode.model_validate(make_node('AddNode', 'first')).meta_exec()
+        second = AddNode.model_validate(make_node('AddNode', 'second'))
+        second.meta_exec()
+
+        assert cache.hits == 1
+        assert second.data.outputs[0].data.payload == 3
+    finally:
+        BaseNode.result_cache = previous
+
+
+def test_memoize_opt_out():
+    cache = SizedLRUCache(1024 * 1024)
+    BaseNode.result_cache, previous = cache, BaseNode.result_cache
+    AddNode = find_class('AddNode')
+    try:
+        AddNode.memoize = False
+        AddNode.model_validate(make_node('AddNode', 'first')).meta_exec()
+        AddNode.model_validate(make_node('AddNode', 'second')).meta_exec()
+
+        assert cache.hits == 0
+        assert len(cache) == 0
+    finally:
+        AddNode.memoize = True
+        BaseNode.result_cache = previous
+
+
+def test_sized_lru_eviction():
+    cache = SizedLRUCache(100, sizeof=len)
+    cache.set('a', 'x' * 40)
+    cache.set('b', 'x' * 40)
+    cache.get('a')
+    cache.set('c', 'x' * 40)
+
+    assert 'a' in cache and 'c' in cache
+    assert 'b' not in cache
+    assert cache.evictions == 1
+    assert cache.current_bytes == 80
+    # values larger than the whole budget are not stored
+    assert not cache.set('d', 'x' * 101)
@@ -0,0 +1,84 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from pne_backend.execution_wrapper import ExecutionWrapper
+from pne_backend.main import app
+from pne_backend import metrics
+from pne_backend.metrics import Counter, Histogram, MetricsRegistry
+
+from tests.test_graph import RecordingWebSocket
+from tests.test_liveness import image_chain, run_chain
+
+
+def sample(text: str, line_start: str) -> float:
+    return float(next(line for line in text.splitlines() if line.startswith(line_start)).rsplit(' ', 1)[1])
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.add(Histogram('latency_seconds', 'latency', ['route'], buckets=(0.1, 1)))
+    for value in (0.05, 0.5, 0.5, 5):
+        histogram.observe(value, route='a')
+
+    text = registry.render()
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{route="a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="a",le="1"} 3' in text
+    assert 'latency_seconds_bucket{route="a",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{route="a"} 4' in text
+    assert sample(text, 'latency_seconds_sum') == 6.05
+
+
+def test_labels_are_escaped_and_checked():
+    counter = Counter('things_total', 'things', ['name'])
+    counter.inc(name='a "quoted"\nname')
+    assert counter.render()[-1] == 'things_total{name="a \\"quoted\\"\\nname"} 1'
+    try:
+        counter.inc(other='x')
+    except ValueError:
+        pass
+    else:
+        assert False, 'unknown labels should raise'
+
+
+def test_runs_are_counted():
+    text = metrics.METRICS.render()
+    runs = sample(text, 'pne_runs_total{outcome="ok"}') if 'pne_runs_total{outcome="ok"}' in text else 0
+
+    wrapper = ExecutionWrapper()
+    run_chain(wrapper, image_chain(2))
+
+    text = metrics.METRICS.render()
+    assert sample(text, 'pne_runs_total{outcome="ok"}') == runs + 1
+    assert sample(text, 'pne_node_duration_seconds_count{node_class="BrightenNode"}') >= 2
+    assert sample(text, 'pne_websocket_sent_bytes_total{frame="text"}') > 0
+    assert sample(text, 'pne_websocket_send_seconds_count') > 0
+
+
+def test_sent_bytes_are_what_was_sent():
+    sizes = []
+
+    class CountingWebSocket(RecordingWebSocket):
+        async def send_text(self, text: str):
+            sizes.append(len(text.encode()))
+            await super().send_text(text)
+
+    wrapper = ExecutionWrapper()
+    wrapper.set_websocket(CountingWebSocket())
+    text = metrics.METRICS.render()
+    line = 'pne_websocket_sent_bytes_total{frame="text"}'
+    before = sample(text, line) if line in text else 0
+    asyncio.run(wrapper.send_now({'event': 'test', 'text': 'ünïcode'}))
+    asyncio.run(wrapper.send_now({'event': 'test', 'numbers': [1, 2.5, None]}))
+
+    assert sample(metrics.METRICS.render(), line) - before == sum(sizes)
+    assert wrapper.websocket.messages[0]['text'] == 'ünïcode'
+
+
+def test_metrics_endpoint():
+    response = TestClient(app).get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    for name in ('pne_large_data_cache_hit_ratio', 'pne_result_cache_evictions_total', 'pne_active_runs', 'pne_queued_runs'):
+        assert f'\n{name} ' in response.text
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import pstats
+import tracemalloc
+
+from pne_backend import profiling
+from pne_backend.execution_wrapper import ExecutionWrapper
+
+from tests.test_graph import NODE_CLASSES, RecordingWebSocket, add_chain
+from tests.test_liveness import image_chain, run_chain
+
+
+def profile_event(wrapper: ExecutionWrapper) -> dict:
+    return next(m for m in wrapper.websocket.messages if m.get('event') == 'profile')
+
+
+def test_profile_event_has_every_node():
+    wrapper = ExecutionWrapper()
+    wrapper.profile = 'nodes'
+    flow = image_chain(3)
+    run_chain(wrapper, flow)
+
+    profile = profile_event(wrapper)
+    assert set(profile['nodes']) == {node['id'] for node in flow['nodes']}
+    blank = profile['nodes']['blank']
+    assert blank['class_name'] == 'BlankImageNode'
+    assert blank['wall_ms'] > 0 and blank['cpu_ms'] is not None
+    assert blank['peak_alloc_bytes'] is not None
+    assert blank['bytes_sent'] > 0
+    assert {'compile_ms', 'instantiate_ms', 'execute_ms'} <= set(profile['phases'])
+    assert 'trace' not in profile
+    # the profile comes before the run ends
+    events = [m.get('event') for m in wrapper.websocket.messages]
+    assert events.index('profile') < events.index('execution_finished')
+
+
+def test_no_profile_by_default():
+    wrapper = ExecutionWrapper()
+    run_chain(wrapper, image_chain(1))
+    assert not any(m.get('event') == 'profile' for m in wrapper.websocket.messages)
+    assert wrapper.profiler is None
+
+
+def test_trace_and_cprofile_exports(tmp_path):
+    wrapper = ExecutionWrapper()
+    wrapper.profile = 'python'
+    wrapper.profile_dir = str(tmp_path)
+    run_chain(wrapper, image_chain(2))
+
+    profile = profile_event(wrapper)
+    with open(profile['trace']) as f:
+        trace = json.load(f)
+    nodes = [e for e in trace['traceEvents'] if e['cat'] == 'node']
+    assert sorted(e['args']['node_id'] for e in nodes) == ['blank', 'brighten_0', 'brighten_1']
+    assert all(e['ph'] == 'X' and e['dur'] >= 0 for e in trace['traceEvents'])
+
+    stats = pstats.Stats(profile['cprofile'])
+    assert any(name == 'meta_exec' for _, _, name in stats.stats)
+
+
+def test_one_cprofile_for_the_run_from_python_3_12(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, 'PER_THREAD_PROFILES', False)
+    wrapper = ExecutionWrapper()
+    wrapper.profile = 'python'
+    wrapper.profile_dir = str(tmp_path)
+    run_chain(wrapper, image_chain(2))
+
+    assert wrapper.profiler.profiles == []
+    assert all(node.data.status == 'evaluated' for node in wrapper.node_instances.values())
+    stats = pstats.Stats(profile_event(wrapper)['cprofile'])
+    assert any(name == 'execute_graph' for _, _, name in stats.stats)
+
+
+def test_a_failed_run_stops_the_profiler_and_finishes():
+    flow = add_chain(1)
+    flow['nodes'][0]['data']['inputs'][0]['data'] = {'class_name': 'StringData', 'payload': 'not a number'}
+    wrapper = ExecutionWrapper()
+    wrapper.node_classes = NODE_CLASSES
+    wrapper.set_websocket(RecordingWebSocket())
+    wrapper.profile = 'nodes'
+    asyncio.run(wrapper.execute_graph(flow))
+
+    assert not tracemalloc.is_tracing()
+    events = [m['event'] for m in wrapper.websocket.messages]
+    assert events[-1] == 'execution_finished'
+    assert 'execution_error' in events
+    assert 'not allowed' in wrapper.run_error
+    assert not wrapper.headless
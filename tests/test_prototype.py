@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from pne_backend.base_data import CLASS_REGISTRY, register_class
+from pne_backend.base_node import BaseNode, node_definition
+from pne_backend.datatypes.basic import IntData, StringData
+from pne_backend.field import InputNodeField, OutputNodeField
+from pne_backend.prototype import get_prototype
+from pne_backend.utils import node_registry
+
+from tests.test_graph import NODE_CLASSES, make_node
+
+
+ALL_CLASSES = [cls for classes in NODE_CLASSES.values() for cls in classes]
+
+
+@pytest.mark.parametrize('NodeClass', ALL_CLASSES, ids=lambda cls: cls.__name__)
+def test_prototype_matches_validation(NodeClass):
+    '''the fast path builds the same node as a full model_validate'''
+    node = json.loads(NodeClass(id='node').model_dump_json())
+    node['position'] = {'x': 0, 'y': 0}
+    node['data']['status'] = 'evaluated'
+    for inp in node['data']['inputs']:
+        inp['user_label'] = 'renamed'
+        inp['metadata'] = {'expanded': True}
+
+    validated = NodeClass.model_validate(json.loads(json.dumps(node)), context={'state': 'deserializing'})
+    constructed = get_prototype(NodeClass).instantiate(json.loads(json.dumps(node)))
+
+    assert type(constructed) is NodeClass
+    assert constructed.model_dump_json() == validated.model_dump_json()
+
+
+def test_prototype_fields_are_not_shared():
+    node = make_node('AddNode', 'add')
+    prototype = get_prototype(node_registry(NODE_CLASSES)[('Mathematics', 'AddNode')])
+    first = prototype.instantiate(json.loads(json.dumps(node)))
+    second = prototype.instantiate(json.loads(json.dumps(node)))
+
+    first.data.inputs[0].data.payload = 100
+    assert second.data.inputs[0].data.payload != 100
+
+
+def test_prototype_rejects_disallowed_types():
+    node = make_node('AddNode', 'add')
+    node['data']['inputs'][0]['data'] = {'class_name': 'StringData', 'payload': 'a'}
+    NodeClass = node_registry(NODE_CLASSES)[('Mathematics', 'AddNode')]
+
+    with pytest.raises(ValueError, match='not allowed'):
+        get_prototype(NodeClass).instantiate(node)
+
+
+def test_changed_layout_falls_back_to_validation():
+    '''nodes whose fields don't match the definition are validated as they are'''
+    node = make_node('AddNode', 'add')
+    node['data']['inputs'] = node['data']['inputs'][:1]
+    NodeClass = node_registry(NODE_CLASSES)[('Mathematics', 'AddNode')]
+
+    instance = get_prototype(NodeClass).instantiate(node)
+    assert [inp.label for inp in instance.data.inputs] == ['a']
+
+
+class AnyInputNode(BaseNode):
+    @classmethod
+    @node_definition(
+        inputs=[InputNodeField(label='anything', data=IntData(payload=1))],
+        outputs=[OutputNodeField(label='anything')]
+    )
+    def exec(cls, anything):
+        return anything
+
+AnyInputNode.definition_path = ''
+
+
+def test_any_data_accepts_datatypes_registered_later():
+    '''like InputNodeField validation, AnyData reads the registry when the data is validated'''
+    prototype = get_prototype(AnyInputNode)
+
+    class LateData(StringData):
+        pass
+
+    register_class(LateData)
+    try:
+        node = json.loads(AnyInputNode(id='any').model_dump_json())
+        node['data']['inputs'][0]['data'] = json.loads(LateData(payload='late').model_dump_json())
+        instance = prototype.instantiate(node)
+    finally:
+        del CLASS_REGISTRY['LateData']
+
+    assert type(instance.data.inputs[0].data) is LateData
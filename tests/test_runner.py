@@ -0,0 +1,66 @@
+import json
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from pne_backend.__main__ import main
+from pne_backend.runner import FlowFailed, run_flow
+
+from tests.test_graph import NODE_CLASSES, add_chain
+from tests.test_liveness import BlankImageNode, BrightenNode, image_chain
+
+
+def test_run_flow_returns_the_results():
+    results = run_flow(add_chain(4), node_classes=NODE_CLASSES)
+
+    assert list(results) == ['add_3']
+    assert results['add_3']['result'].payload == 1 + 2 * 4
+
+
+def test_run_flow_keeps_selected_outputs(tmp_path):
+    flow = image_chain(3)
+    node_classes = {flow['nodes'][0]['data']['namespace']: [BlankImageNode, BrightenNode]}
+    results = run_flow(flow, outputs=['brighten_0:image', 'brighten_2'], output_dir=tmp_path, node_classes=node_classes)
+
+    assert results['brighten_0']['image'].payload[0, 0, 0] == 1
+    assert results['brighten_2']['image'].payload[0, 0, 0] == 3
+    written = np.array(Image.open(tmp_path / 'brighten_2_image.png'))
+    assert written.shape == (64, 64, 3) and written[0, 0, 0] == 3
+
+
+def test_run_flow_raises_node_errors():
+    flow = image_chain(1)
+    flow['nodes'][0]['data']['inputs'][0]['data']['payload'] = -1
+
+    with pytest.raises(FlowFailed) as e:
+        run_flow(flow, node_classes={flow['nodes'][0]['data']['namespace']: [BlankImageNode, BrightenNode]})
+    assert 'negative dimensions' in e.value.errors['blank']
+
+
+def test_cli_writes_outputs(tmp_path, capsys):
+    flow_path = tmp_path / 'flow.json'
+    flow_path.write_text(json.dumps(add_chain(3)))
+
+    assert main(['run', str(flow_path), '-d', str(tmp_path / 'out')]) == 0
+
+    written = json.loads((tmp_path / 'out' / 'add_2_result.json').read_text())
+    assert written == {'class_name': 'IntData', 'payload': 7}
+    assert 'add_2_result.json' in capsys.readouterr().out
+
+
+def test_cli_reports_nodes_that_could_not_be_loaded(capsys):
+    # a flow saved before the Math namespace was renamed
+    assert main(['run', 'tests/materials/nodes_math.json']) == 1
+
+    err = capsys.readouterr().err
+    assert 'Node class Math.AddNode could not be loaded' in err
+    assert 'node(s) failed' in err
+
+
+def test_cli_reports_unknown_outputs(tmp_path, capsys):
+    flow_path = tmp_path / 'flow.json'
+    flow_path.write_text(json.dumps(add_chain(2)))
+
+    assert main(['run', str(flow_path), '-o', 'add_1:missing']) == 1
+    assert 'Node add_1 has no output missing' in capsys.readouterr().err
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from pne_backend.main import SESSIONS, app
+from pne_backend.sessions import SessionRegistry
+
+from tests.test_graph import NODE_CLASSES, RecordingWebSocket, SlowNode, add_chain, make_edge
+
+
+def test_sessions_have_their_own_engine():
+    registry = SessionRegistry(NODE_CLASSES)
+    first, second = registry.get('first'), registry.get('second')
+
+    assert first.wrapper is not second.wrapper
+    assert registry.get('first') is first
+    # the worker pool is shared
+    assert first.wrapper.executor is second.wrapper.executor is registry.executor
+    assert first.wrapper.node_classes is NODE_CLASSES
+
+
+def test_idle_sessions_are_evicted():
+    registry = SessionRegistry(NODE_CLASSES, idle_timeout=10)
+    idle = registry.get('idle')
+    connected = registry.connect('connected')
+
+    assert registry.evict_idle(now=idle.last_active + 5) == []
+    assert registry.evict_idle(now=idle.last_active + 60) == ['idle']
+    assert 'connected' in registry
+
+    registry.disconnect(connected)
+    assert registry.evict_idle(now=connected.last_active + 60) == ['connected']
+    # an evicted session starts over when it comes back
+    assert registry.get('idle') is not idle
+
+
+def test_least_recently_used_sessions_are_evicted_beyond_the_limit():
+    registry = SessionRegistry(NODE_CLASSES, max_sessions=2)
+    for session_id in ('a', 'b', 'c'):
+        registry.get(session_id)
+
+    assert set(registry.sessions) == {'b', 'c'}
+
+
+def test_catalog_updates_reach_every_session():
+    registry = SessionRegistry({})
+    sessions = [registry.get(session_id) for session_id in ('a', 'b')]
+    registry.set_node_classes(NODE_CLASSES)
+
+    assert all(session.wrapper.node_classes is NODE_CLASSES for session in sessions)
+    assert registry.get('c').wrapper.node_classes is NODE_CLASSES
+
+
+def test_cancel_only_reaches_its_session():
+    client = TestClient(app)
+    with client.websocket_connect('/execute?session=cancelling') as websocket:
+        websocket.send_json({'action': 'cancel'})
+    with client.websocket_connect('/execute?session=other') as websocket:
+        websocket.send_json({'action': 'ping'})
+
+    assert SESSIONS.get('cancelling').wrapper.cancel_flag
+    assert not SESSIONS.get('other').wrapper.cancel_flag
+
+
+def run_and_wait(websocket, flow: dict):
+    websocket.send_json({'action': 'execute', 'flow': flow, 'run_id': 'run'})
+    while websocket.receive_json()['event'] != 'execution_finished':
+        pass
+
+
+def test_unnamed_connections_get_their_own_session():
+    client = TestClient(app)
+    before = set(SESSIONS.sessions)
+    with client.websocket_connect('/execute') as first:
+        run_and_wait(first, add_chain(2))
+        with client.websocket_connect('/execute') as second:
+            run_and_wait(second, add_chain(2))
+            sessions = [SESSIONS.sessions[id] for id in set(SESSIONS.sessions) - before]
+
+    assert len(sessions) == 2
+    assert sessions[0].wrapper is not sessions[1].wrapper
+    # nobody can come back to them, they are dropped with their outputs
+    assert all(session.id not in SESSIONS for session in sessions)
+
+
+def test_named_sessions_outlive_their_connection():
+    registry = SessionRegistry(NODE_CLASSES)
+    unnamed, named = registry.connect(), registry.connect('named')
+    registry.disconnect(unnamed)
+    registry.disconnect(named)
+
+    assert unnamed.id not in registry and unnamed.wrapper.cancel_flag
+    assert registry.get('named') is named
+
+
+def run_ids(messages: list[dict], event: str) -> list:
+    return [m['run_id'] for m in messages if m['event'] == event]
+
+
+def test_newer_run_supersedes_the_one_in_flight():
+    slow = [json.loads(SlowNode(id=id).model_dump_json()) for id in ('first', 'second')]
+    slow_flow = {'nodes': slow, 'edges': [make_edge('first', 0, 'second', 0)]}
+    registry = SessionRegistry({slow[0]['data']['namespace']: [SlowNode]} | NODE_CLASSES)
+    session = registry.connect('editor')
+    websocket = RecordingWebSocket()
+    session.wrapper.set_websocket(websocket)
+
+    async def run_twice():
+        assert session.start(slow_flow) == 1
+        await asyncio.sleep(0.2)
+        start = time.time()
+        await session.supersede()
+        assert time.time() - start < 0.5
+        assert session.start(add_chain(3)) == 2
+        await session.run_task
+
+    asyncio.run(run_twice())
+
+    messages = websocket.messages
+    assert run_ids(messages, 'execution_cancelled') == [1]
+    assert run_ids(messages, 'execution_finished') == [1, 2]
+    # the superseded run is done before the new one sends anything
+    last_of_first = max(i for i, m in enumerate(messages) if m['run_id'] == 1)
+    assert all(m['run_id'] == 2 for m in messages[last_of_first + 1:])
+    assert session.wrapper.websocket is websocket
+    assert session.wrapper.node_instances['add_2'].data.outputs[0].data.payload == 7
+
+
+def test_connection_stays_open_between_runs():
+    client = TestClient(app)
+    with client.websocket_connect('/execute?session=persistent') as websocket:
+        for run_id in ('a', 'b'):
+            websocket.send_json({'action': 'execute', 'flow': add_chain(2), 'run_id': run_id})
+            events = []
+            while not events or events[-1]['event'] != 'execution_finished':
+                events.append(websocket.receive_json())
+            assert {event['run_id'] for event in events} == {run_id}
+
+
+def test_requests_are_debounced_to_the_latest():
+    registry = SessionRegistry(NODE_CLASSES, debounce=0.05)
+    session = registry.connect('slider')
+    websocket = RecordingWebSocket()
+    session.wrapper.set_websocket(websocket)
+
+    async def drag():
+        for value in range(5):
+            flow = add_chain(2)
+            flow['nodes'][0]['data']['inputs'][0]['data']['payload'] = value
+            await session.submit(flow, update_mode='delta')
+            await asyncio.sleep(0.01)
+        await session.debouncer
+        await session.run_task
+
+    asyncio.run(drag())
+
+    messages = websocket.messages
+    assert run_ids(messages, 'execution_superseded') == [1, 2, 3, 4]
+    assert run_ids(messages, 'execution_started') == [5]
+    assert run_ids(messages, 'execution_finished') == [5]
+    assert session.wrapper.update_mode == 'delta'
+    assert session.wrapper.node_instances['add_1'].data.outputs[0].data.payload == 4 + 2 + 2
+
+
+def test_cancel_reaches_a_request_waiting_out_the_debounce():
+    registry = SessionRegistry(NODE_CLASSES, debounce=0.05)
+    session = registry.connect('slider')
+    websocket = RecordingWebSocket()
+    session.wrapper.set_websocket(websocket)
+
+    async def submit_and_cancel():
+        run_id = await session.submit(add_chain(2))
+        await session.cancel(run_id)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(submit_and_cancel())
+
+    assert run_ids(websocket.messages, 'execution_cancelled') == [1]
+    assert run_ids(websocket.messages, 'execution_started') == []
+    assert session.pending is None and session.debouncer is None and session.run_task is None
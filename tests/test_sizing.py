@@ -0,0 +1,37 @@
+import numpy as np
+
+from pne_backend.datatypes.basic import IntData, StringData
+from pne_backend.datatypes.compound import ListData
+from pne_backend.datatypes.image import ImageData
+
+
+def make_image():
+    return ImageData(payload=np.zeros((512, 512, 3), dtype=np.uint8))
+
+
+def test_array_views_count_their_buffer():
+    '''a view doesn't own its buffer, so getsizeof reported it as almost empty'''
+    image = ImageData(payload=np.zeros((1024, 1024, 3), dtype=np.uint8)[::2, ::2])
+
+    assert image.payload_nbytes() == 512 * 512 * 3
+    assert image.cached
+
+
+def test_list_of_images_is_sized_deeply():
+    images = ListData(payload=[make_image() for _ in range(4)])
+
+    assert images.payload_nbytes() >= 4 * 512 * 512 * 3
+    assert images.size_mb >= 3
+    assert images.cached
+
+
+def test_size_is_memoized_until_the_payload_changes():
+    data = StringData(payload='a')
+    small = data.payload_nbytes()
+    data.payload = 'a' * 10_000
+
+    assert data.payload_nbytes() > small + 9_000
+
+
+def test_small_data_stays_inline():
+    assert not ListData(payload=[IntData(payload=i) for i in range(10)]).cached
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import time
+from typing import ClassVar
+
+import numpy as np
+
+from pne_backend.base_node import StreamingBaseNode, node_definition
+from pne_backend.field import InputNodeField, OutputNodeField
+from pne_backend.datatypes.basic import IntData
+from pne_backend.datatypes.image import ImageData
+from pne_backend.execution_wrapper import ExecutionWrapper
+from pne_backend.pipeline import PIPE_MAX_ITEMS
+
+from tests.test_graph import RecordingWebSocket, make_edge, make_node, run_flow
+
+
+class CountingStreamNode(StreamingBaseNode):
+    '''yields a partial count as fast as it can, printing along the way'''
+
+    @classmethod
+    @node_definition(
+        inputs=[InputNodeField(label='steps', allowed_types=['IntData'], data=IntData(payload=20000))],
+        outputs=[OutputNodeField(label='count', allowed_types=['IntData'])]
+    )
+    def exec_stream(cls, steps: IntData):
+        for i in range(steps.payload):
+            if i % 5000 == 0:
+                print(f'step {i}')
+            yield {'progress': i / steps.payload, 'outputs': [IntData(payload=i)]}
+        print('done')
+        yield {'progress': 1, 'outputs': [IntData(payload=steps.payload)]}
+
+CountingStreamNode.definition_path = ''
+
+
+def run_stream_flow(flow: dict, stream_update_interval: float) -> tuple[ExecutionWrapper, RecordingWebSocket]:
+    wrapper = ExecutionWrapper(stream_update_interval=stream_update_interval)
+    wrapper.node_classes = {flow['nodes'][0]['data']['namespace']: [CountingStreamNode]}
+    websocket = RecordingWebSocket()
+    wrapper.set_websocket(websocket)
+    asyncio.run(wrapper.execute_graph(flow))
+    return wrapper, websocket
+
+
+def node_updates(websocket: RecordingWebSocket, node_id: str) -> list[dict]:
+    updates = [json.loads(m['node']) for m in websocket.messages if m['event'] == 'single_node_update']
+    return [node for node in updates if node['id'] == node_id]
+
+
+def status_changes(websocket: RecordingWebSocket) -> list[tuple[str, str]]:
+    '''(node id, status) in the order the client saw them, from status updates and node updates'''
+    changes = []
+    for m in websocket.messages:
+        if m['event'] == 'status_update':
+            changes.extend((u['node_id'], u['status']) for u in m['updates'])
+        elif m['event'] == 'single_node_update':
+            node = json.loads(m['node'])
+            changes.append((node['id'], node['data']['status']))
+    return changes
+
+
+def test_stream_updates_are_throttled():
+    '''thousands of yields reach the client as a handful of coalesced updates'''
+    node = json.loads(CountingStreamNode(id='stream').model_dump_json())
+    start = time.time()
+    wrapper, websocket = run_stream_flow({'nodes': [node], 'edges': []}, stream_update_interval=0.05)
+    duration = time.time() - start
+
+    updates = node_updates(websocket, 'stream')
+    assert 1 < len(updates) <= duration / 0.05 + 2
+    assert [u['data']['status'] for u in updates[:-1]] == ['streaming'] * (len(updates) - 1)
+
+    final = updates[-1]['data']
+    assert final['status'] == 'evaluated'
+    assert final['progress'] == 1
+    assert final['outputs'][0]['data']['payload'] == 20000
+    # output printed after the last yield is kept too
+    assert final['terminal_output'].endswith('done\n')
+
+
+def test_stream_feeds_downstream():
+    nodes = [json.loads(CountingStreamNode(id=id).model_dump_json()) for id in ('first', 'second')]
+    nodes[0]['data']['inputs'][0]['data']['payload'] = 10
+    flow = {'nodes': nodes, 'edges': [make_edge('first', 0, 'second', 0)]}
+    wrapper, websocket = run_stream_flow(flow, stream_update_interval=0.05)
+
+    assert wrapper.node_instances['second'].data.outputs[0].data.payload == 10
+
+
+def test_frame_pipeline():
+    '''a chain of frame nodes runs concurrently, the consumers starting before the source finishes'''
+    nodes = [make_node(name, name) for name in ('FrameSequenceNode', 'FrameBlurNode', 'FrameAverageNode')]
+    image = ImageData(payload=np.random.randint(0, 255, (16, 16, 3), dtype=np.uint8))
+    nodes[0]['data']['inputs'][0]['data'] = json.loads(image.model_dump_json())
+    edges = [make_edge('FrameSequenceNode', 0, 'FrameBlurNode', 0), make_edge('FrameBlurNode', 0, 'FrameAverageNode', 0)]
+    wrapper, websocket = run_flow({'nodes': nodes, 'edges': edges})
+
+    assert all(node.data.status == 'evaluated' for node in wrapper.node_instances.values())
+    assert wrapper.node_instances['FrameAverageNode'].data.outputs[0].data.payload.shape == (16, 16, 3)
+
+    # all three were streaming before the first of them was evaluated
+    statuses = status_changes(websocket)
+    started = {}
+    for i, (node_id, status) in enumerate(statuses):
+        if status == 'streaming':
+            started.setdefault(node_id, i)
+    first_done = next(i for i, (_, status) in enumerate(statuses) if status == 'evaluated')
+    assert set(started) == {'FrameSequenceNode', 'FrameBlurNode', 'FrameAverageNode'}
+    assert max(started.values()) < first_done
+
+
+class PacedConsumerNode(StreamingBaseNode):
+    '''reads a stream slowly, recording how far ahead the producer got'''
+    stream_inputs: ClassVar[tuple[str, ...]] = ('counts',)
+    lead: ClassVar[list[int]] = []
+
+    @classmethod
+    @node_definition(
+        inputs=[InputNodeField(label='counts', allowed_types=['IntData'])],
+        outputs=[OutputNodeField(label='count', allowed_types=['IntData'])]
+    )
+    def exec_stream(cls, counts):
+        for consumed, count in enumerate(counts):
+            cls.lead.append(PRODUCED[-1] - consumed)
+            time.sleep(0.001)
+            yield {'outputs': [count]}
+
+PacedConsumerNode.definition_path = ''
+
+
+class RecordingStreamNode(CountingStreamNode):
+    @classmethod
+    @node_definition(
+        inputs=[InputNodeField(label='steps', allowed_types=['IntData'], data=IntData(payload=200))],
+        outputs=[OutputNodeField(label='count', allowed_types=['IntData'])]
+    )
+    def exec_stream(cls, steps: IntData):
+        for i in range(steps.payload):
+            PRODUCED.append(i)
+            yield {'outputs': [IntData(payload=i)]}
+        if steps.payload == 13:
+            raise ValueError('unlucky')
+
+RecordingStreamNode.definition_path = ''
+PRODUCED = [0]
+
+
+def run_paced_pipeline(steps: int) -> tuple[ExecutionWrapper, RecordingWebSocket]:
+    PRODUCED[:] = [0]
+    PacedConsumerNode.lead.clear()
+    nodes = [json.loads(RecordingStreamNode(id='producer').model_dump_json()),
+             json.loads(PacedConsumerNode(id='consumer').model_dump_json())]
+    nodes[0]['data']['inputs'][0]['data']['payload'] = steps
+    wrapper = ExecutionWrapper()
+    wrapper.node_classes = {nodes[0]['data']['namespace']: [RecordingStreamNode, PacedConsumerNode]}
+    websocket = RecordingWebSocket()
+    wrapper.set_websocket(websocket)
+    flow = {'nodes': nodes, 'edges': [make_edge('producer', 0, 'consumer', 0)]}
+    asyncio.run(wrapper.execute_graph(flow))
+    return wrapper, websocket
+
+
+def test_pipe_backpressure():
+    '''a fast producer never gets more than the pipe's capacity ahead of a slow consumer'''
+    wrapper, websocket = run_paced_pipeline(200)
+
+    assert wrapper.node_instances['consumer'].data.outputs[0].data.payload == 199
+    assert len(PacedConsumerNode.lead) == 200
+    assert max(PacedConsumerNode.lead) <= PIPE_MAX_ITEMS + 2
+
+
+def test_pipe_forwards_errors():
+    wrapper, websocket = run_paced_pipeline(13)
+
+    assert wrapper.node_instances['producer'].data.status == 'error'
+    assert wrapper.node_instances['consumer'].data.status == 'error'
+    assert 'Upstream streaming node failed: unlucky' in wrapper.node_instances['consumer'].data.error_output
@@ -0,0 +1,66 @@
+import json
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from pne_backend.main import app
+from pne_backend.transport import has_binary_arrays
+from pne_backend.datatypes.basic import IntData, NumpyData
+from pne_backend.datatypes.compound import ListData
+from pne_backend.datatypes.image import ImageData
+
+from tests.test_graph import make_node
+
+
+def test_base64_round_trip():
+    data = NumpyData(payload=np.arange(12, dtype=np.float32).reshape(3, 4))
+    dumped = json.loads(data.model_dump_json(context={'array_encoding': 'base64'}))
+
+    assert dumped['payload']['encoding'] == 'base64'
+    assert dumped['payload']['shape'] == [3, 4]
+
+    loaded = NumpyData.model_validate(dumped, context={'state': 'deserializing'})
+    assert loaded.payload.dtype == np.float32
+    assert np.array_equal(loaded.payload, data.payload)
+
+
+def test_binary_frames_round_trip():
+    '''arrays nested in a list each get their own frame, in order'''
+    images = [ImageData(payload=np.full((4, 4, 3), i, dtype=np.uint8)) for i in range(3)]
+    data = ListData(payload=[IntData(payload=1), *images])
+
+    frames = []
+    dumped = data.model_dump_json(context={'array_encoding': 'binary', 'binary_frames': frames})
+
+    assert len(frames) == 3
+    loaded = ListData.model_validate_json(dumped, context={'binary_frames': frames})
+    for image, loaded_image in zip(images, loaded.payload[1:]):
+        assert np.array_equal(image.payload, loaded_image.payload)
+
+
+def test_list_encoding_is_the_default():
+    data = NumpyData(payload=np.array([1, 2, 3]))
+
+    assert json.loads(data.model_dump_json())['payload'] == [1, 2, 3]
+
+
+def test_binary_arrays_are_rejected_inbound():
+    images = [ImageData(payload=np.full((4, 4, 3), i, dtype=np.uint8)) for i in range(2)]
+    data = ListData(payload=[IntData(payload=1), *images])
+    frames = []
+    binary = json.loads(data.model_dump_json(context={'array_encoding': 'binary', 'binary_frames': frames}))
+    base64 = json.loads(data.model_dump_json(context={'array_encoding': 'base64'}))
+
+    assert has_binary_arrays(binary)
+    assert not has_binary_arrays(base64)
+    assert not has_binary_arrays(json.loads(NumpyData(payload=np.zeros((3, 3))).model_dump_json()))
+
+    node = make_node('AddNode', 'binary_input')
+    node['data']['inputs'][0]['data'] = binary['payload'][1]
+    with TestClient(app).websocket_connect('/execute?session=binary_input') as websocket:
+        websocket.send_json({'action': 'execute', 'flow': {'nodes': [node], 'edges': []}, 'run_id': 'binary'})
+        rejected = websocket.receive_json()
+
+    assert rejected['event'] == 'execution_rejected'
+    assert rejected['run_id'] == 'binary'
+    assert 'base64' in rejected['error']